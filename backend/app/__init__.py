@@ -1,16 +1,50 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
+from app.config import Config
 from app.utils.db import init_db
+from app.utils.cache import init_cache
+from app.utils.pubsub import init_pubsub
+from app.utils.json_encoder import BSONJSONProvider
+from app.utils.auth import init_auth
+from app.utils.metrics import init_metrics
+from app.utils.passwords import init_passwords
 
-def create_app():
+def create_app(init_database=True):
+    """
+    Create the Flask application
+    
+    Args:
+        init_database: Connect to MongoDB now; pre-fork servers pass False
+            and call init_db in each worker after fork instead
+    """
     app = Flask(__name__)
-    app.config.from_object('app.config.Config')
+    app.config.from_object(Config)
+    
+    # Encode responses (including ObjectIds and datetimes) in a single pass
+    app.json = BSONJSONProvider(app)
+    
+    # Time every request and serve /metrics; first, so that its hooks wrap
+    # every other request hook
+    init_metrics(app)
     
     # Enable CORS
     CORS(app, resources={r"/api/*": {"origins": "*"}})
     
     # Initialize database
-    init_db(app)
+    if init_database:
+        init_db(app)
+    
+    # Initialize response cache
+    init_cache(app)
+    
+    # Live match events reach every node through the pub/sub backend
+    init_pubsub(app)
+    
+    # Resolve the bearer token of every request once
+    init_auth(app)
+    
+    # Configure the password hashing pool
+    init_passwords(app)
     
     # Register blueprints
     from app.routes.auth import auth_bp
@@ -18,12 +52,14 @@ def create_app():
     from app.routes.matches import matches_bp
     from app.routes.leagues import leagues_bp
     from app.routes.wallet import wallet_bp
+    from app.routes.health import health_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(users_bp, url_prefix='/api/users')
     app.register_blueprint(matches_bp, url_prefix='/api/matches')
     app.register_blueprint(leagues_bp, url_prefix='/api/leagues')
     app.register_blueprint(wallet_bp, url_prefix='/api/wallet')
+    app.register_blueprint(health_bp, url_prefix='/api/health')
     
     # Test routes
     @app.route('/')
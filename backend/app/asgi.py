@@ -0,0 +1,125 @@
+"""
+ASGI entry point
+
+    WEB_CONCURRENCY=4 uvicorn app.asgi:app --host 0.0.0.0 --port 5000
+
+Requires the packages in requirements-asgi.txt. The hot read endpoints
+(app.async_routes) run as async Quart handlers over Motor, so one worker
+serves thousands of concurrent connections without a thread each. Every
+other route is served by the Flask app from create_app(), run on a thread
+pool, so both modes share the service layer and the Flask factory keeps
+working on its own.
+"""
+import os
+
+from a2wsgi import WSGIMiddleware
+from quart import Quart, request
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RequestRedirect
+
+from app import create_app
+from app.async_routes.helpers import init_async_auth
+from app.services.match_stream import init_match_stream, close_match_stream
+from app.utils.async_db import init_async_db, close_async_db
+from app.utils.cache import init_cache
+from app.utils.json_encoder import BSONJSONProvider
+from app.utils.metrics import start_request, finish_request
+from app.utils.pubsub import require_shared_pubsub
+
+class Dispatcher:
+    """
+    Route requests with an async handler to the Quart app and everything
+    else to the wrapped Flask app
+    """
+
+    def __init__(self, async_app, wsgi_app, sync_threads=32):
+        self.async_app = async_app
+        # Runs Flask requests concurrently on a pool of sync_threads threads
+        self.wsgi_app = WSGIMiddleware(wsgi_app, workers=sync_threads)
+        self._urls = async_app.url_map.bind('localhost')
+
+    def _handles(self, scope):
+        # CORS preflights go to Flask, which knows every method of a path
+        if scope['method'] == 'OPTIONS':
+            return False
+        try:
+            self._urls.match(scope['path'], method=scope['method'])
+        except RequestRedirect:
+            return True
+        except HTTPException:
+            return False
+        return True
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and not self._handles(scope):
+            await self.wsgi_app(scope, receive, send)
+        else:
+            await self.async_app(scope, receive, send)
+
+def create_asgi_app(flask_app=None):
+    """
+    Create the ASGI application
+
+    Args:
+        flask_app: Optional Flask app for the routes without an async
+            handler, create_app() by default
+
+    Returns:
+        ASGI callable
+    """
+    flask_app = flask_app or create_app()
+
+    app = Quart(__name__, static_folder=None)
+    app.config.from_object('app.config.Config')
+    app.json = BSONJSONProvider(app)
+
+    # uvicorn reads its worker count from WEB_CONCURRENCY
+    workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+    if workers > 1:
+        require_shared_pubsub(app.config, f'to run {workers} workers')
+
+    init_cache(app)
+    
+    if app.config.get('METRICS_ENABLED', True):
+        # Same registry as the Flask app's /metrics
+        @app.before_request
+        async def start_request_timer():
+            start_request()
+        
+        @app.after_request
+        async def record_request(response):
+            finish_request(request.endpoint, request.method, response.status_code)
+            return response
+    
+    init_async_auth(app)
+
+    @app.before_serving
+    async def startup():
+        init_async_db(app.config)
+        init_match_stream(app)
+
+    @app.after_serving
+    async def shutdown():
+        close_match_stream()
+        close_async_db()
+
+    @app.after_request
+    async def allow_cors(response):
+        # Same policy as flask_cors in create_app
+        if request.path.startswith('/api/'):
+            response.headers['Access-Control-Allow-Origin'] = '*'
+        return response
+
+    from app.async_routes.users import users_bp
+    from app.async_routes.matches import matches_bp
+    from app.async_routes.leagues import leagues_bp
+    from app.async_routes.wallet import wallet_bp
+
+    app.register_blueprint(users_bp, url_prefix='/api/users')
+    app.register_blueprint(matches_bp, url_prefix='/api/matches')
+    app.register_blueprint(leagues_bp, url_prefix='/api/leagues')
+    app.register_blueprint(wallet_bp, url_prefix='/api/wallet')
+
+    return Dispatcher(app, flask_app, app.config.get('ASGI_SYNC_THREADS', 32))
+
+app = create_asgi_app()
@@ -0,0 +1,6 @@
+"""
+Async (Quart + Motor) versions of the hot read endpoints
+
+Served by app.asgi; each handler mirrors the Flask route of the same path
+and shares its query building and serialization with app.services.
+"""
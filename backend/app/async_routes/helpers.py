@@ -0,0 +1,43 @@
+import time
+from functools import wraps
+
+from quart import current_app, g, request, Response
+
+from app.utils.auth import resolve_user_id
+from app.utils.cache import view_cache_key, get_cached_response, store_view_response, etag_response
+from app.utils.metrics import record_phase
+
+def init_async_auth(app):
+    """Resolve the bearer token of every request once, like init_auth"""
+
+    @app.before_request
+    async def load_current_user():
+        started = time.perf_counter()
+        g.user_id = resolve_user_id(request.headers.get('Authorization', ''))
+        record_phase('auth', time.perf_counter() - started)
+
+def get_current_user():
+    """Get the ObjectId of the authenticated user, or None"""
+    return g.get('user_id')
+
+def cached_response(tags=(), ttl=None):
+    """
+    Async counterpart of app.utils.cache.cached_response
+
+    Shares its keys, storage and ETag handling with the sync decorator, so
+    both serving modes share entries and invalidations; only the view call
+    and the conditional response are awaited here.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(**kwargs):
+            key = view_cache_key(tags, kwargs, request)
+            cached = get_cached_response(key)
+            if cached is None:
+                response = await current_app.make_response(await view(**kwargs))
+                if response.status_code != 200:
+                    return response
+                cached = store_view_response(key, await response.get_data(), ttl, current_app.config)
+            return await etag_response(Response, *cached).make_conditional(request)
+        return wrapper
+    return decorator
@@ -0,0 +1,33 @@
+from quart import Blueprint, request, jsonify
+from app.async_routes.helpers import cached_response
+from app.utils.async_db import get_async_db
+from app.utils.json_encoder import serialize_document
+from app.utils.pagination import encode_cursor, decode_cursor, parse_limit
+from app.services.leagues import build_league_listing, find_leagues_page, next_leagues_cursor
+
+leagues_bp = Blueprint('leagues', __name__)
+
+@leagues_bp.route('/', methods=['GET'])
+@cached_response(tags=('leagues',))
+async def get_leagues():
+    """Get all leagues"""
+    try:
+        filter_type = request.args.get('filter', 'all')  # all, free, paid, popular
+        sort_by = request.args.get('sort', 'prize')  # prize, teams, entry
+        limit = parse_limit(request.args.get('limit'), default=50)
+        cursor = request.args.get('cursor')
+        query, sort = build_league_listing(filter_type, sort_by, decode_cursor(cursor) if cursor else None)
+        
+        db = get_async_db()
+        leagues = await find_leagues_page(db, query, sort, limit).to_list(limit)
+        next_cursor = next_leagues_cursor(leagues, sort, limit)
+        
+        return jsonify({
+            'leagues': [serialize_document(league) for league in leagues],
+            'next_cursor': encode_cursor(next_cursor) if next_cursor else None
+        }), 200
+        
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor or limit'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
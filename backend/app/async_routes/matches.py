@@ -0,0 +1,99 @@
+from quart import Blueprint, Response, request, jsonify
+from app.async_routes.helpers import get_current_user, cached_response
+from app.utils.async_db import get_async_db
+from app.utils.json_encoder import serialize_document
+from app.services.matches import build_matches_query, build_user_matches_query
+from app.services.match_stream import get_match_stream_hub
+from bson import ObjectId
+from bson.errors import InvalidId
+
+matches_bp = Blueprint('matches', __name__)
+
+@matches_bp.route('/', methods=['GET'])
+@cached_response(tags=('matches',))
+async def get_matches():
+    """Get all matches"""
+    try:
+        status = request.args.get('status', 'all')  # all, upcoming, live, completed
+        
+        db = get_async_db()
+        matches = await db.matches.find(build_matches_query(status)).to_list(None)
+        
+        cleaned_matches = [serialize_document(match) for match in matches]
+        
+        return jsonify({'matches': cleaned_matches}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@matches_bp.route('/<match_id>', methods=['GET'])
+@cached_response(tags=('match:{match_id}',))
+async def get_match(match_id):
+    """Get match by ID"""
+    try:
+        db = get_async_db()
+        match = await db.matches.find_one({'_id': ObjectId(match_id)})
+        
+        if not match:
+            return jsonify({'error': 'Match not found'}), 404
+        
+        return jsonify({'match': serialize_document(match)}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@matches_bp.route('/<match_id>/stream', methods=['GET'])
+async def stream_match(match_id):
+    """Stream live score, status and fantasy points updates (server-sent events)"""
+    try:
+        ObjectId(match_id)
+    except (InvalidId, TypeError):
+        return jsonify({'error': 'Match not found'}), 404
+    
+    hub = get_match_stream_hub()
+    channel = hub.channel(match_id)
+    # One request seeds the channel, the others wait for it
+    async with channel.seed_lock:
+        if not channel.seeded:
+            db = get_async_db()
+            match = await db.matches.find_one({'_id': ObjectId(match_id)}, {'score': 1, 'status': 1})
+            if not match:
+                return jsonify({'error': 'Match not found'}), 404
+            # Snapshots start from every player's materialized points
+            player_points = await db.player_match_points.find(
+                {'match_id': ObjectId(match_id)}, {'player_id': 1, 'points': 1}
+            ).to_list(None)
+            channel.seed(
+                match.get('score'),
+                match.get('status'),
+                {doc['player_id']: doc.get('points', 0) for doc in player_points}
+            )
+    
+    # A reconnecting client resumes from the last event it received
+    response = Response(
+        hub.subscribe(match_id, request.headers.get('Last-Event-ID')),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.timeout = None
+    return response
+
+@matches_bp.route('/my-matches', methods=['GET'])
+async def get_my_matches():
+    """Get user's matches"""
+    try:
+        user_id = get_current_user()
+        if not user_id:
+            return jsonify({'error': 'Unauthorized'}), 401
+        
+        status = request.args.get('status', 'all')
+        
+        db = get_async_db()
+        user_matches = await db.user_matches.find(build_user_matches_query(user_id, status)).to_list(None)
+        
+        cleaned_matches = [serialize_document(match) for match in user_matches]
+        
+        return jsonify({'matches': cleaned_matches}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,26 @@
+from quart import Blueprint, jsonify
+from app.async_routes.helpers import get_current_user
+from app.utils.async_db import get_async_db
+from app.utils.json_encoder import serialize_document
+from app.models.user import User
+
+users_bp = Blueprint('users', __name__)
+
+@users_bp.route('/profile', methods=['GET'])
+async def get_profile():
+    """Get user profile"""
+    try:
+        user_id = get_current_user()
+        if not user_id:
+            return jsonify({'error': 'Unauthorized'}), 401
+        
+        db = get_async_db()
+        user = await db.users.find_one({'_id': user_id}, {field: 1 for field in User.PUBLIC_FIELDS})
+        
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        
+        return jsonify({'user': serialize_document(user, User.PUBLIC_FIELDS)}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,65 @@
+from quart import Blueprint, request, jsonify
+from app.async_routes.helpers import get_current_user
+from app.utils.async_db import get_async_db
+from app.utils.json_encoder import serialize_document
+from app.utils.pagination import encode_cursor, decode_cursor, parse_limit
+from app.services.wallet import (
+    build_transactions_query,
+    find_transactions_page,
+    next_transactions_cursor,
+)
+
+wallet_bp = Blueprint('wallet', __name__)
+
+@wallet_bp.route('/balance', methods=['GET'])
+async def get_balance():
+    """Get wallet balance"""
+    try:
+        user_id = get_current_user()
+        if not user_id:
+            return jsonify({'error': 'Unauthorized'}), 401
+        
+        db = get_async_db()
+        user = await db.users.find_one({'_id': user_id}, {'wallet_balance': 1})
+        
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        
+        return jsonify({
+            'balance': user.get('wallet_balance', 0)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@wallet_bp.route('/transactions', methods=['GET'])
+async def get_transactions():
+    """Get wallet transactions"""
+    try:
+        user_id = get_current_user()
+        if not user_id:
+            return jsonify({'error': 'Unauthorized'}), 401
+        
+        limit = parse_limit(request.args.get('limit'), default=50)
+        cursor = request.args.get('cursor')
+        query = build_transactions_query(
+            user_id,
+            transaction_type=request.args.get('type'),
+            date_from=request.args.get('from'),
+            date_to=request.args.get('to'),
+            cursor=decode_cursor(cursor) if cursor else None
+        )
+        
+        db = get_async_db()
+        transactions = await find_transactions_page(db, query, limit).to_list(limit)
+        next_cursor = next_transactions_cursor(transactions, limit)
+        
+        return jsonify({
+            'transactions': [serialize_document(transaction) for transaction in transactions],
+            'next_cursor': encode_cursor(next_cursor) if next_cursor else None
+        }), 200
+        
+    except ValueError:
+        return jsonify({'error': 'Invalid filter, cursor or limit'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,7 +1,11 @@
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+# backend/.env, loaded by explicit path instead of searching up from the caller
+ENV_FILE = os.environ.get('ENV_FILE', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env'))
+
+if os.path.exists(ENV_FILE):
+    from dotenv import load_dotenv
+    load_dotenv(ENV_FILE)
 
 class Config:
     """Application configuration"""
@@ -9,4 +13,62 @@ class Config:
     MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
     DB_NAME = os.environ.get('DB_NAME', 'fantasy11')
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key')
-
+    
+    # Create the MongoDB client on first use instead of at startup
+    DB_LAZY_CONNECT = os.environ.get('DB_LAZY_CONNECT', '').lower() in ('1', 'true')
+    READINESS_TIMEOUT = float(os.environ.get('READINESS_TIMEOUT', 1))  # seconds for the readiness ping
+    
+    # Response cache for public catalog endpoints
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')  # shared backend, in-process if unset
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
+    CATALOG_CACHE_TTL = int(os.environ.get('CATALOG_CACHE_TTL', 10))
+    
+    # Verified JWTs kept per worker (0 disables the cache)
+    AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 1024))
+    
+    # Production WSGI server (app.launcher); 0 sizes from the CPU count and Mongo pool
+    WEB_WORKERS = int(os.environ.get('WEB_WORKERS', 0))
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 0))
+    MONGO_CONNECTION_BUDGET = int(os.environ.get('MONGO_CONNECTION_BUDGET', 500))  # per host, all workers
+    WEB_KEEPALIVE = int(os.environ.get('WEB_KEEPALIVE', 75))  # above the load balancer idle timeout
+    WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT', 30))
+    WEB_GRACEFUL_TIMEOUT = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+    WEB_MAX_REQUESTS = int(os.environ.get('WEB_MAX_REQUESTS', 0))  # recycle workers, 0 never
+    
+    # Request and MongoDB instrumentation, served on /metrics
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1').lower() in ('1', 'true')
+    METRICS_SLOW_QUERY_MS = float(os.environ.get('METRICS_SLOW_QUERY_MS', 100))  # log commands slower than this
+    METRICS_ALLOW_REMOTE = os.environ.get('METRICS_ALLOW_REMOTE', '').lower() in ('1', 'true')  # loopback only if unset
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')  # bearer token required for /metrics when set
+    
+    # Threads per ASGI worker for the Flask routes without an async handler
+    ASGI_SYNC_THREADS = int(os.environ.get('ASGI_SYNC_THREADS', 32))
+    
+    # Live match event stream (ASGI mode)
+    PUBSUB_REDIS_URL = os.environ.get('PUBSUB_REDIS_URL')  # fan out across nodes, in-process if unset
+    MATCH_STREAM_BUFFER = int(os.environ.get('MATCH_STREAM_BUFFER', 256))  # updates kept per match
+    MATCH_STREAM_HEARTBEAT = float(os.environ.get('MATCH_STREAM_HEARTBEAT', 15))  # seconds between keep-alives
+    MATCH_STREAM_IDLE_TTL = float(os.environ.get('MATCH_STREAM_IDLE_TTL', 3600))  # drop unwatched quiet matches
+    
+    # scrypt password hashing cost and the per-worker hashing pool
+    PASSWORD_SCRYPT_N = int(os.environ.get('PASSWORD_SCRYPT_N', 2 ** 14))
+    PASSWORD_SCRYPT_R = int(os.environ.get('PASSWORD_SCRYPT_R', 8))
+    PASSWORD_SCRYPT_P = int(os.environ.get('PASSWORD_SCRYPT_P', 1))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0))  # 0 splits the CPUs between the web workers
+    PASSWORD_HASH_QUEUE_DEPTH = int(os.environ.get('PASSWORD_HASH_QUEUE_DEPTH', 8))  # waiting requests
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))
+    
+    # MongoDB connection pool, per worker process
+    MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 50))
+    MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 0))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 5000))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', 10000))
+    MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS', '')  # e.g. 'zstd,snappy,zlib'
+    
+    # Read preference of catalog collections (matches, leagues, scoring rules);
+    # money collections always read from the primary and write with w=majority,
+    # and status checks use read_primary
+    MONGO_CATALOG_READ_PREFERENCE = os.environ.get('MONGO_CATALOG_READ_PREFERENCE', 'secondaryPreferred')
+    MONGO_CATALOG_MAX_STALENESS_SECONDS = int(os.environ.get('MONGO_CATALOG_MAX_STALENESS_SECONDS', 90))
@@ -0,0 +1,150 @@
+"""
+Production launcher: the Flask app under gunicorn's pre-fork server
+
+    python -m app.launcher
+
+Binds to 0.0.0.0:$PORT (5000 by default) with gthread workers sized from
+the CPU count and the MongoDB pool settings (see size_workers). The app is
+created once in the master and forked; each worker opens its own MongoDB
+client after fork, since a client must not be shared across a fork.
+
+Unless DB_LAZY_CONNECT is set, the master first checks that the unique
+indexes exist and exits if any is missing (see check_indexes).
+
+Signals (to the master):
+    HUP   graceful reload: new workers are forked with the re-read gunicorn
+          settings while old ones finish their in-flight requests (the
+          preloaded app code is kept)
+    USR2  start a new master running the new code next to the old one,
+          then send the old master TERM for a zero-downtime deploy
+    TERM  graceful shutdown, within WEB_GRACEFUL_TIMEOUT
+    TTIN / TTOU  add / remove one worker
+"""
+import logging
+import os
+
+from gunicorn.app.base import BaseApplication
+
+from app import create_app
+from app.utils.db import close_db, connect_db, init_db
+from app.utils.indexes import require_unique_indexes
+from app.utils.passwords import set_hash_workers, size_hash_workers
+from app.utils.pubsub import require_shared_pubsub
+
+logger = logging.getLogger(__name__)
+
+def size_workers(config, cpu_count=None):
+    """
+    Size the gunicorn workers and threads
+
+    Threads are capped at the MongoDB pool size, since each request thread
+    holds at most one pooled connection; workers default to 2 * CPUs + 1
+    but are capped so that workers * pool size stays within
+    MONGO_CONNECTION_BUDGET. A pool size of 0 is unbounded in pymongo, so
+    it caps neither. WEB_WORKERS and WEB_THREADS override both.
+
+    Args:
+        config: App config mapping
+        cpu_count: CPU count, os.cpu_count() by default
+
+    Returns:
+        Tuple of (workers, threads)
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    pool_size = config.get('MONGO_MAX_POOL_SIZE', 50)
+
+    threads = config.get('WEB_THREADS') or (max(1, min(pool_size, 8)) if pool_size else 8)
+
+    workers = config.get('WEB_WORKERS')
+    if not workers:
+        workers = 2 * cpu_count + 1
+        if pool_size:
+            budget = config.get('MONGO_CONNECTION_BUDGET', 500)
+            workers = max(1, min(workers, budget // pool_size))
+
+    return workers, threads
+
+def post_fork(server, worker):
+    """Connect each worker to MongoDB after it is forked"""
+    init_db(server.app.application)
+
+class Launcher(BaseApplication):
+    """gunicorn application running an already created Flask app"""
+
+    def __init__(self, application, options=None):
+        self.application = application
+        self.options = options or {}
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+def build_options(config):
+    """
+    Build the gunicorn settings from the app config
+
+    Without a shared pub/sub backend (PUBSUB_REDIS_URL) a single worker is
+    started, with a warning: leaderboard and match stream updates would
+    otherwise only reach the worker that published them.
+
+    Args:
+        config: App config mapping
+
+    Returns:
+        Dictionary of gunicorn settings
+    """
+    workers, threads = size_workers(config)
+    if workers > 1:
+        try:
+            require_shared_pubsub(config, f'to run {workers} workers')
+        except RuntimeError as e:
+            logger.warning('%s; starting 1 worker instead', e)
+            workers = 1
+    options = {
+        'bind': f"0.0.0.0:{os.environ.get('PORT', 5000)}",
+        'worker_class': 'gthread',
+        'workers': workers,
+        'threads': threads,
+        'keepalive': config.get('WEB_KEEPALIVE', 75),
+        'timeout': config.get('WEB_TIMEOUT', 30),
+        'graceful_timeout': config.get('WEB_GRACEFUL_TIMEOUT', 30),
+        'preload_app': True,
+        'post_fork': post_fork,
+        'accesslog': '-',
+    }
+    if config.get('WEB_MAX_REQUESTS'):
+        options['max_requests'] = config['WEB_MAX_REQUESTS']
+        options['max_requests_jitter'] = config['WEB_MAX_REQUESTS'] // 10
+    return options
+
+def check_indexes(config):
+    """
+    Refuse to start while a unique index the app relies on is missing
+
+    The client is closed before the workers are forked; each opens its own.
+
+    Raises:
+        RuntimeError: If an index is missing
+    """
+    db = connect_db(config)
+    try:
+        require_unique_indexes(db)
+    finally:
+        close_db()
+
+def main():
+    app = create_app(init_database=False)
+    if not app.config.get('DB_LAZY_CONNECT'):
+        check_indexes(app.config)
+    options = build_options(app.config)
+    # Each worker forks its own hashing pool: share the CPUs between them
+    set_hash_workers(size_hash_workers(app.config, options['workers']))
+    Launcher(app, options).run()
+
+if __name__ == '__main__':
+    main()
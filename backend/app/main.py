@@ -4,6 +4,7 @@ import os
 app = create_app()
 
 if __name__ == '__main__':
+    # Development server only; use `python -m app.launcher` in production
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=True)
-
+    debug = os.environ.get('FLASK_DEBUG', '').lower() in ('1', 'true')
+    app.run(host='0.0.0.0', port=port, debug=debug)
@@ -1,23 +1,63 @@
 from datetime import datetime
+from bson import ObjectId
+from pymongo import IndexModel
 
 class League:
-    def __init__(self, name, prize_pool, entry_fee, max_teams, popularity=0):
+    COLLECTION = 'leagues'
+    
+    # League listing. Free (equality on entry_fee) uses entry_fee-prefixed
+    # indexes; paid/popular (ranges) walk the sort indexes, whose trailing
+    # entry_fee/popularity keys let the filter run before documents are fetched
+    INDEXES = [
+        IndexModel([('prize_pool', -1), ('_id', -1), ('entry_fee', 1), ('popularity', 1)]),
+        IndexModel([('teams_count', -1), ('_id', -1), ('entry_fee', 1), ('popularity', 1)]),
+        IndexModel([('entry_fee', 1), ('_id', 1), ('popularity', 1)]),
+        IndexModel([('entry_fee', 1), ('prize_pool', -1), ('_id', -1)]),
+        IndexModel([('entry_fee', 1), ('teams_count', -1), ('_id', -1)]),
+    ]
+    
+    # Query shapes run by the app, with sample values, for the explain report
+    QUERY_SHAPES = [
+        {'name': 'list_free_by_prize', 'filter': {'entry_fee': 0}, 'sort': [('prize_pool', -1), ('_id', -1)], 'limit': 50},
+        {'name': 'list_paid_by_teams', 'filter': {'entry_fee': {'$gt': 0}}, 'sort': [('teams_count', -1), ('_id', -1)], 'limit': 50},
+        {'name': 'list_popular_by_entry', 'filter': {'popularity': {'$gte': 90}}, 'sort': [('entry_fee', 1), ('_id', 1)], 'limit': 50},
+        {'name': 'list_all_by_prize', 'filter': {}, 'sort': [('prize_pool', -1), ('_id', -1)], 'limit': 50},
+        {
+            'name': 'list_all_by_prize_after',
+            'filter': {'$or': [
+                {'prize_pool': {'$lt': 1000}},
+                {'prize_pool': 1000, '_id': {'$lt': ObjectId()}},
+                {'prize_pool': None}
+            ]},
+            'sort': [('prize_pool', -1), ('_id', -1)],
+            'limit': 50
+        },
+    ]
+    
+    def __init__(self, name, prize_pool, entry_fee, max_teams, popularity=0, scoring_rules=None, prize_table=None,
+                 match_id=None):
         self.name = name
+        self.match_id = match_id  # entries play with their teams for this match
         self.prize_pool = prize_pool
         self.entry_fee = entry_fee
         self.max_teams = max_teams
         self.teams_count = 0
         self.popularity = popularity
+        self.prize_table = prize_table or []  # [{'rank_from', 'rank_to', 'amount'}]
+        self.scoring_rules = scoring_rules  # rule set name or {'name', 'version'}, None for default
         self.created_at = datetime.utcnow()
     
     def to_dict(self):
         return {
             'name': self.name,
+            'match_id': self.match_id,
             'prize_pool': self.prize_pool,
             'entry_fee': self.entry_fee,
             'max_teams': self.max_teams,
             'teams_count': self.teams_count,
             'popularity': self.popularity,
+            'prize_table': self.prize_table,
+            'scoring_rules': self.scoring_rules,
             'created_at': self.created_at.isoformat()
         }
 
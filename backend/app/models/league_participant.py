@@ -0,0 +1,52 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import IndexModel
+
+class LeagueParticipant:
+    COLLECTION = 'league_participants'
+    
+    INDEXES = [
+        IndexModel([('league_id', 1), ('user_id', 1)], unique=True),
+        IndexModel([('league_id', 1), ('points', -1), ('_id', 1)]),
+        # Team totals are carried over to the entries linked to the teams
+        IndexModel([('team_id', 1)], partialFilterExpression={'team_id': {'$type': 'objectId'}}),
+    ]
+    
+    # Query shapes run by the app, with sample values, for the explain report
+    QUERY_SHAPES = [
+        {
+            'name': 'leaderboard_load',
+            'filter': {'league_id': ObjectId()},
+            'projection': {'user_id': 1, 'points': 1, 'points_version': 1}
+        },
+        {
+            'name': 'settlement_standings',
+            'filter': {'league_id': ObjectId()},
+            'sort': [('points', -1), ('_id', 1)],
+            'projection': {'user_id': 1, 'points': 1}
+        },
+        {'name': 'user_entry', 'filter': {'league_id': ObjectId(), 'user_id': ObjectId()}},
+        {
+            'name': 'team_entries',
+            'filter': {'team_id': {'$in': [ObjectId(), ObjectId()]}},
+            'projection': {'league_id': 1, 'user_id': 1, 'team_id': 1}
+        },
+    ]
+    
+    def __init__(self, league_id, user_id, team_id=None):
+        self.league_id = league_id
+        self.user_id = user_id
+        self.team_id = team_id  # user_matches ID whose points the entry scores
+        self.points = 0
+        self.points_version = 0  # leaderboard.points_version of the points
+        self.joined_at = datetime.utcnow()
+    
+    def to_dict(self):
+        return {
+            'league_id': self.league_id,
+            'user_id': self.user_id,
+            'team_id': self.team_id,
+            'points': self.points,
+            'points_version': self.points_version,
+            'joined_at': self.joined_at.isoformat()
+        }
@@ -0,0 +1,34 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import IndexModel
+
+class LedgerEntry:
+    COLLECTION = 'ledger_entries'
+    
+    INDEXES = [
+        IndexModel([('posting_id', 1), ('account', 1)], unique=True),
+        IndexModel([('account', 1), ('_id', 1)]),
+    ]
+    
+    # Query shapes run by the app, with sample values, for the explain report
+    QUERY_SHAPES = [
+        {'name': 'balance_tail', 'filter': {'account': 'user:x', '_id': {'$gte': ObjectId()}}},
+        {'name': 'compaction_window', 'filter': {'_id': {'$gte': ObjectId(), '$lt': ObjectId()}}},
+        {'name': 'opening_posted', 'filter': {'posting_id': 'opening:x'}, 'projection': {'_id': 1}},
+    ]
+    
+    def __init__(self, posting_id, account, amount_paise, description):
+        self.posting_id = posting_id
+        self.account = account
+        self.amount_paise = amount_paise
+        self.description = description
+        self.created_at = datetime.utcnow()
+    
+    def to_dict(self):
+        return {
+            'posting_id': self.posting_id,
+            'account': self.account,
+            'amount_paise': self.amount_paise,
+            'description': self.description,
+            'created_at': self.created_at.isoformat()
+        }
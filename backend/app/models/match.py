@@ -1,21 +1,37 @@
 from datetime import datetime
+from pymongo import IndexModel
 
 class Match:
-    def __init__(self, team1, team2, match_date, status='upcoming'):
+    COLLECTION = 'matches'
+    
+    INDEXES = [
+        IndexModel('status'),
+    ]
+    
+    # Query shapes run by the app, with sample values, for the explain report
+    QUERY_SHAPES = [
+        {'name': 'list_by_status', 'filter': {'status': 'live'}},
+    ]
+    
+    def __init__(self, team1, team2, match_date, status='upcoming', scoring_rules=None, players=None):
         self.team1 = team1
         self.team2 = team2
+        self.players = players or []  # squad: [{'player_id', 'name', 'role' (wk/bat/ar/bowl), 'team', 'credits'}]
         self.match_date = match_date
         self.status = status  # upcoming, live, completed
         self.score = None
+        self.scoring_rules = scoring_rules  # rule set name or {'name', 'version'}, None for default
         self.created_at = datetime.utcnow()
     
     def to_dict(self):
         return {
             'team1': self.team1,
             'team2': self.team2,
+            'players': self.players,
             'match_date': self.match_date.isoformat() if isinstance(self.match_date, datetime) else self.match_date,
             'status': self.status,
             'score': self.score,
+            'scoring_rules': self.scoring_rules,
             'created_at': self.created_at.isoformat()
         }
 
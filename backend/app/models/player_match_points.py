@@ -0,0 +1,38 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import IndexModel
+
+class PlayerMatchPoints:
+    COLLECTION = 'player_match_points'
+    
+    INDEXES = [
+        IndexModel([('match_id', 1), ('player_id', 1)], unique=True),
+    ]
+    
+    # Query shapes run by the app, with sample values, for the explain report
+    QUERY_SHAPES = [
+        {
+            'name': 'match_players',
+            'filter': {'match_id': ObjectId(), 'player_id': {'$in': ['x']}},
+            'projection': {'player_id': 1, 'points': 1, 'breakdown': 1}
+        },
+        {'name': 'stream_seed', 'filter': {'match_id': ObjectId()}, 'projection': {'player_id': 1, 'points': 1}},
+    ]
+    
+    def __init__(self, match_id, player_id, stats, points, breakdown):
+        self.match_id = match_id
+        self.player_id = player_id
+        self.stats = stats
+        self.points = points
+        self.breakdown = breakdown  # {'batting', 'bowling', 'fielding'} for the T20 rules
+        self.updated_at = datetime.utcnow()
+    
+    def to_dict(self):
+        return {
+            'match_id': self.match_id,
+            'player_id': self.player_id,
+            'stats': self.stats,
+            'points': self.points,
+            'breakdown': self.breakdown,
+            'updated_at': self.updated_at.isoformat()
+        }
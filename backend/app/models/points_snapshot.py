@@ -0,0 +1,32 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import IndexModel
+
+class PointsSnapshot:
+    COLLECTION = 'points_snapshots'
+    
+    INDEXES = [
+        IndexModel([('match_id', 1), ('innings', 1), ('over', 1)], unique=True),
+    ]
+    
+    # Query shapes run by the app, with sample values, for the explain report
+    QUERY_SHAPES = [
+        {'name': 'after_over', 'filter': {'match_id': ObjectId(), 'innings': 1, 'over': 6}},
+        {'name': 'replay', 'filter': {'match_id': ObjectId()}, 'sort': [('innings', 1), ('over', 1)]},
+    ]
+    
+    def __init__(self, match_id, innings, over, players):
+        self.match_id = match_id
+        self.innings = innings
+        self.over = over
+        self.players = players  # [{'player_id', 'points', 'breakdown'}]
+        self.created_at = datetime.utcnow()
+    
+    def to_dict(self):
+        return {
+            'match_id': self.match_id,
+            'innings': self.innings,
+            'over': self.over,
+            'players': self.players,
+            'created_at': self.created_at.isoformat()
+        }
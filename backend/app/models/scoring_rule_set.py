@@ -0,0 +1,31 @@
+from datetime import datetime
+from pymongo import IndexModel
+
+class ScoringRuleSet:
+    COLLECTION = 'scoring_rules'
+    
+    INDEXES = [
+        IndexModel([('name', 1), ('version', -1)], unique=True),
+    ]
+    
+    # Query shapes run by the app, with sample values, for the explain report
+    QUERY_SHAPES = [
+        {'name': 'latest_version', 'filter': {'name': 't20'}, 'sort': [('version', -1)], 'limit': 1},
+        {'name': 'exact_version', 'filter': {'name': 't20', 'version': 1}, 'sort': [('version', -1)], 'limit': 1},
+    ]
+    
+    def __init__(self, name, version, stats, milestones=None):
+        self.name = name
+        self.version = version
+        self.stats = stats  # [{'field', 'category', 'points'}]
+        self.milestones = milestones or []  # [{'field', 'threshold', 'bonus'}]
+        self.created_at = datetime.utcnow()
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'version': self.version,
+            'stats': self.stats,
+            'milestones': self.milestones,
+            'created_at': self.created_at.isoformat()
+        }
@@ -1,6 +1,32 @@
 from datetime import datetime
+from bson import ObjectId
+from pymongo import IndexModel
 
 class Transaction:
+    COLLECTION = 'transactions'
+    
+    INDEXES = [
+        IndexModel([('user_id', 1), ('created_at', -1), ('_id', -1)]),
+        IndexModel('idempotency_key', unique=True, sparse=True),
+    ]
+    
+    # Query shapes run by the app, with sample values, for the explain report
+    QUERY_SHAPES = [
+        {
+            'name': 'history',
+            'filter': {'user_id': ObjectId()},
+            'sort': [('created_at', -1), ('_id', -1)],
+            'limit': 50
+        },
+        {
+            'name': 'history_by_type',
+            'filter': {'user_id': ObjectId(), 'type': 'credit', 'created_at': {'$gte': datetime(2024, 1, 1)}},
+            'sort': [('created_at', -1), ('_id', -1)],
+            'limit': 50
+        },
+        {'name': 'settled_keys', 'filter': {'idempotency_key': {'$in': ['settlement:a', 'settlement:b']}}},
+    ]
+    
     def __init__(self, user_id, transaction_type, amount, description):
         self.user_id = user_id
         self.type = transaction_type  # credit, debit
@@ -1,13 +1,33 @@
 from datetime import datetime
 from bson import ObjectId
+from pymongo import IndexModel
+from app.utils.validations import identity_keys
 
 class User:
-    def __init__(self, name, email, mobile, password, wallet_balance=0.0):
+    COLLECTION = 'users'
+    
+    # One multikey unique index over the normalized email and mobile, see
+    # app.utils.validations.identity_keys; it also rejects duplicate signups
+    INDEXES = [
+        IndexModel('identities', unique=True),
+    ]
+    
+    # Query shapes run by the app, with sample values, for the explain report
+    QUERY_SHAPES = [
+        {'name': 'login', 'filter': {'identities': 'a@b.c'}},
+    ]
+    
+    # Fields of a user document that may be sent to clients
+    PUBLIC_FIELDS = ('name', 'email', 'mobile', 'wallet_balance', 'created_at')
+    
+    def __init__(self, name, email, mobile, password, wallet_paise=0):
         self.name = name
         self.email = email
         self.mobile = mobile
-        self.password = password
-        self.wallet_balance = wallet_balance
+        self.identities = identity_keys(email, mobile)
+        self.password = password  # scrypt hash from app.utils.passwords
+        self.wallet_paise = wallet_paise  # authoritative, see app.services.ledger
+        self.wallet_balance = wallet_paise / 100
         self.created_at = datetime.utcnow()
     
     def to_dict(self):
@@ -26,7 +46,7 @@ class User:
             email=data.get('email'),
             mobile=data.get('mobile'),
             password=data.get('password'),
-            wallet_balance=data.get('wallet_balance', 0.0)
+            wallet_paise=data.get('wallet_paise', 0)
         )
         return user
 
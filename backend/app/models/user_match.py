@@ -0,0 +1,53 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import IndexModel
+
+class UserMatch:
+    COLLECTION = 'user_matches'
+    
+    INDEXES = [
+        IndexModel([('user_id', 1), ('status', 1)]),
+        # Match completion reads a match's teams in _id ranges
+        IndexModel([('match_id', 1), ('_id', 1)]),
+        # Duplicate lineup guard, also counts a user's teams in a match
+        IndexModel(
+            [('user_id', 1), ('match_id', 1), ('lineup_hash', 1)],
+            unique=True,
+            partialFilterExpression={'lineup_hash': {'$type': 'string'}}
+        ),
+    ]
+    
+    # Query shapes run by the app, with sample values, for the explain report
+    QUERY_SHAPES = [
+        {'name': 'my_matches', 'filter': {'user_id': ObjectId()}},
+        {'name': 'my_matches_by_status', 'filter': {'user_id': ObjectId(), 'status': 'live'}},
+        {
+            'name': 'match_team_count',
+            'filter': {'user_id': ObjectId(), 'match_id': ObjectId(), 'lineup_hash': {'$type': 'string'}}
+        },
+        {
+            'name': 'completion_chunks',
+            'filter': {'match_id': ObjectId(), '_id': {'$gt': ObjectId()}},
+            'sort': [('_id', 1)],
+            'projection': {'players.player_id': 1}
+        },
+        {'name': 'live_scorer_teams', 'filter': {'match_id': ObjectId()}, 'projection': {'players.player_id': 1}},
+    ]
+    
+    def __init__(self, user_id, match_id, players, status='upcoming', lineup_hash=None):
+        self.user_id = user_id
+        self.match_id = match_id
+        self.players = players  # [{'player_id', ...}]
+        self.lineup_hash = lineup_hash  # team_builder.lineup_hash of the player IDs
+        self.status = status  # upcoming, live, completed
+        self.created_at = datetime.utcnow()
+    
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'match_id': self.match_id,
+            'players': self.players,
+            'lineup_hash': self.lineup_hash,
+            'status': self.status,
+            'created_at': self.created_at.isoformat()
+        }
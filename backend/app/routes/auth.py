@@ -1,10 +1,13 @@
 from flask import Blueprint, request, jsonify
 from app.models.user import User
-from app.utils.jwt_helper import generate_token, verify_token
-from app.utils.validations import validate_email, validate_mobile
+from app.utils.jwt_helper import generate_token
+from app.utils.auth import get_current_user
+from app.utils.validations import validate_email, validate_mobile, identity_keys, normalize_identity
 from app.utils.db import get_db
-from app.utils.json_encoder import clean_document
+from app.utils.passwords import hash_password, verify_password, PasswordHasherBusy
+from app.utils.json_encoder import serialize_document
 from datetime import datetime
+from pymongo.errors import DuplicateKeyError
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -12,47 +15,44 @@ auth_bp = Blueprint('auth', __name__)
 def register():
     """User registration endpoint"""
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Invalid registration'}), 400
         
         # Validation
-        if not data.get('email') or not validate_email(data.get('email')):
+        if not isinstance(data.get('email'), str) or not validate_email(data['email']):
             return jsonify({'error': 'Invalid email'}), 400
         
-        if not data.get('password') or len(data.get('password')) < 6:
+        if not isinstance(data.get('password'), str) or len(data['password']) < 6:
             return jsonify({'error': 'Password must be at least 6 characters'}), 400
         
-        if not data.get('name'):
+        if not isinstance(data.get('name'), str) or not data['name']:
             return jsonify({'error': 'Name is required'}), 400
         
-        if not data.get('mobile') or not validate_mobile(data.get('mobile')):
+        if not isinstance(data.get('mobile'), (str, int)) or not validate_mobile(data['mobile']):
             return jsonify({'error': 'Invalid mobile number'}), 400
         
-        # Check if user exists
+        # Create new user - the unique identities index rejects an existing email or mobile
         db = get_db()
-        existing_user = db.users.find_one({'email': data['email']})
-        if existing_user:
-            return jsonify({'error': 'User already exists'}), 400
-        
-        # Create new user
         user_data = {
             'name': data['name'],
             'email': data['email'],
             'mobile': data['mobile'],
-            'password': data['password'],  # In production, hash this
+            'identities': identity_keys(data['email'], data['mobile']),
+            'password': hash_password(data['password']),
+            'wallet_paise': 0,
             'wallet_balance': 0.0,
             'created_at': datetime.utcnow()
         }
         
-        result = db.users.insert_one(user_data)
+        try:
+            result = db.users.insert_one(user_data)
+        except DuplicateKeyError:
+            return jsonify({'error': 'User already exists'}), 400
         user_id = str(result.inserted_id)
         
-        # Get the created user and clean it
-        created_user = db.users.find_one({'_id': result.inserted_id})
-        cleaned_user = clean_document(created_user)
-        
-        # Remove password
-        if 'password' in cleaned_user:
-            del cleaned_user['password']
+        # The inserted document is the created user - the password is excluded at encode time
+        cleaned_user = serialize_document(user_data, User.PUBLIC_FIELDS)
         
         # Generate token
         token = generate_token(user_id)
@@ -63,6 +63,8 @@ def register():
             'user': cleaned_user
         }), 201
         
+    except PasswordHasherBusy:
+        return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -70,33 +72,43 @@ def register():
 def login():
     """User login endpoint"""
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Email/mobile and password are required'}), 400
         email_or_mobile = data.get('email') or data.get('mobile')
         password = data.get('password')
         
         if not email_or_mobile or not password:
             return jsonify({'error': 'Email/mobile and password are required'}), 400
         
+        # The hasher only takes strings: anything else is a bad request, not a 500
+        if not isinstance(email_or_mobile, (str, int)) or not isinstance(password, str):
+            return jsonify({'error': 'Email/mobile and password must be strings'}), 400
+        
         db = get_db()
-        user = db.users.find_one({
-            '$or': [
-                {'email': email_or_mobile},
-                {'mobile': email_or_mobile}
-            ],
-            'password': password
-        })
+        user = db.users.find_one({'identities': normalize_identity(email_or_mobile)})
         
         if not user:
             return jsonify({'error': 'Invalid credentials'}), 401
         
-        user_id = str(user['_id'])
+        matches, needs_rehash = verify_password(password, user.get('password'))
+        if not matches:
+            return jsonify({'error': 'Invalid credentials'}), 401
         
-        # Clean user - convert ObjectIds and datetimes
-        cleaned_user = clean_document(user)
+        if needs_rehash:
+            # Upgrade plaintext or outdated hashes; skip if the password changed meanwhile
+            try:
+                db.users.update_one(
+                    {'_id': user['_id'], 'password': user['password']},
+                    {'$set': {'password': hash_password(password)}}
+                )
+            except PasswordHasherBusy:
+                pass  # retried on the next login
+        
+        user_id = str(user['_id'])
         
-        # Remove password
-        if 'password' in cleaned_user:
-            del cleaned_user['password']
+        # Serialize user - the password is excluded at encode time
+        cleaned_user = serialize_document(user, User.PUBLIC_FIELDS)
         
         token = generate_token(user_id)
         
@@ -106,6 +118,8 @@ def login():
             'user': cleaned_user
         }), 200
         
+    except PasswordHasherBusy:
+        return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -117,13 +131,12 @@ def verify():
         if not token:
             return jsonify({'error': 'Token required'}), 401
         
-        token = token.replace('Bearer ', '')
-        user_id = verify_token(token)
+        user_id = get_current_user()
         
         if not user_id:
             return jsonify({'error': 'Invalid token'}), 401
         
-        return jsonify({'valid': True, 'user_id': user_id}), 200
+        return jsonify({'valid': True, 'user_id': str(user_id)}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
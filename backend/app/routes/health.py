@@ -0,0 +1,28 @@
+from flask import Blueprint, current_app, jsonify
+from app.utils.db import get_db, pool_metrics, ping_db
+from app.utils.indexes import unique_indexes_ready
+
+health_bp = Blueprint('health', __name__)
+
+@health_bp.route('/live', methods=['GET'])
+def live():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({'status': 'ok'}), 200
+
+@health_bp.route('/ready', methods=['GET'])
+def ready():
+    """Readiness probe: MongoDB is connected and answering, with the unique indexes built"""
+    if not ping_db(current_app.config.get('READINESS_TIMEOUT', 1.0)):
+        return jsonify({'status': 'unavailable', 'database': 'disconnected'}), 503
+    if not unique_indexes_ready(get_db()):
+        return jsonify({'status': 'unavailable', 'database': 'connected', 'indexes': 'missing'}), 503
+    return jsonify({'status': 'ready', 'database': 'connected'}), 200
+
+@health_bp.route('/pool', methods=['GET'])
+def get_pool_metrics():
+    """Get this worker's MongoDB connection pool checkout metrics"""
+    return jsonify({
+        'max_pool_size': current_app.config.get('MONGO_MAX_POOL_SIZE'),
+        'wait_queue_timeout_ms': current_app.config.get('MONGO_WAIT_QUEUE_TIMEOUT_MS'),
+        'pool': pool_metrics.snapshot()
+    }), 200
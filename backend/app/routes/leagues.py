@@ -1,53 +1,49 @@
+from bson import ObjectId
 from flask import Blueprint, request, jsonify
-from app.utils.jwt_helper import verify_token
+from app.utils.auth import get_current_user
 from app.utils.db import get_db
-from app.utils.json_encoder import clean_document
-from bson import ObjectId
+from app.utils.json_encoder import serialize_document
+from app.utils.cache import cached_response, invalidate_leagues
+from app.utils.pagination import encode_cursor, decode_cursor, parse_limit
+from app.services.leaderboard import get_leaderboard
+from app.services.leagues import (
+    join_league as join_league_entry,
+    list_leagues,
+    LEAGUE_NOT_FOUND,
+    LEAGUE_FULL,
+    INSUFFICIENT_BALANCE,
+    ALREADY_JOINED,
+    TEAM_NOT_FOUND,
+)
 
 leagues_bp = Blueprint('leagues', __name__)
 
-def get_current_user():
-    """Helper to get current user from token"""
-    token = request.headers.get('Authorization', '').replace('Bearer ', '')
-    if not token:
-        return None
-    user_id = verify_token(token)
-    if user_id:
-        return ObjectId(user_id)
-    return None
-
 @leagues_bp.route('/', methods=['GET'])
+@cached_response(tags=('leagues',))
 def get_leagues():
     """Get all leagues"""
     try:
         filter_type = request.args.get('filter', 'all')  # all, free, paid, popular
         sort_by = request.args.get('sort', 'prize')  # prize, teams, entry
+        limit = parse_limit(request.args.get('limit'), default=50)
+        cursor = request.args.get('cursor')
         
         db = get_db()
-        query = {}
-        
-        if filter_type == 'free':
-            query['entry_fee'] = 0
-        elif filter_type == 'paid':
-            query['entry_fee'] = {'$gt': 0}
-        elif filter_type == 'popular':
-            query['popularity'] = {'$gte': 90}
-        
-        leagues = list(db.leagues.find(query))
-        
-        # Sort
-        if sort_by == 'prize':
-            leagues.sort(key=lambda x: x.get('prize_pool', 0), reverse=True)
-        elif sort_by == 'teams':
-            leagues.sort(key=lambda x: x.get('teams_count', 0), reverse=True)
-        elif sort_by == 'entry':
-            leagues.sort(key=lambda x: x.get('entry_fee', 0))
+        leagues, next_cursor = list_leagues(
+            db, filter_type, sort_by, limit,
+            decode_cursor(cursor) if cursor else None
+        )
         
-        # Clean all leagues - convert ObjectIds and datetimes
-        cleaned_leagues = [clean_document(league) for league in leagues]
+        # Serialize all leagues - ObjectIds and datetimes are converted at encode time
+        cleaned_leagues = [serialize_document(league) for league in leagues]
         
-        return jsonify({'leagues': cleaned_leagues}), 200
+        return jsonify({
+            'leagues': cleaned_leagues,
+            'next_cursor': encode_cursor(next_cursor) if next_cursor else None
+        }), 200
         
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor or limit'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -59,33 +55,85 @@ def join_league(league_id):
         if not user_id:
             return jsonify({'error': 'Unauthorized'}), 401
         
+        data = request.get_json(silent=True) or {}
+        
         db = get_db()
-        league = db.leagues.find_one({'_id': ObjectId(league_id)})
+        outcome, _ = join_league_entry(db, league_id, user_id, data.get('team_id'))
         
-        if not league:
+        if outcome == LEAGUE_NOT_FOUND:
             return jsonify({'error': 'League not found'}), 404
-        
-        # Check if user has enough balance
-        user = db.users.find_one({'_id': user_id})
-        if user['wallet_balance'] < league.get('entry_fee', 0):
+        if outcome == LEAGUE_FULL:
+            return jsonify({'error': 'League is full'}), 400
+        if outcome == INSUFFICIENT_BALANCE:
             return jsonify({'error': 'Insufficient balance'}), 400
+        if outcome == ALREADY_JOINED:
+            return jsonify({'error': 'Already joined this league'}), 400
+        if outcome == TEAM_NOT_FOUND:
+            return jsonify({'error': 'Team not found'}), 400
         
-        # Deduct entry fee
-        db.users.update_one(
-            {'_id': user_id},
-            {'$inc': {'wallet_balance': -league.get('entry_fee', 0)}}
-        )
-        
-        # Add user to league
-        from datetime import datetime
-        db.league_participants.insert_one({
-            'league_id': ObjectId(league_id),
-            'user_id': user_id,
-            'joined_at': datetime.utcnow()
-        })
+        # teams_count changed; other workers only see it through a shared
+        # cache backend, else once their cached listing expires
+        invalidate_leagues()
         
         return jsonify({'message': 'Successfully joined league'}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+@leagues_bp.route('/<league_id>/leaderboard', methods=['GET'])
+def get_league_leaderboard(league_id):
+    """Get a league's leaderboard"""
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+        
+        if not ObjectId.is_valid(league_id):
+            return jsonify({'error': 'League not found'}), 404
+        
+        db = get_db()
+        leaderboard = get_leaderboard(db, league_id)
+        if leaderboard is None:
+            return jsonify({'error': 'League not found'}), 404
+        
+        # Entries around the current user's best entry
+        if request.args.get('around') == 'me':
+            user_id = get_current_user()
+            if not user_id:
+                return jsonify({'error': 'Unauthorized'}), 401
+            
+            entry_ids = leaderboard.get_user_entries(user_id)
+            if not entry_ids:
+                return jsonify({'error': 'Not joined'}), 404
+            
+            entry_id = min(entry_ids, key=leaderboard.rank)
+            return jsonify({
+                'entries': leaderboard.around(entry_id, limit // 2),
+                'rank': leaderboard.rank(entry_id),
+                'total': len(leaderboard)
+            }), 200
+        
+        if cursor:
+            points, entry_id = decode_cursor(cursor)
+            # Reject tampered cursors before they reach the sorted index
+            if isinstance(points, bool) or not isinstance(points, (int, float)) \
+                    or not isinstance(entry_id, str) or not ObjectId.is_valid(entry_id):
+                raise ValueError('Invalid cursor')
+            entries = leaderboard.page_after(points, entry_id, limit)
+        else:
+            entries = leaderboard.top(limit)
+        
+        next_cursor = None
+        if len(entries) == limit:
+            next_cursor = encode_cursor([entries[-1]['points'], entries[-1]['id']])
+        
+        return jsonify({
+            'entries': entries,
+            'next_cursor': next_cursor,
+            'total': len(leaderboard)
+        }), 200
+        
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor or limit'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,38 +1,37 @@
 from flask import Blueprint, request, jsonify
-from app.utils.jwt_helper import verify_token
+from app.utils.auth import get_current_user
 from app.utils.db import get_db
-from app.utils.json_encoder import clean_document
+from app.utils.json_encoder import serialize_document
+from app.utils.cache import cached_response
+from app.services.matches import build_matches_query, build_user_matches_query
+from app.services.team_builder import (
+    create_teams,
+    CREATED,
+    MATCH_NOT_FOUND,
+    MATCH_LOCKED,
+    TOO_MANY_TEAMS,
+    MAX_TEAMS_PER_MATCH,
+)
+from app.services.live_scoring import get_match_player_points
+from app.services.player_points import get_points_after_over, iter_replay
 from datetime import datetime
 from bson import ObjectId
+from bson.errors import InvalidId
 
 matches_bp = Blueprint('matches', __name__)
 
-def get_current_user():
-    """Helper to get current user from token"""
-    token = request.headers.get('Authorization', '').replace('Bearer ', '')
-    if not token:
-        return None
-    user_id = verify_token(token)
-    if user_id:
-        return ObjectId(user_id)
-    return None
-
 @matches_bp.route('/', methods=['GET'])
+@cached_response(tags=('matches',))
 def get_matches():
     """Get all matches"""
     try:
         status = request.args.get('status', 'all')  # all, upcoming, live, completed
         
         db = get_db()
-        query = {}
-        
-        if status != 'all':
-            query['status'] = status
+        matches = list(db.matches.find(build_matches_query(status)))
         
-        matches = list(db.matches.find(query))
-        
-        # Clean all matches - convert ObjectIds and datetimes
-        cleaned_matches = [clean_document(match) for match in matches]
+        # Serialize all matches - ObjectIds and datetimes are converted at encode time
+        cleaned_matches = [serialize_document(match) for match in matches]
         
         return jsonify({'matches': cleaned_matches}), 200
         
@@ -40,6 +39,7 @@ def get_matches():
         return jsonify({'error': str(e)}), 500
 
 @matches_bp.route('/<match_id>', methods=['GET'])
+@cached_response(tags=('match:{match_id}',))
 def get_match(match_id):
     """Get match by ID"""
     try:
@@ -49,8 +49,8 @@ def get_match(match_id):
         if not match:
             return jsonify({'error': 'Match not found'}), 404
         
-        # Clean match - convert ObjectIds and datetimes
-        cleaned_match = clean_document(match)
+        # Serialize match - ObjectIds and datetimes are converted at encode time
+        cleaned_match = serialize_document(match)
         
         return jsonify({'match': cleaned_match}), 200
         
@@ -68,18 +68,90 @@ def get_my_matches():
         status = request.args.get('status', 'all')
         
         db = get_db()
-        query = {'user_id': user_id}
+        user_matches = list(db.user_matches.find(build_user_matches_query(user_id, status)))
         
-        if status != 'all':
-            query['status'] = status
+        # Serialize all user matches - ObjectIds and datetimes are converted at encode time
+        cleaned_matches = [serialize_document(match) for match in user_matches]
         
-        user_matches = list(db.user_matches.find(query))
+        return jsonify({'matches': cleaned_matches}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@matches_bp.route('/<match_id>/teams', methods=['POST'])
+def create_match_teams(match_id):
+    """Create one or more fantasy teams for a match"""
+    try:
+        user_id = get_current_user()
+        if not user_id:
+            return jsonify({'error': 'Unauthorized'}), 401
         
-        # Clean all user matches - convert ObjectIds and datetimes
-        cleaned_matches = [clean_document(match) for match in user_matches]
+        data = request.get_json(silent=True) or {}
+        # A batch as {"teams": [{"players": [...]}, ...]} or one team as {"players": [...]}
+        teams = data.get('teams') if 'teams' in data else [data]
+        if not isinstance(teams, list) or not teams or not all(
+            isinstance(team, dict) and isinstance(team.get('players'), list) for team in teams
+        ):
+            return jsonify({'error': 'Teams must be given as lists of player IDs'}), 400
+        
+        try:
+            ObjectId(match_id)
+        except InvalidId:
+            return jsonify({'error': 'Match not found'}), 404
         
-        return jsonify({'matches': cleaned_matches}), 200
+        db = get_db()
+        outcome, results = create_teams(db, match_id, user_id, [team['players'] for team in teams])
+        
+        if outcome == MATCH_NOT_FOUND:
+            return jsonify({'error': 'Match not found'}), 404
+        if outcome == MATCH_LOCKED:
+            return jsonify({'error': 'Match has already started'}), 400
+        if outcome == TOO_MANY_TEAMS:
+            return jsonify({'error': f'At most {MAX_TEAMS_PER_MATCH} teams per match'}), 400
+        
+        created = any(result['status'] == CREATED for result in results)
+        return jsonify({'teams': results}), 201 if created else 400
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@matches_bp.route('/<match_id>/points', methods=['GET'])
+def get_match_points(match_id):
+    """Get players' fantasy points in a match, now or after a given over"""
+    try:
+        db = get_db()
+        innings = request.args.get('innings')
+        over = request.args.get('over')
+        
+        if (innings is None) != (over is None):
+            return jsonify({'error': 'innings and over must be given together'}), 400
+        
+        if innings is not None:
+            if not (innings.isdigit() and over.isdigit()):
+                return jsonify({'error': 'innings and over must be integers'}), 400
+            innings, over = int(innings), int(over)
+            snapshot = get_points_after_over(db, match_id, innings, over)
+            if not snapshot:
+                return jsonify({'error': 'No snapshot for that over'}), 404
+            return jsonify({'snapshot': snapshot}), 200
+        
+        player_ids = request.args.get('players')
+        players = get_match_player_points(db, match_id, player_ids.split(',') if player_ids else None)
+        return jsonify({'players': players}), 200
+        
+    except InvalidId:
+        return jsonify({'error': 'Match not found'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@matches_bp.route('/<match_id>/replay', methods=['GET'])
+def get_match_replay(match_id):
+    """Get every over's player points snapshot, in play order"""
+    try:
+        db = get_db()
+        return jsonify({'overs': list(iter_replay(db, match_id))}), 200
+        
+    except InvalidId:
+        return jsonify({'error': 'Match not found'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
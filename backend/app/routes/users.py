@@ -1,21 +1,13 @@
 from flask import Blueprint, request, jsonify
-from app.utils.jwt_helper import verify_token
+from app.utils.auth import get_current_user
 from app.utils.db import get_db
-from app.utils.json_encoder import clean_document
-from bson import ObjectId
+from app.utils.json_encoder import serialize_document
+from app.models.user import User
+from app.utils.validations import identity_keys, normalize_mobile, validate_email, validate_mobile
+from pymongo.errors import DuplicateKeyError
 
 users_bp = Blueprint('users', __name__)
 
-def get_current_user():
-    """Helper to get current user from token"""
-    token = request.headers.get('Authorization', '').replace('Bearer ', '')
-    if not token:
-        return None
-    user_id = verify_token(token)
-    if user_id:
-        return ObjectId(user_id)
-    return None
-
 @users_bp.route('/profile', methods=['GET'])
 def get_profile():
     """Get user profile"""
@@ -25,17 +17,13 @@ def get_profile():
             return jsonify({'error': 'Unauthorized'}), 401
         
         db = get_db()
-        user = db.users.find_one({'_id': user_id})
+        user = db.users.find_one({'_id': user_id}, {field: 1 for field in User.PUBLIC_FIELDS})
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        # Clean user - convert ObjectIds and datetimes
-        cleaned_user = clean_document(user)
-        
-        # Remove password if present
-        if 'password' in cleaned_user:
-            del cleaned_user['password']
+        # Serialize user - the password is excluded at encode time
+        cleaned_user = serialize_document(user, User.PUBLIC_FIELDS)
         
         return jsonify({'user': cleaned_user}), 200
         
@@ -50,21 +38,57 @@ def update_profile():
         if not user_id:
             return jsonify({'error': 'Unauthorized'}), 401
         
-        data = request.get_json()
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Invalid profile'}), 400
         db = get_db()
         
+        # Same rules as registration; the mobile is stored in its canonical
+        # 10-digit form, so '+91 98765-43210' is accepted as 9876543210
         update_data = {}
         if 'name' in data:
-            update_data['name'] = data['name']
+            if not isinstance(data['name'], str) or not data['name'].strip():
+                return jsonify({'error': 'Name is required'}), 400
+            update_data['name'] = data['name'].strip()
         if 'email' in data:
-            update_data['email'] = data['email']
+            if not isinstance(data['email'], str) or not validate_email(data['email'].strip()):
+                return jsonify({'error': 'Invalid email'}), 400
+            update_data['email'] = data['email'].strip()
         if 'mobile' in data:
-            update_data['mobile'] = data['mobile']
+            if not isinstance(data['mobile'], (str, int)) or not validate_mobile(normalize_mobile(data['mobile'])):
+                return jsonify({'error': 'Invalid mobile number'}), 400
+            update_data['mobile'] = normalize_mobile(data['mobile'])
+        
+        if not update_data:
+            return jsonify({'message': 'Profile updated successfully'}), 200
+        
+        query = {'_id': user_id}
+        if 'email' in update_data or 'mobile' in update_data:
+            # Keep the login identities in step with the email and mobile
+            current = db.users.find_one({'_id': user_id}, {'email': 1, 'mobile': 1})
+            if not current:
+                return jsonify({'error': 'User not found'}), 404
+            identities = identity_keys(
+                update_data.get('email', current.get('email', '')),
+                update_data.get('mobile', current.get('mobile', ''))
+            )
+            # The unique identities index is the guard against races; this
+            # reports a taken email or mobile without writing
+            if db.users.find_one({'identities': {'$in': identities}, '_id': {'$ne': user_id}}, {'_id': 1}):
+                return jsonify({'error': 'Email or mobile already in use'}), 400
+            update_data['identities'] = identities
+            # Only apply over the email and mobile the identities were built from
+            query['email'] = current.get('email')
+            query['mobile'] = current.get('mobile')
         
-        db.users.update_one(
-            {'_id': user_id},
-            {'$set': update_data}
-        )
+        try:
+            result = db.users.update_one(query, {'$set': update_data})
+        except DuplicateKeyError:
+            return jsonify({'error': 'Email or mobile already in use'}), 400
+        if result.matched_count == 0:
+            if 'identities' not in update_data:
+                return jsonify({'error': 'User not found'}), 404
+            return jsonify({'error': 'Profile changed concurrently, please retry'}), 409
         
         return jsonify({'message': 'Profile updated successfully'}), 200
         
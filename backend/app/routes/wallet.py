@@ -1,21 +1,22 @@
-from flask import Blueprint, request, jsonify
-from app.utils.jwt_helper import verify_token
+import csv
+import io
+import uuid
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from app.utils.auth import get_current_user
 from app.utils.db import get_db
-from app.utils.json_encoder import clean_document
-from bson import ObjectId
+from app.utils.json_encoder import serialize_document, encode_json
+from app.utils.pagination import encode_cursor, decode_cursor, parse_limit
+from app.services.ledger import post, to_paise, user_account, DEPOSITS_ACCOUNT
+from app.services.wallet import (
+    build_transactions_query,
+    list_transactions,
+    iter_transactions,
+    format_timestamp,
+    TRANSACTION_FIELDS,
+)
 
 wallet_bp = Blueprint('wallet', __name__)
 
-def get_current_user():
-    """Helper to get current user from token"""
-    token = request.headers.get('Authorization', '').replace('Bearer ', '')
-    if not token:
-        return None
-    user_id = verify_token(token)
-    if user_id:
-        return ObjectId(user_id)
-    return None
-
 @wallet_bp.route('/balance', methods=['GET'])
 def get_balance():
     """Get wallet balance"""
@@ -25,7 +26,7 @@ def get_balance():
             return jsonify({'error': 'Unauthorized'}), 401
         
         db = get_db()
-        user = db.users.find_one({'_id': user_id})
+        user = db.users.find_one({'_id': user_id}, {'wallet_balance': 1})
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -37,6 +38,16 @@ def get_balance():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def transactions_query(user_id, cursor=None):
+    """Build the transaction history query from the request's filters"""
+    return build_transactions_query(
+        user_id,
+        transaction_type=request.args.get('type'),
+        date_from=request.args.get('from'),
+        date_to=request.args.get('to'),
+        cursor=cursor
+    )
+
 @wallet_bp.route('/transactions', methods=['GET'])
 def get_transactions():
     """Get wallet transactions"""
@@ -45,14 +56,72 @@ def get_transactions():
         if not user_id:
             return jsonify({'error': 'Unauthorized'}), 401
         
+        limit = parse_limit(request.args.get('limit'), default=50)
+        cursor = request.args.get('cursor')
+        query = transactions_query(user_id, decode_cursor(cursor) if cursor else None)
+        
+        db = get_db()
+        transactions, next_cursor = list_transactions(db, query, limit)
+        
+        # Serialize all transactions - ObjectIds and datetimes are converted at encode time
+        cleaned_transactions = [serialize_document(transaction) for transaction in transactions]
+        
+        return jsonify({
+            'transactions': cleaned_transactions,
+            'next_cursor': encode_cursor(next_cursor) if next_cursor else None
+        }), 200
+        
+    except ValueError:
+        return jsonify({'error': 'Invalid filter, cursor or limit'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@wallet_bp.route('/transactions/export', methods=['GET'])
+def export_transactions():
+    """Stream the full wallet statement as NDJSON or CSV"""
+    try:
+        user_id = get_current_user()
+        if not user_id:
+            return jsonify({'error': 'Unauthorized'}), 401
+        
+        export_format = request.args.get('format', 'ndjson')  # ndjson, csv
+        if export_format not in ('ndjson', 'csv'):
+            return jsonify({'error': 'Invalid format'}), 400
+        
+        query = transactions_query(user_id)
         db = get_db()
-        transactions = list(db.transactions.find({'user_id': user_id}))
         
-        # Clean all transactions - convert ObjectIds and datetimes
-        cleaned_transactions = [clean_document(transaction) for transaction in transactions]
+        def generate_ndjson():
+            for transaction in iter_transactions(db, query):
+                yield encode_json(serialize_document(transaction)) + b'\n'
         
-        return jsonify({'transactions': cleaned_transactions}), 200
+        def generate_csv():
+            columns = ('id',) + TRANSACTION_FIELDS
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            for transaction in iter_transactions(db, query):
+                row = serialize_document(transaction)
+                row['created_at'] = format_timestamp(row.get('created_at'))
+                writer.writerow([row.get(column, '') for column in columns])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
         
+        if export_format == 'csv':
+            body, mimetype = generate_csv(), 'text/csv'
+        else:
+            body, mimetype = generate_ndjson(), 'application/x-ndjson'
+        
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename=transactions.{export_format}'}
+        )
+        
+    except ValueError:
+        return jsonify({'error': 'Invalid filter'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -65,29 +134,22 @@ def add_money():
             return jsonify({'error': 'Unauthorized'}), 401
         
         data = request.get_json()
-        amount = float(data.get('amount', 0))
+        amount = to_paise(data.get('amount', 0))
         
         if amount <= 0:
             return jsonify({'error': 'Invalid amount'}), 400
         
-        db = get_db()
+        # Clients may send an Idempotency-Key so a retried request is applied once
+        idempotency_key = request.headers.get('Idempotency-Key') or uuid.uuid4().hex
         
-        # Update balance
-        db.users.update_one(
-            {'_id': user_id},
-            {'$inc': {'wallet_balance': amount}}
+        db = get_db()
+        post(
+            db,
+            f'deposit:{user_id}:{idempotency_key}',
+            [(user_account(user_id), amount), (DEPOSITS_ACCOUNT, -amount)],
+            'Money added to wallet'
         )
         
-        # Create transaction record
-        from datetime import datetime
-        db.transactions.insert_one({
-            'user_id': user_id,
-            'type': 'credit',
-            'amount': amount,
-            'description': 'Money added to wallet',
-            'created_at': datetime.utcnow()
-        })
-        
         return jsonify({'message': 'Money added successfully'}), 200
         
     except Exception as e:
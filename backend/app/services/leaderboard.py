@@ -0,0 +1,414 @@
+"""
+League leaderboard service
+
+Each league's standings are kept in process as an order-statistic index
+(a sorted list keyed by points) and persisted as the `points` field of its
+`league_participants` entries. An entry scores the points of the fantasy
+team (`user_matches`) it is linked to.
+
+A worker loads a league's leaderboard from the database once, on first
+use, and from then on follows the changes published over the pub/sub
+backend by whichever process writes them (a join, match completion, the
+live scorer). It keeps the LEADERBOARD_MAX_LEAGUES most recently used
+leagues; an evicted one is loaded again when next asked for.
+
+Totals are absolute and versioned by the time they were written
+(`points_version`, nanoseconds): an update applied twice is harmless, and
+an older total delivered after a newer one is ignored, by the database
+and by every leaderboard.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from sortedcontainers import SortedList
+
+from app.utils.db import read_primary
+from app.utils.json_encoder import encode_json
+from app.utils.pubsub import get_pubsub_backend
+
+# Leaderboards kept per process, least recently used evicted first
+LEADERBOARD_MAX_LEAGUES = 1000
+
+_leaderboards = OrderedDict()
+# Leagues being loaded, by league ID
+_loading = {}
+_leaderboards_lock = threading.Lock()
+
+# (process ID, pub/sub backend) this process follows updates on; a worker
+# forked after subscribing, or a replaced backend, needs a new subscription
+_following = None
+
+class Leaderboard:
+    """
+    Order-statistic index of one league's entries
+
+    Entries are ordered by points descending, then by entry ID. Ranks are
+    competition ranks: tied entries share the rank of the first of them.
+    Updates, rank lookups and page reads are O(log n).
+    """
+
+    def __init__(self, league_id, entries=()):
+        """
+        Args:
+            league_id: League ID
+            entries: Iterable of (entry_id, user_id, points, version) tuples
+        """
+        self.league_id = str(league_id)
+        self._lock = threading.RLock()
+        self._keys = SortedList()
+        self._entries = {}
+        self._user_entries = {}
+
+        for entry_id, user_id, points, version in entries:
+            self.set_points(entry_id, points, user_id, version)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def set_points(self, entry_id, points, user_id=None, version=0):
+        """
+        Insert an entry or move it to a new points total
+
+        Args:
+            entry_id: League participant entry ID
+            points: New points total
+            user_id: User ID, required when the entry is new
+            version: Version of the total; one older than the entry's
+                current total is ignored
+
+        Returns:
+            False if the total was ignored as stale, else True
+        """
+        entry_id = str(entry_id)
+        with self._lock:
+            current = self._entries.get(entry_id)
+            if current is not None:
+                if version < current[2]:
+                    return False
+                self._keys.remove((-current[0], entry_id))
+                user_id = current[1]
+            else:
+                user_id = str(user_id)
+                self._user_entries.setdefault(user_id, set()).add(entry_id)
+
+            self._entries[entry_id] = (points, user_id, version)
+            self._keys.add((-points, entry_id))
+            return True
+
+    def add_points(self, entry_id, delta):
+        """
+        Change an entry's points by a delta
+
+        Returns:
+            The entry's new points total, or None if the entry is unknown
+        """
+        entry_id = str(entry_id)
+        with self._lock:
+            current = self._entries.get(entry_id)
+            if current is None:
+                return None
+            self.set_points(entry_id, current[0] + delta, version=current[2])
+            return current[0] + delta
+
+    def remove(self, entry_id):
+        """Remove an entry from the leaderboard"""
+        entry_id = str(entry_id)
+        with self._lock:
+            current = self._entries.pop(entry_id, None)
+            if current is None:
+                return
+            self._keys.remove((-current[0], entry_id))
+            self._user_entries.get(current[1], set()).discard(entry_id)
+
+    def rank(self, entry_id):
+        """
+        Get the rank of an entry
+
+        Returns:
+            1-based competition rank, or None if the entry is unknown
+        """
+        with self._lock:
+            current = self._entries.get(str(entry_id))
+            if current is None:
+                return None
+            return self._keys.bisect_left((-current[0],)) + 1
+
+    def get_user_entries(self, user_id):
+        """Get the IDs of a user's entries in this league"""
+        with self._lock:
+            return sorted(self._user_entries.get(str(user_id), ()))
+
+    def _describe(self, position):
+        negative_points, entry_id = self._keys[position]
+        points, user_id, _ = self._entries[entry_id]
+        return {
+            'id': entry_id,
+            'user_id': user_id,
+            'points': points,
+            'rank': self._keys.bisect_left((negative_points,)) + 1
+        }
+
+    def top(self, k):
+        """Get the k best entries"""
+        with self._lock:
+            return [self._describe(position) for position in range(min(k, len(self._keys)))]
+
+    def page_after(self, points, entry_id, limit):
+        """
+        Get the entries ordered after a given (points, entry ID) key
+
+        Args:
+            points: Points of the last entry of the previous page
+            entry_id: ID of the last entry of the previous page
+            limit: Page size
+
+        Returns:
+            List of entry dictionaries
+        """
+        with self._lock:
+            start = self._keys.bisect_right((-points, str(entry_id)))
+            end = min(start + limit, len(self._keys))
+            return [self._describe(position) for position in range(start, end)]
+
+    def around(self, entry_id, window):
+        """
+        Get the entries around an entry
+
+        Args:
+            entry_id: Entry ID to center on
+            window: Number of entries to include on each side
+
+        Returns:
+            List of entry dictionaries, empty if the entry is unknown
+        """
+        entry_id = str(entry_id)
+        with self._lock:
+            current = self._entries.get(entry_id)
+            if current is None:
+                return []
+            position = self._keys.index((-current[0], entry_id))
+            start = max(0, position - window)
+            end = min(len(self._keys), position + window + 1)
+            return [self._describe(p) for p in range(start, end)]
+
+def load_leaderboard(db, league_id):
+    """
+    Build a league's leaderboard from its persisted participant entries
+
+    Args:
+        db: Database instance
+        league_id: League ID
+
+    Returns:
+        Leaderboard for the league, or None if the league does not exist
+    """
+    if not read_primary(db.leagues).find_one({'_id': ObjectId(league_id)}, {'_id': 1}):
+        return None
+
+    cursor = db.league_participants.find(
+        {'league_id': ObjectId(league_id)},
+        {'user_id': 1, 'points': 1, 'points_version': 1}
+    )
+    return Leaderboard(
+        league_id,
+        (
+            (entry['_id'], entry['user_id'], entry.get('points', 0), entry.get('points_version', 0))
+            for entry in cursor
+        )
+    )
+
+class _Load:
+    """A league's leaderboard while its one loader reads it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.leaderboard = None
+        self.error = None
+        # (entries, version) of the updates published while the entries
+        # were being read
+        self.pending = []
+
+def get_leaderboard(db, league_id):
+    """
+    Get a league's leaderboard, loading it on first use
+
+    Concurrent first requests for a league wait for a single load. Updates
+    published during the load are applied once it finishes. Unknown
+    leagues are not kept.
+
+    Args:
+        db: Database instance
+        league_id: League ID
+
+    Returns:
+        Leaderboard for the league, or None if the league does not exist
+    """
+    league_id = str(league_id)
+    with _leaderboards_lock:
+        leaderboard = _leaderboards.get(league_id)
+        if leaderboard is not None:
+            _leaderboards.move_to_end(league_id)
+            return leaderboard
+
+    _follow_updates()
+    with _leaderboards_lock:
+        leaderboard = _leaderboards.get(league_id)
+        if leaderboard is not None:
+            return leaderboard
+        load = _loading.get(league_id)
+        loader = load is None
+        if loader:
+            load = _loading[league_id] = _Load()
+
+    if not loader:
+        load.done.wait()
+        if load.error is not None:
+            raise load.error
+        return load.leaderboard
+
+    try:
+        leaderboard = load_leaderboard(db, league_id)
+    except Exception as e:
+        with _leaderboards_lock:
+            del _loading[league_id]
+        load.error = e
+        load.done.set()
+        raise
+
+    with _leaderboards_lock:
+        if leaderboard is not None:
+            for entries, version in load.pending:
+                _apply(leaderboard, entries, version)
+            _leaderboards[league_id] = leaderboard
+            while len(_leaderboards) > LEADERBOARD_MAX_LEAGUES:
+                _leaderboards.popitem(last=False)
+        del _loading[league_id]
+    load.leaderboard = leaderboard
+    load.done.set()
+    return leaderboard
+
+def get_loaded_leaderboard(league_id):
+    """Get a league's leaderboard only if this process already holds it"""
+    return _leaderboards.get(str(league_id))
+
+def _apply(leaderboard, entries, version):
+    for entry_id, user_id, points in entries:
+        leaderboard.set_points(entry_id, points, user_id, version)
+
+def _receive(message):
+    """Pub/sub handler, called from any thread"""
+    message = json.loads(message)
+    league_id = message.get('leaderboard')
+    if league_id is None:
+        return
+    version = message.get('version', 0)
+    with _leaderboards_lock:
+        leaderboard = _leaderboards.get(league_id)
+        if leaderboard is None:
+            load = _loading.get(league_id)
+            if load is not None:
+                load.pending.append((message['entries'], version))
+            return
+    _apply(leaderboard, message['entries'], version)
+
+def _follow_updates():
+    """Subscribe this process to published leaderboard updates, once"""
+    global _following
+    backend = get_pubsub_backend()
+    with _leaderboards_lock:
+        if _following == (os.getpid(), backend):
+            return
+        _following = (os.getpid(), backend)
+        # Boards held until now may have missed updates
+        _leaderboards.clear()
+        backend.subscribe(_receive)
+
+def points_version():
+    """Version of points totals written now, see the module docstring"""
+    return time.time_ns()
+
+def publish_entries(league_id, entries, version):
+    """
+    Apply new points totals to every worker's leaderboard of a league
+
+    Applied to this process's leaderboard right away and published to the
+    others; call it after the totals are persisted.
+
+    Args:
+        league_id: League ID
+        entries: List of (entry_id, user_id, points) tuples
+        version: points_version the totals were persisted with
+    """
+    entries = [(str(entry_id), str(user_id), points) for entry_id, user_id, points in entries]
+    if not entries:
+        return
+    leaderboard = get_loaded_leaderboard(league_id)
+    if leaderboard is not None:
+        _apply(leaderboard, entries, version)
+    get_pubsub_backend().publish(
+        encode_json({'leaderboard': str(league_id), 'version': version, 'entries': entries})
+    )
+
+def update_points(db, league_id, entries, version=None):
+    """
+    Set new points totals for league entries, persist and publish them
+
+    An entry already holding a newer total keeps it.
+
+    Args:
+        db: Database instance
+        league_id: League ID
+        entries: List of (entry_id, user_id, points) tuples
+        version: points_version of the totals, now by default
+    """
+    if not entries:
+        return
+    if version is None:
+        version = points_version()
+
+    db.league_participants.bulk_write(
+        [
+            UpdateOne(
+                {'_id': ObjectId(entry_id), 'points_version': {'$not': {'$gt': version}}},
+                {'$set': {'points': points, 'points_version': version}}
+            )
+            for entry_id, _, points in entries
+        ],
+        ordered=False
+    )
+    publish_entries(league_id, entries, version)
+
+def sync_team_points(db, points_by_team):
+    """
+    Carry fantasy team totals over to the league entries linked to the teams
+
+    Args:
+        db: Database instance
+        points_by_team: Dictionary mapping team ObjectId to its points total
+
+    Returns:
+        Number of league entries updated
+    """
+    if not points_by_team:
+        return 0
+    # Versioned before the entries are read, like the totals themselves
+    version = points_version()
+
+    by_league = {}
+    cursor = db.league_participants.find(
+        {'team_id': {'$in': list(points_by_team)}},
+        {'league_id': 1, 'user_id': 1, 'team_id': 1}
+    )
+    for entry in cursor:
+        by_league.setdefault(entry['league_id'], []).append(
+            (entry['_id'], entry['user_id'], points_by_team[entry['team_id']])
+        )
+
+    for league_id, entries in by_league.items():
+        update_points(db, league_id, entries, version)
+    return sum(len(entries) for entries in by_league.values())
@@ -0,0 +1,250 @@
+"""
+League entry service
+"""
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+from app.services.leaderboard import publish_entries, points_version
+from app.services.ledger import post, to_paise, user_account, league_account, InsufficientBalance
+from app.utils.db import read_primary
+
+# Outcomes of join_league
+JOINED = 'joined'
+LEAGUE_NOT_FOUND = 'league_not_found'
+LEAGUE_FULL = 'league_full'
+INSUFFICIENT_BALANCE = 'insufficient_balance'
+ALREADY_JOINED = 'already_joined'
+TEAM_NOT_FOUND = 'team_not_found'
+
+# Fields sent to the league card UI
+LEAGUE_CARD_FIELDS = ('name', 'prize_pool', 'entry_fee', 'max_teams', 'teams_count', 'popularity', 'status')
+
+# Listing filters by name; 'all' has no filter
+LEAGUE_FILTERS = {
+    'free': {'entry_fee': 0},
+    'paid': {'entry_fee': {'$gt': 0}},
+    'popular': {'popularity': {'$gte': 90}},
+}
+
+# Listing sorts by name as (field, direction); _id breaks ties in the same direction
+LEAGUE_SORTS = {
+    'prize': ('prize_pool', DESCENDING),
+    'teams': ('teams_count', DESCENDING),
+    'entry': ('entry_fee', ASCENDING),
+}
+
+def _release_seat(db, league_id):
+    db.leagues.update_one({'_id': league_id}, {'$inc': {'teams_count': -1}})
+
+def _entry_team(db, league, user_id, team_id):
+    """
+    The user's fantasy team to enter with
+
+    Returns:
+        Team document, None to enter without a team, or TEAM_NOT_FOUND
+    """
+    if team_id is not None:
+        if not ObjectId.is_valid(team_id):
+            return TEAM_NOT_FOUND
+        team = db.user_matches.find_one({'_id': ObjectId(team_id), 'user_id': user_id}, {'match_id': 1, 'points': 1})
+        if team is None or (league.get('match_id') and team.get('match_id') != league['match_id']):
+            return TEAM_NOT_FOUND
+        return team
+    if not league.get('match_id'):
+        return None
+    # Default to the user's latest team for the league's match
+    return db.user_matches.find_one(
+        {'user_id': user_id, 'match_id': league['match_id']},
+        {'points': 1},
+        sort=[('_id', -1)]
+    )
+
+def join_league(db, league_id, user_id, team_id=None):
+    """
+    Join a user to a league without overselling seats or overdrawing wallets
+
+    Each step is guarded, so concurrent joins cannot race: a seat is
+    reserved only while teams_count < max_teams, then the entry fee ledger
+    posting (debited only while the balance covers it) and the entry are
+    written in one transaction, where the unique (league_id, user_id) index
+    rejects a second entry. If that transaction fails, the seat is released.
+
+    The entry is linked to the fantasy team it scores with: the one given,
+    which must be the user's and for the league's match, or else the
+    user's latest team for the match. It starts at the team's points.
+
+    Args:
+        db: Database instance
+        league_id: League ID
+        user_id: User ObjectId
+        team_id: Optional fantasy team (`user_matches`) ID
+
+    Returns:
+        Tuple of (outcome constant, inserted entry ID or None)
+    """
+    league_id = ObjectId(league_id)
+
+    # Reserve a seat
+    league = db.leagues.find_one_and_update(
+        {
+            '_id': league_id,
+            '$or': [
+                # Missing or null: no seat limit
+                {'max_teams': None},
+                {'$expr': {'$lt': [{'$ifNull': ['$teams_count', 0]}, '$max_teams']}}
+            ]
+        },
+        {'$inc': {'teams_count': 1}},
+        projection={'entry_fee': 1, 'match_id': 1}
+    )
+    if league is None:
+        exists = read_primary(db.leagues).find_one({'_id': league_id}, {'_id': 1})
+        return (LEAGUE_FULL if exists else LEAGUE_NOT_FOUND), None
+
+    # Taken before the team's points are read, so a later sync wins
+    version = points_version()
+    try:
+        team = _entry_team(db, league, user_id, team_id)
+    except Exception:
+        _release_seat(db, league_id)
+        raise
+    if team == TEAM_NOT_FOUND:
+        _release_seat(db, league_id)
+        return TEAM_NOT_FOUND, None
+
+    entry = {
+        'league_id': league_id,
+        'user_id': user_id,
+        'points': 0,
+        'points_version': version,
+        'joined_at': datetime.utcnow()
+    }
+    if team is not None:
+        entry['team_id'] = team['_id']
+        entry['points'] = team.get('points', 0)
+
+    try:
+        entry_fee = to_paise(league.get('entry_fee', 0))
+        if entry_fee > 0:
+            # Debit the fee and record the entry in one transaction
+            posted = post(
+                db,
+                f'entry:{league_id}:{user_id}',
+                [(user_account(user_id), -entry_fee), (league_account(league_id), entry_fee)],
+                'League entry fee',
+                extra_writes=lambda session: db.league_participants.insert_one(entry, session=session)
+            )
+            if not posted:
+                # The fee for this user and league was already taken
+                _release_seat(db, league_id)
+                return ALREADY_JOINED, None
+        else:
+            db.league_participants.insert_one(entry)
+    except InsufficientBalance:
+        _release_seat(db, league_id)
+        return INSUFFICIENT_BALANCE, None
+    except DuplicateKeyError:
+        _release_seat(db, league_id)
+        return ALREADY_JOINED, None
+    except Exception:
+        _release_seat(db, league_id)
+        raise
+
+    publish_entries(league_id, [(entry['_id'], user_id, entry['points'])], version)
+    return JOINED, entry['_id']
+
+def build_league_listing(filter_type, sort_by, cursor=None):
+    """
+    Build the Mongo query and sort for a page of the league listing
+
+    Leagues that lack the sort field (or hold null) sort after every other
+    league in a descending sort and before them in an ascending one, as
+    Mongo orders null; the keyset pages through them too, so none is
+    skipped or repeated. The backfill_league_sort_fields migration stores
+    0 in them, which orders them like the old in-memory sort did.
+
+    Args:
+        filter_type: One of LEAGUE_FILTERS, anything else lists all leagues
+        sort_by: One of LEAGUE_SORTS, anything else sorts by prize
+        cursor: Optional [sort value, league ID] of the last league already sent
+
+    Returns:
+        Tuple of (query, sort specification)
+    """
+    field, direction = LEAGUE_SORTS.get(sort_by, LEAGUE_SORTS['prize'])
+    query = dict(LEAGUE_FILTERS.get(filter_type, {}))
+
+    if cursor:
+        value, last_id = cursor
+        after = '$gt' if direction == ASCENDING else '$lt'
+        # Same value, later ID; null matches a missing field too
+        ties = {field: value, '_id': {after: ObjectId(last_id)}}
+        if value is None:
+            # Ascending, the non-null values follow the nulls; descending,
+            # nothing does
+            keyset = {'$or': [ties, {field: {'$ne': None}}]} if direction == ASCENDING else ties
+        else:
+            branches = [{field: {after: value}}, ties]
+            if direction == DESCENDING:
+                branches.append({field: None})
+            keyset = {'$or': branches}
+        query = {'$and': [query, keyset]} if query else keyset
+
+    return query, [(field, direction), ('_id', direction)]
+
+def list_leagues(db, filter_type, sort_by, limit, cursor=None):
+    """
+    Get one page of the league listing, sorted and projected by Mongo
+
+    Args:
+        db: Database instance
+        filter_type: Listing filter name
+        sort_by: Listing sort name
+        limit: Page size
+        cursor: Optional [sort value, league ID] of the last league already sent
+
+    Returns:
+        Tuple of (list of league documents, next cursor values or None)
+    """
+    query, sort = build_league_listing(filter_type, sort_by, cursor)
+    leagues = list(find_leagues_page(db, query, sort, limit))
+    return leagues, next_leagues_cursor(leagues, sort, limit)
+
+def find_leagues_page(db, query, sort, limit):
+    """
+    Open the driver cursor over one page of the league listing
+
+    Works with both pymongo and Motor databases, so the async routes share
+    the listing's projection and sort with list_leagues.
+
+    Args:
+        db: Database instance, sync or async
+        query: Query from build_league_listing
+        sort: Sort specification from build_league_listing
+        limit: Page size
+
+    Returns:
+        Driver cursor of league card documents
+    """
+    return db.leagues.find(query, {field: 1 for field in LEAGUE_CARD_FIELDS}).sort(sort).limit(limit)
+
+def next_leagues_cursor(leagues, sort, limit):
+    """
+    Get the cursor values after a page of the league listing
+
+    Args:
+        leagues: League documents of the page
+        sort: Sort specification from build_league_listing
+        limit: Page size
+
+    Returns:
+        [sort value, league ID] of the last league, or None if the page is
+        the last one
+    """
+    if len(leagues) < limit:
+        return None
+    last = leagues[-1]
+    return [last.get(sort[0][0]), str(last['_id'])]
@@ -0,0 +1,321 @@
+"""
+Double-entry wallet ledger
+
+Every money movement is a posting: two or more append-only entries in
+`ledger_entries` whose amounts sum to zero, identified by an idempotency
+key. A posting, the matching wallet update on the user and the user-facing
+`transactions` record are written in one multi-document transaction, so
+the wallet stays an O(1) materialized view of the ledger.
+
+Amounts are integer paise throughout (`amount_paise` on entries,
+`balance_paise` on snapshots, `wallet_paise` on users), so the legs of a
+posting and every balance sum exactly. `wallet_balance` on users is the
+rupee figure shown to clients, recomputed from wallet_paise by each update.
+
+Ledger balances are read from `balance_snapshots` plus the short tail of
+entries after the snapshot. compact_snapshots folds new entries into the
+snapshots periodically, scanning only the entries created since its last run.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.utils.db import run_in_transaction
+
+DEPOSITS_ACCOUNT = 'house:deposits'
+OPENING_ACCOUNT = 'house:opening'
+
+# Entries younger than this are left in the tail by compaction, so that
+# transactions still in flight (and clock skew between app servers) cannot
+# commit an entry behind a snapshot boundary
+SNAPSHOT_LAG_SECONDS = 300
+
+SNAPSHOT_META_ID = 'balance_snapshots'
+
+class InsufficientBalance(Exception):
+    """A debit would take a user's wallet below zero"""
+
+class AlreadyPosted(Exception):
+    """A posting with the same idempotency key has already been applied"""
+
+def to_paise(amount):
+    """Convert a rupee amount to integer paise, without binary float error"""
+    return int((Decimal(str(amount)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def to_rupees(paise):
+    """Convert integer paise to the rupee amount shown to users"""
+    return paise / 100
+
+def wallet_increment(paise):
+    """
+    Update pipeline adding paise to a user's wallet
+
+    wallet_balance is derived from wallet_paise in the same update, so the
+    two never disagree.
+    """
+    return [
+        {'$set': {'wallet_paise': {'$add': [{'$ifNull': ['$wallet_paise', 0]}, paise]}}},
+        {'$set': {'wallet_balance': {'$divide': ['$wallet_paise', 100]}}}
+    ]
+
+def user_account(user_id):
+    return f'user:{user_id}'
+
+def league_account(league_id):
+    return f'league:{league_id}'
+
+def build_entries(idempotency_key, legs, description, created_at=None):
+    """
+    Build the ledger entries of a posting
+
+    Args:
+        idempotency_key: Unique key of the posting
+        legs: List of (account, amount in paise) pairs summing to zero
+        description: Posting description
+        created_at: Optional timestamp, defaults to now
+
+    Returns:
+        List of entry documents
+
+    Raises:
+        ValueError: If an amount is not integer paise or the legs do not balance
+    """
+    if any(type(amount) is not int for _, amount in legs):
+        raise ValueError('Ledger amounts must be integer paise')
+    if sum(amount for _, amount in legs) != 0:
+        raise ValueError('Ledger posting does not balance')
+
+    created_at = created_at or datetime.utcnow()
+    return [
+        {
+            'posting_id': idempotency_key,
+            'account': account,
+            'amount_paise': amount,
+            'description': description,
+            'created_at': created_at
+        }
+        for account, amount in legs
+    ]
+
+def write_posting(db, session, idempotency_key, legs, description):
+    """
+    Write a posting inside an open transaction
+
+    Applies the user leg (at most one per posting) to the wallet, debits
+    only while the balance covers them, and records the user-facing
+    transaction in rupees.
+
+    Raises:
+        AlreadyPosted: If the idempotency key was used before
+        InsufficientBalance: If the user leg is a debit the wallet cannot cover
+    """
+    entries = build_entries(idempotency_key, legs, description)
+    user_legs = [(account, amount) for account, amount in legs if account.startswith('user:')]
+    if len(user_legs) > 1:
+        raise ValueError('A posting may move money for one user only')
+
+    try:
+        db.ledger_entries.insert_many(entries, session=session)
+    except BulkWriteError as e:
+        # The unique (posting_id, account) index rejects a replayed posting
+        if any(error.get('code') == 11000 for error in e.details.get('writeErrors', [])):
+            raise AlreadyPosted(idempotency_key)
+        raise
+
+    for account, amount in user_legs:
+        user_id = ObjectId(account.split(':', 1)[1])
+        query = {'_id': user_id}
+        if amount < 0:
+            query['wallet_paise'] = {'$gte': -amount}
+
+        result = db.users.update_one(query, wallet_increment(amount), session=session)
+        if result.matched_count == 0:
+            raise InsufficientBalance(account)
+
+        db.transactions.insert_one({
+            'user_id': user_id,
+            'type': 'credit' if amount > 0 else 'debit',
+            'amount': to_rupees(abs(amount)),
+            'description': description,
+            'idempotency_key': idempotency_key,
+            'created_at': entries[0]['created_at']
+        }, session=session)
+
+def post(db, idempotency_key, legs, description, extra_writes=None):
+    """
+    Apply a posting atomically
+
+    Args:
+        db: Database instance
+        idempotency_key: Unique key of the posting
+        legs: List of (account, amount in paise) pairs summing to zero
+        description: Posting description
+        extra_writes: Optional function taking the session, for other writes
+            that must commit or abort together with the posting
+
+    Returns:
+        True if the posting was applied, False if the key was already posted
+
+    Raises:
+        InsufficientBalance: If a user debit cannot be covered
+    """
+    def write(session):
+        write_posting(db, session, idempotency_key, legs, description)
+        if extra_writes is not None:
+            extra_writes(session)
+
+    try:
+        run_in_transaction(write)
+    except AlreadyPosted:
+        return False
+    return True
+
+def get_balance(db, account):
+    """
+    Get an account's ledger balance from its snapshot plus the tail
+
+    Args:
+        db: Database instance
+        account: Ledger account name
+
+    Returns:
+        Balance of the account in paise
+    """
+    snapshot = db.balance_snapshots.find_one({'_id': account}) or {}
+    query = {'account': account}
+    if snapshot.get('as_of'):
+        query['_id'] = {'$gte': snapshot['as_of']}
+
+    tail = list(db.ledger_entries.aggregate([
+        {'$match': query},
+        {'$group': {'_id': None, 'amount': {'$sum': '$amount_paise'}}}
+    ]))
+    return snapshot.get('balance_paise', 0) + (tail[0]['amount'] if tail else 0)
+
+def compact_snapshots(db, lag_seconds=SNAPSHOT_LAG_SECONDS, chunk_size=1000):
+    """
+    Fold ledger entries created since the last compaction into the snapshots
+
+    The window [previous boundary, new boundary) is recorded before it is
+    applied and each snapshot only advances once past the boundary, so an
+    interrupted run resumes the same window without double counting.
+
+    Args:
+        db: Database instance
+        lag_seconds: Age an entry must reach before it is folded
+        chunk_size: Snapshot updates per bulk write
+
+    Returns:
+        Dictionary with the window boundaries and the number of accounts updated
+    """
+    meta = db.ledger_meta.find_one({'_id': SNAPSHOT_META_ID}) or {}
+    start = meta.get('as_of')
+    end = meta.get('pending')
+    if end is None:
+        end = ObjectId.from_datetime(datetime.utcnow() - timedelta(seconds=lag_seconds))
+        db.ledger_meta.update_one(
+            {'_id': SNAPSHOT_META_ID},
+            {'$set': {'pending': end}},
+            upsert=True
+        )
+
+    window = {'$lt': end}
+    if start is not None:
+        window['$gte'] = start
+
+    totals = db.ledger_entries.aggregate([
+        {'$match': {'_id': window}},
+        {'$group': {'_id': '$account', 'amount': {'$sum': '$amount_paise'}}}
+    ], allowDiskUse=True)
+
+    updated = 0
+    operations = []
+    for total in totals:
+        operations.append(UpdateOne(
+            {'_id': total['_id'], 'as_of': {'$lt': end}},
+            {'$inc': {'balance_paise': total['amount']}, '$set': {'as_of': end}}
+        ))
+        operations.append(UpdateOne(
+            {'_id': total['_id']},
+            {'$setOnInsert': {'balance_paise': total['amount'], 'as_of': end}},
+            upsert=True
+        ))
+        updated += 1
+        if len(operations) >= chunk_size:
+            db.balance_snapshots.bulk_write(operations)
+            operations = []
+
+    if operations:
+        db.balance_snapshots.bulk_write(operations)
+
+    db.ledger_meta.update_one(
+        {'_id': SNAPSHOT_META_ID},
+        {'$set': {'as_of': end, 'compacted_at': datetime.utcnow()}, '$unset': {'pending': ''}}
+    )
+
+    return {'from': start, 'to': end, 'accounts': updated}
+
+def reconcile_users(db, user_ids):
+    """
+    Compare users' materialized wallet_paise with their ledger balance
+
+    Args:
+        db: Database instance
+        user_ids: Iterable of user ObjectIds
+
+    Returns:
+        List of (user_id, wallet_paise, ledger_balance) for mismatches
+    """
+    mismatches = []
+    for user in db.users.find({'_id': {'$in': list(user_ids)}}, {'wallet_paise': 1}):
+        ledger_balance = get_balance(db, user_account(user['_id']))
+        wallet_paise = user.get('wallet_paise', 0)
+        if wallet_paise != ledger_balance:
+            mismatches.append((user['_id'], wallet_paise, ledger_balance))
+    return mismatches
+
+def check_window_balanced(db, start, end):
+    """
+    Check that the entries created in a time window sum to zero
+
+    Args:
+        db: Database instance
+        start: Window start datetime
+        end: Window end datetime
+
+    Returns:
+        Net amount of the window in paise; 0 when every posting in it balanced
+    """
+    totals = list(db.ledger_entries.aggregate([
+        {'$match': {'_id': {'$gte': ObjectId.from_datetime(start), '$lt': ObjectId.from_datetime(end)}}},
+        {'$group': {'_id': None, 'amount': {'$sum': '$amount_paise'}}}
+    ]))
+    return totals[0]['amount'] if totals else 0
+
+def post_opening_balances(db):
+    """
+    Open ledger accounts for wallets funded before the ledger existed
+
+    Posts each user's current wallet_paise against OPENING_ACCOUNT without
+    touching the wallet. Run it once, after backfill_wallet_paise and before
+    postings go through the ledger; re-running skips users that are already
+    opened.
+
+    Returns:
+        Number of accounts opened
+    """
+    opened = 0
+    for user in db.users.find({'wallet_paise': {'$gt': 0}}, {'wallet_paise': 1}):
+        entries = build_entries(
+            f"opening:{user['_id']}",
+            [(user_account(user['_id']), user['wallet_paise']), (OPENING_ACCOUNT, -user['wallet_paise'])],
+            'Opening balance'
+        )
+        if db.ledger_entries.find_one({'posting_id': entries[0]['posting_id']}, {'_id': 1}):
+            continue
+        db.ledger_entries.insert_many(entries)
+        opened += 1
+    return opened
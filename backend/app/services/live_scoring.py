@@ -0,0 +1,278 @@
+"""
+Incremental scoring service for live matches
+"""
+import threading
+
+import numpy as np
+from bson import ObjectId
+
+from app.services.leaderboard import sync_team_points
+from app.services.match_stream import publish_match_update
+from app.services.player_points import save_player_points, save_over_snapshot, get_materialized_points
+from app.services.scoring_rules import resolve_rule_set
+from app.utils.db import read_primary
+from app.services.points import (
+    calculate_batch_player_breakdown,
+    calculate_batch_player_points,
+    calculate_batch_team_points,
+    build_stats_matrix,
+    build_team_matrix,
+    calculate_points_delta,
+)
+
+# Live scorers by match ID, kept for the lifetime of the worker process
+_live_scorers = {}
+_live_scorers_lock = threading.Lock()
+
+class LiveMatchScorer:
+    """
+    Running fantasy totals for one live match
+
+    Holds each player's cumulative stats and points, the total of every
+    fantasy team in the match, and a reverse index from player to the rows
+    of the teams that picked them. A ball-by-ball stat delta only touches
+    the teams holding that player.
+    """
+
+    def __init__(self, match_id, teams, match_stats=None, rules=None):
+        """
+        Args:
+            match_id: Match ID
+            teams: Dictionary mapping fantasy team ID to a list of player IDs
+            match_stats: Optional dictionary mapping player ID to statistics so far
+            rules: Optional CompiledRuleSet, defaults to the T20 rule set
+        """
+        self.match_id = match_id
+        self.rules = rules
+        self._lock = threading.Lock()
+
+        self.player_stats = {player_id: dict(stats) for player_id, stats in (match_stats or {}).items()}
+        for players in teams.values():
+            for player_id in players:
+                self.player_stats.setdefault(player_id, {})
+
+        player_ids = list(self.player_stats)
+        player_index = {player_id: row for row, player_id in enumerate(player_ids)}
+
+        stats_matrix = build_stats_matrix([self.player_stats[player_id] for player_id in player_ids], rules)
+        points = calculate_batch_player_points(stats_matrix, rules)
+        self.player_points = dict(zip(player_ids, points.tolist()))
+        # Points by category, recomputed for a player only when their stats change
+        self.player_breakdowns = dict(zip(player_ids, calculate_batch_player_breakdown(stats_matrix, rules)))
+
+        self.team_ids = np.array(list(teams), dtype=object)
+        team_matrix = build_team_matrix(list(teams.values()), player_index)
+        self.team_points = calculate_batch_team_points(points, team_matrix)
+        # Teams whose totals changed since take_changed_teams last ran
+        self._changed = np.zeros(len(self.team_ids), dtype=bool)
+        self._team_rows = {team_id: row for row, team_id in enumerate(self.team_ids)}
+
+        # Reverse index: player ID -> rows of the teams that hold the player
+        team_rows = np.repeat(np.arange(len(team_matrix)), team_matrix.shape[1])
+        player_rows = team_matrix.ravel()
+        picked = player_rows >= 0
+        team_rows, player_rows = team_rows[picked], player_rows[picked]
+
+        order = np.argsort(player_rows, kind='stable')
+        team_rows, player_rows = team_rows[order], player_rows[order]
+        starts = np.flatnonzero(np.r_[True, np.diff(player_rows) != 0]) if len(player_rows) else []
+
+        self.player_teams = {
+            player_ids[player_rows[start]]: group
+            for start, group in zip(starts, np.split(team_rows, starts[1:]))
+        }
+
+    def apply_delta(self, player_id, stat_delta):
+        """
+        Apply a stat delta for one player and propagate it to their teams
+
+        Args:
+            player_id: Player ID
+            stat_delta: Dictionary of stat increments
+
+        Returns:
+            Tuple of (change in the player's points, array of affected team IDs)
+        """
+        with self._lock:
+            updated_stats, points_delta = calculate_points_delta(
+                self.player_stats.get(player_id, {}), stat_delta, self.rules
+            )
+            if updated_stats != self.player_stats.get(player_id):
+                self.player_breakdowns[player_id] = calculate_batch_player_breakdown(
+                    build_stats_matrix([updated_stats], self.rules), self.rules
+                )[0]
+            self.player_stats[player_id] = updated_stats
+            self.player_points[player_id] = self.player_points.get(player_id, 0) + points_delta
+
+            rows = self.player_teams.get(player_id)
+            if not points_delta or rows is None:
+                return points_delta, self.team_ids[:0]
+
+            if isinstance(points_delta, float) and self.team_points.dtype.kind != 'f':
+                self.team_points = self.team_points.astype(np.float64)
+            self.team_points[rows] += points_delta
+            self._changed[rows] = True
+
+            return points_delta, self.team_ids[rows]
+
+    def take_changed_teams(self):
+        """
+        Get the totals of the teams that changed since the last call
+
+        Returns:
+            Dictionary mapping fantasy team ID to its running total
+        """
+        with self._lock:
+            rows = np.flatnonzero(self._changed)
+            self._changed[rows] = False
+            return dict(zip(self.team_ids[rows].tolist(), self.team_points[rows].tolist()))
+
+    def get_team_points(self, team_id):
+        """
+        Get the running total of a fantasy team
+
+        Args:
+            team_id: Fantasy team ID
+
+        Returns:
+            Total points for the team, or None if the team is not in this match
+        """
+        row = self._team_rows.get(team_id)
+        if row is None:
+            return None
+        return self.team_points[row].item()
+
+    def get_player_points(self, player_ids=None):
+        """
+        Get players' current points and breakdowns
+
+        Args:
+            player_ids: Optional list of player IDs, all players by default
+
+        Returns:
+            Dictionary mapping player ID to {'points', 'breakdown'}
+        """
+        with self._lock:
+            player_ids = self.player_points if player_ids is None else player_ids
+            return {
+                player_id: {'points': self.player_points[player_id], 'breakdown': dict(self.player_breakdowns[player_id])}
+                for player_id in player_ids if player_id in self.player_points
+            }
+
+def load_live_scorer(db, match_id, match_stats=None):
+    """
+    Build the live scorer for a match from its fantasy teams and register it
+
+    The match's `scoring_rules` reference selects the rule set.
+
+    Args:
+        db: Database instance
+        match_id: Match ID
+        match_stats: Optional dictionary mapping player ID to statistics so far
+
+    Returns:
+        LiveMatchScorer for the match
+    """
+    match = read_primary(db.matches).find_one({'_id': ObjectId(match_id)}, {'scoring_rules': 1})
+    rules = resolve_rule_set(match, db)
+
+    cursor = db.user_matches.find(
+        {'match_id': ObjectId(match_id)},
+        {'players.player_id': 1}
+    )
+    teams = {
+        team['_id']: [player['player_id'] for player in team.get('players', [])]
+        for team in cursor
+    }
+
+    scorer = LiveMatchScorer(match_id, teams, match_stats, rules)
+    with _live_scorers_lock:
+        _live_scorers[str(match_id)] = scorer
+    return scorer
+
+def get_live_scorer(match_id):
+    """Get the registered live scorer for a match, if any"""
+    return _live_scorers.get(str(match_id))
+
+def drop_live_scorer(match_id):
+    """Forget the live scorer of a match once it is no longer live"""
+    with _live_scorers_lock:
+        _live_scorers.pop(str(match_id), None)
+
+def record_live_delta(match_id, player_id, stat_delta, db=None):
+    """
+    Apply a stat delta to a match's live scorer, update the player's
+    materialized points given a database, and publish the player's change
+    in points to the match stream
+
+    Args:
+        match_id: Match ID
+        player_id: Player ID
+        stat_delta: Dictionary of stat increments
+        db: Optional database instance
+
+    Returns:
+        Tuple of (change in the player's points, array of affected team IDs),
+        or None if the match has no live scorer
+    """
+    scorer = get_live_scorer(match_id)
+    if scorer is None:
+        return None
+
+    points_delta, team_ids = scorer.apply_delta(player_id, stat_delta)
+    if db is not None and stat_delta:
+        # Persisted first, so a stream snapshot seeded from the database
+        # includes every delta already published
+        player = scorer.get_player_points([player_id])[player_id]
+        save_player_points(db, match_id, player_id, scorer.player_stats[player_id], player['points'], player['breakdown'])
+    if points_delta:
+        publish_match_update(
+            match_id,
+            player_points={player_id: points_delta},
+            player_totals={player_id: scorer.player_points[player_id]}
+        )
+    return points_delta, team_ids
+
+def record_over(db, match_id, innings, over):
+    """
+    Snapshot every player's points at the end of an over and carry the
+    running totals of the teams that changed over to their league entries
+
+    Leaderboards move once an over rather than on every ball, which would
+    rewrite the entries of every team holding the player.
+
+    Args:
+        db: Database instance
+        match_id: Match ID
+        innings: Innings number
+        over: Over number within the innings
+
+    Returns:
+        True, or False if the match has no live scorer
+    """
+    scorer = get_live_scorer(match_id)
+    if scorer is None:
+        return False
+    save_over_snapshot(db, match_id, innings, over, scorer.get_player_points())
+    sync_team_points(db, scorer.take_changed_teams())
+    return True
+
+def get_match_player_points(db, match_id, player_ids=None):
+    """
+    Get players' points in a match without recalculating them
+
+    Served from the live scorer while the match is live in this process,
+    from `player_match_points` otherwise.
+
+    Args:
+        db: Database instance
+        match_id: Match ID
+        player_ids: Optional list of player IDs, all players by default
+
+    Returns:
+        Dictionary mapping player ID to {'points', 'breakdown'}
+    """
+    scorer = get_live_scorer(match_id)
+    if scorer is not None:
+        return scorer.get_player_points(player_ids)
+    return get_materialized_points(db, match_id, player_ids)
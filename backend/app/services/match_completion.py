@@ -0,0 +1,320 @@
+"""
+Match completion: score every fantasy team of a finished match
+
+    python -m app.services.match_completion <match_id>
+
+Runs as a pipeline. The producer streams the match's `user_matches` in
+`_id` order and cuts them into `_id`-range chunks; chunk workers in a
+process pool total each chunk's teams with the services/points.py batch
+functions; the committer writes each chunk back with one unordered bulk
+write, in order, carries the totals over to the league entries linked to
+the teams, and checkpoints the last `_id` written in `scoring_jobs`.
+A run that crashes resumes after the checkpoint. Rewriting a chunk that was
+written but not checkpointed is harmless, since points are $set.
+"""
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.services.leaderboard import sync_team_points
+from app.services.live_scoring import get_live_scorer, drop_live_scorer
+from app.services.match_stream import publish_match_update
+from app.services.player_points import materialize_player_points
+from app.services.points import (
+    build_stats_matrix,
+    build_team_matrix,
+    calculate_batch_player_points,
+    calculate_batch_team_points,
+)
+from app.services.scoring_rules import resolve_rule_set
+from app.utils.db import read_primary
+
+COMPLETION_CHUNK_SIZE = 5000
+
+# Seconds a run holds a match's job without checkpointing before another
+# run may take it over
+JOB_LEASE_SECONDS = 300
+
+# Outcomes of complete_match
+COMPLETED = 'completed'
+MATCH_NOT_FOUND = 'match_not_found'
+MATCH_NOT_LIVE = 'match_not_live'
+NO_FINAL_STATS = 'no_final_stats'
+JOB_BUSY = 'job_busy'
+
+class _PlayerRows(dict):
+    """Player index where players without stats read the padding slot (0 points)"""
+
+    def __missing__(self, player_id):
+        return -1
+
+# Per worker process, set by _init_worker
+_worker_points = None
+_worker_index = None
+
+def _init_worker(player_points, player_index):
+    global _worker_points, _worker_index
+    _worker_points = player_points
+    _worker_index = _PlayerRows(player_index)
+
+def score_chunk(lineups):
+    """
+    Total a chunk of teams in a worker process
+
+    Args:
+        lineups: List of teams, each a list of player IDs
+
+    Returns:
+        List of team totals
+    """
+    team_matrix = build_team_matrix(lineups, _worker_index)
+    return calculate_batch_team_points(_worker_points, team_matrix).tolist()
+
+def score_players(match_stats, rules=None):
+    """
+    Score every player of a match once
+
+    Args:
+        match_stats: Dictionary mapping player ID to final statistics
+        rules: Optional CompiledRuleSet
+
+    Returns:
+        Tuple of (player points array, dictionary of player ID to row)
+    """
+    player_ids = list(match_stats)
+    player_points = calculate_batch_player_points(
+        build_stats_matrix([match_stats[player_id] for player_id in player_ids], rules), rules
+    )
+    return player_points, {player_id: row for row, player_id in enumerate(player_ids)}
+
+def iter_team_chunks(db, match_id, after_id=None, chunk_size=COMPLETION_CHUNK_SIZE):
+    """
+    Producer: stream a match's fantasy teams as `_id`-range chunks
+
+    Args:
+        db: Database instance
+        match_id: Match ObjectId
+        after_id: Optional checkpoint; only teams after it are read
+        chunk_size: Teams per chunk
+
+    Yields:
+        Tuples of (list of team IDs, list of lineups), in `_id` order
+    """
+    query = {'match_id': match_id}
+    if after_id is not None:
+        query['_id'] = {'$gt': after_id}
+
+    cursor = db.user_matches.find(query, {'players.player_id': 1}).sort('_id', 1).batch_size(chunk_size)
+
+    team_ids, lineups = [], []
+    for team in cursor:
+        team_ids.append(team['_id'])
+        lineups.append([player['player_id'] for player in team.get('players', [])])
+        if len(team_ids) == chunk_size:
+            yield team_ids, lineups
+            team_ids, lineups = [], []
+    if team_ids:
+        yield team_ids, lineups
+
+def run_pipeline(chunks, player_points, player_index, commit, workers=None):
+    """
+    Score chunks in a process pool and commit the results in order
+
+    At most two chunks per worker are in flight, so the producer cannot run
+    ahead of the committer by more than that.
+
+    Args:
+        chunks: Iterable of (team IDs, lineups) from the producer
+        player_points: Player points array from score_players
+        player_index: Dictionary of player ID to row from score_players
+        commit: Committer, called with (team IDs, totals) for each chunk
+        workers: Worker processes, the CPU count by default
+
+    Returns:
+        Number of teams scored
+    """
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(player_points, player_index)
+    )
+
+    scored = 0
+    in_flight = deque()
+    try:
+        for team_ids, lineups in chunks:
+            in_flight.append((team_ids, pool.submit(score_chunk, lineups)))
+            if len(in_flight) >= 2 * workers:
+                team_ids, future = in_flight.popleft()
+                commit(team_ids, future.result())
+                scored += len(team_ids)
+        while in_flight:
+            team_ids, future = in_flight.popleft()
+            commit(team_ids, future.result())
+            scored += len(team_ids)
+    finally:
+        pool.shutdown(cancel_futures=True)
+    return scored
+
+def _claim_job(db, match_id):
+    """Take the match's scoring job, or return None if another run holds it or it is done"""
+    now = datetime.utcnow()
+    try:
+        return db.scoring_jobs.find_one_and_update(
+            {
+                '_id': match_id,
+                'status': {'$ne': COMPLETED},
+                '$or': [{'lease_until': {'$lt': now}}, {'lease_until': {'$exists': False}}]
+            },
+            {
+                '$set': {'status': 'running', 'lease_until': now + timedelta(seconds=JOB_LEASE_SECONDS)},
+                '$setOnInsert': {'checkpoint': None, 'teams_scored': 0, 'started_at': now}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        return None
+
+def _final_stats(db, match, match_stats):
+    """The final statistics to score with, or an empty dictionary if there are none"""
+    if match_stats:
+        return match_stats
+    scorer = get_live_scorer(match['_id'])
+    if scorer and scorer.player_stats:
+        return scorer.player_stats
+    if match.get('player_stats'):
+        return match['player_stats']
+    # Written per player by the live scorer (live_scoring.record_live_delta)
+    return {
+        doc['player_id']: doc['stats']
+        for doc in db.player_match_points.find({'match_id': match['_id']}, {'player_id': 1, 'stats': 1})
+        if doc.get('stats')
+    }
+
+def complete_match(db, match_id, match_stats=None, chunk_size=COMPLETION_CHUNK_SIZE, workers=None):
+    """
+    Move a live match to completed and score all of its fantasy teams
+
+    The final player statistics are, in order of preference, the ones
+    given, the registered live scorer's, the match's stored `player_stats`,
+    or the per-player stats in `player_match_points`. Without any, nothing
+    is scored (NO_FINAL_STATS) rather than every team scoring 0. They are
+    stored on the match before scoring, and a resumed run scores with the
+    stored ones. Every player's final points are materialized in
+    `player_match_points` first.
+
+    Args:
+        db: Database instance
+        match_id: Match ID
+        match_stats: Optional dictionary mapping player ID to final statistics
+        chunk_size: Teams per chunk
+        workers: Worker processes, the CPU count by default
+
+    Returns:
+        Tuple of (outcome constant, number of teams scored by this run)
+    """
+    match_id = ObjectId(match_id)
+    match = read_primary(db.matches).find_one(
+        {'_id': match_id}, {'scoring_rules': 1, 'player_stats': 1, 'status': 1}
+    )
+    if not match:
+        return MATCH_NOT_FOUND, 0
+    if match.get('status') == 'completed':
+        # The job is marked completed before the match
+        return COMPLETED, 0
+    if match.get('status') != 'live':
+        return MATCH_NOT_LIVE, 0
+
+    match_stats = _final_stats(db, match, match_stats)
+    if not match_stats:
+        return NO_FINAL_STATS, 0
+
+    job = _claim_job(db, match_id)
+    if job is None:
+        # From the primary, which saw the run that holds the job
+        job = read_primary(db.scoring_jobs).find_one({'_id': match_id}, {'status': 1})
+        return (COMPLETED if job and job['status'] == COMPLETED else JOB_BUSY), 0
+
+    if job['checkpoint'] is not None and match.get('player_stats'):
+        # A resumed run keeps the statistics the first run scored with
+        match_stats = match['player_stats']
+    db.matches.update_one({'_id': match_id}, {'$set': {'player_stats': match_stats}})
+
+    rules = resolve_rule_set(match, db)
+    materialize_player_points(db, match_id, match_stats, rules)
+    player_points, player_index = score_players(match_stats, rules)
+
+    teams_scored = job['teams_scored']
+
+    def commit(team_ids, totals):
+        nonlocal teams_scored
+        db.user_matches.bulk_write([
+            UpdateOne({'_id': team_id}, {'$set': {'points': points, 'status': 'completed'}})
+            for team_id, points in zip(team_ids, totals)
+        ], ordered=False)
+        sync_team_points(db, dict(zip(team_ids, totals)))
+        teams_scored += len(team_ids)
+        db.scoring_jobs.update_one({'_id': match_id}, {'$set': {
+            'checkpoint': team_ids[-1],
+            'teams_scored': teams_scored,
+            'lease_until': datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)
+        }})
+
+    chunks = iter_team_chunks(db, match_id, job['checkpoint'], chunk_size)
+    scored = run_pipeline(chunks, player_points, player_index, commit, workers)
+
+    now = datetime.utcnow()
+    db.scoring_jobs.update_one({'_id': match_id}, {'$set': {'status': COMPLETED, 'completed_at': now}})
+    db.matches.update_one({'_id': match_id}, {'$set': {'status': 'completed', 'completed_at': now}})
+    drop_live_scorer(match_id)
+    publish_match_update(match_id, status='completed')
+
+    return COMPLETED, scored
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Complete a match and score its fantasy teams')
+    parser.add_argument('match_id')
+    parser.add_argument('--chunk-size', type=int, default=COMPLETION_CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, help='worker processes, the CPU count by default')
+    parser.add_argument('--stats', help='JSON file of final statistics by player ID, instead of the stored ones')
+    args = parser.parse_args(argv)
+
+    match_stats = None
+    if args.stats:
+        with open(args.stats) as stats_file:
+            match_stats = json.load(stats_file)
+
+    from flask import Flask
+    from app.utils.db import init_db, get_db
+    from app.utils.cache import init_cache, require_shared_cache
+    from app.utils.pubsub import init_pubsub, require_shared_pubsub
+
+    app = Flask(__name__)
+    app.config.from_object('app.config.Config')
+    try:
+        # Leaderboard and match stream updates must reach the API workers
+        require_shared_pubsub(app.config, 'for match completion')
+        # So must the invalidation of their cached match responses
+        require_shared_cache(app.config, 'for match completion')
+    except RuntimeError as e:
+        parser.error(str(e))
+    init_db(app)
+    init_pubsub(app)
+    init_cache(app)
+
+    outcome, scored = complete_match(get_db(), args.match_id, match_stats, args.chunk_size, args.workers)
+    print(f'{outcome}: {scored} teams scored')
+    return 0 if outcome == COMPLETED else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,350 @@
+"""
+Live match updates pushed to server-sent event subscribers
+
+A producer (the score feed or the live scorer) publishes score, status and
+player fantasy-points deltas with publish_match_update. They travel over the
+pub/sub backend to every node, where the hub appends them to one shared ring
+buffer per match. Subscribers do not get a queue each: a subscriber holds
+only the sequence number it has sent up to, and all subscribers of a match
+wait on the match's one wakeup event.
+
+A subscriber that falls behind (a slow client) gets everything it missed
+merged into a single update; one that falls off the end of the buffer gets
+a snapshot of the match state instead.
+
+Producers also publish each changed player's new points total. A channel
+seeded from the database keeps the totals it has received rather than the
+ones it read, which may predate them, so no delta is lost or counted twice
+whichever way a seed and an update race.
+
+Sequence numbers are local to a channel on one node, so event IDs are
+`<epoch>-<seq>`, where the epoch is random per channel: a client that
+reconnects to another node, or after a restart, gets a snapshot rather
+than deltas counted from someone else's sequence.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from itertools import islice
+
+from app.utils.cache import invalidate_match
+from app.utils.json_encoder import encode_json
+from app.utils.pubsub import get_pubsub_backend
+
+# Sent when a heartbeat finds nothing new, keeps idle connections open
+# through proxies and load balancers
+KEEP_ALIVE = b': keep-alive\n\n'
+
+def merge_updates(updates):
+    """
+    Merge consecutive updates into one
+
+    Score and status keep their latest value; player points deltas add up.
+
+    Args:
+        updates: Iterable of update dictionaries, oldest first
+
+    Returns:
+        Merged update dictionary
+    """
+    merged = {}
+    points = {}
+    for update in updates:
+        for key, value in update.items():
+            if key == 'player_points':
+                for player_id, delta in value.items():
+                    points[player_id] = points.get(player_id, 0) + delta
+            else:
+                merged[key] = value
+    if points:
+        merged['player_points'] = points
+    return merged
+
+class MatchChannel:
+    """
+    Ring buffer of the latest updates of one match, shared by its subscribers
+
+    Only touched from the event loop thread.
+    """
+
+    def __init__(self, match_id, capacity=256):
+        self.match_id = match_id
+        self.epoch = os.urandom(6).hex().encode()
+        self.seq = 0
+        # Player points are the seeded totals, moved by the totals (or, from
+        # producers that send none, the deltas) published since
+        self.state = {'score': None, 'status': None, 'player_points': {}}
+        self.seeded = False
+        # Held while a request loads the state to seed the channel with
+        self.seed_lock = asyncio.Lock()
+        # Players whose total has come in with an update
+        self._published_totals = set()
+        self.subscribers = 0
+        self.updated_at = time.monotonic()
+        self._updates = deque(maxlen=capacity)
+        # Encoded frames by starting sequence number, until the next update
+        self._frames = {}
+        self._changed = asyncio.Event()
+
+    def seed(self, score=None, status=None, player_points=None):
+        """
+        Fill in the state loaded from the database
+
+        Args:
+            score: Match score
+            status: Match status
+            player_points: Optional dictionary mapping player ID to their
+                materialized points total
+        """
+        if self.state['score'] is None:
+            self.state['score'] = score
+        if self.state['status'] is None:
+            self.state['status'] = status
+        if player_points:
+            # A total published while the database was read is at least as
+            # new as the stored one, since producers persist before they
+            # publish
+            totals = self.state['player_points']
+            self.state['player_points'] = {
+                str(player_id): float(points) for player_id, points in player_points.items()
+            }
+            for player_id in self._published_totals:
+                self.state['player_points'][player_id] = totals[player_id]
+        self.seeded = True
+        self._frames.clear()
+
+    def cursor(self, last_event_id):
+        """
+        Get the sequence number a client's Last-Event-ID resumes from
+
+        Returns:
+            Sequence number, or None if the ID is missing, malformed or
+            from another channel epoch
+        """
+        epoch, _, seq = (last_event_id or '').partition('-')
+        if epoch.encode() != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def append(self, update, player_totals=None):
+        """
+        Add an update and wake every waiting subscriber
+
+        Args:
+            update: Update dictionary sent to subscribers
+            player_totals: Optional dictionary mapping player ID to their
+                points total after the update
+        """
+        self.seq += 1
+        self._updates.append((self.seq, update))
+        player_totals = player_totals or {}
+        for key, value in update.items():
+            if key == 'player_points':
+                totals = self.state['player_points']
+                for player_id, delta in value.items():
+                    if player_id in player_totals:
+                        totals[player_id] = float(player_totals[player_id])
+                        self._published_totals.add(player_id)
+                    else:
+                        totals[player_id] = totals.get(player_id, 0) + delta
+            else:
+                self.state[key] = value
+        self.updated_at = time.monotonic()
+        self._frames.clear()
+        self.wake()
+
+    def wake(self):
+        """Wake every waiting subscriber, e.g. for a heartbeat"""
+        self._changed.set()
+        self._changed.clear()
+
+    async def wait(self):
+        await self._changed.wait()
+
+    def read(self, cursor):
+        """
+        Get the frame that brings a subscriber up to date
+
+        Subscribers at the same position (normally all of them) share one
+        encoded frame per update.
+
+        Args:
+            cursor: Sequence number the subscriber has sent up to, or None
+                for a new subscriber
+
+        Returns:
+            Encoded event frame, or None if the subscriber is up to date
+        """
+        if cursor == self.seq:
+            return None
+        frame = self._frames.get(cursor)
+        if frame is None:
+            frame = self._frames[cursor] = self._encode(cursor)
+        return frame
+
+    def _encode(self, cursor):
+        oldest = self._updates[0][0] if self._updates else self.seq + 1
+        if cursor is None or cursor < oldest - 1 or cursor > self.seq:
+            event, data = b'snapshot', self.state
+        else:
+            event = b'update'
+            data = merge_updates(update for _, update in islice(self._updates, cursor - oldest + 1, None))
+        return b'id: %s-%d\nevent: %s\ndata: %s\n\n' % (self.epoch, self.seq, event, encode_json(data))
+
+class MatchStreamHub:
+    """
+    Per-node registry of match channels, fed from the pub/sub backend
+
+    Lives on one event loop; messages from other threads are handed over
+    with call_soon_threadsafe.
+    """
+
+    def __init__(self, capacity=256, heartbeat=15, idle_ttl=3600):
+        self.capacity = capacity
+        self.heartbeat = heartbeat
+        self.idle_ttl = idle_ttl
+        self.channels = {}
+        self._loop = None
+        self._unsubscribe = None
+        self._heartbeat_task = None
+
+    def start(self, pubsub=None):
+        """Follow the pub/sub backend; call it from inside the running event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._unsubscribe = (pubsub or get_pubsub_backend()).subscribe(self.receive)
+        self._heartbeat_task = self._loop.create_task(self._run_heartbeat())
+
+    def stop(self):
+        if self._unsubscribe:
+            self._unsubscribe()
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+        self._unsubscribe = self._heartbeat_task = None
+
+    def receive(self, message):
+        """Pub/sub handler, called from any thread"""
+        message = json.loads(message)
+        if 'match_id' not in message:
+            # Another service's message, e.g. a leaderboard update
+            return
+        self._loop.call_soon_threadsafe(
+            self.publish, message['match_id'], message['update'], message.get('player_totals')
+        )
+
+    def publish(self, match_id, update, player_totals=None):
+        """Append an update to a match's channel, on the loop thread"""
+        self.channel(match_id).append(update, player_totals)
+
+    def channel(self, match_id):
+        channel = self.channels.get(match_id)
+        if channel is None:
+            channel = self.channels[match_id] = MatchChannel(match_id, self.capacity)
+        return channel
+
+    async def subscribe(self, match_id, last_event_id=None):
+        """
+        Yield event frames for a match until the subscriber goes away
+
+        The first frame is a snapshot, unless last_event_id is from this
+        channel and still in the buffer. A heartbeat with nothing new
+        yields KEEP_ALIVE.
+
+        Args:
+            match_id: Match ID
+            last_event_id: Optional ID of the last event the client received
+
+        Yields:
+            Encoded event frames
+        """
+        channel = self.channel(match_id)
+        cursor = channel.cursor(last_event_id)
+        channel.subscribers += 1
+        try:
+            while True:
+                frame = channel.read(cursor)
+                if frame is None:
+                    await channel.wait()
+                    frame = channel.read(cursor) or KEEP_ALIVE
+                cursor = channel.seq
+                yield frame
+        finally:
+            channel.subscribers -= 1
+
+    async def _run_heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            now = time.monotonic()
+            for match_id, channel in list(self.channels.items()):
+                if channel.subscribers:
+                    channel.wake()
+                elif now - channel.updated_at > self.idle_ttl:
+                    del self.channels[match_id]
+
+_hub = None
+
+def init_match_stream(app):
+    """
+    Start this worker's hub; call it from inside the running event loop
+
+    Returns:
+        MatchStreamHub instance
+    """
+    global _hub
+    _hub = MatchStreamHub(
+        capacity=app.config.get('MATCH_STREAM_BUFFER', 256),
+        heartbeat=app.config.get('MATCH_STREAM_HEARTBEAT', 15),
+        idle_ttl=app.config.get('MATCH_STREAM_IDLE_TTL', 3600),
+    )
+    _hub.start()
+    return _hub
+
+def get_match_stream_hub():
+    """Get this worker's hub"""
+    if _hub is None:
+        raise Exception("Match stream not initialized. Call init_match_stream() first.")
+    return _hub
+
+def close_match_stream():
+    global _hub
+    if _hub:
+        _hub.stop()
+    _hub = None
+
+def publish_match_update(match_id, score=None, status=None, player_points=None, player_totals=None):
+    """
+    Publish a live update of a match to its subscribers on every node
+
+    Callable from any process or thread. A score or status change also
+    invalidates the cached match responses, which only reaches other
+    processes through a shared cache backend (CACHE_REDIS_URL); the CLIs
+    that call this require one.
+
+    Args:
+        match_id: Match ID
+        score: Optional new score
+        status: Optional new status
+        player_points: Optional dictionary mapping player ID to the change
+            in their fantasy points
+        player_totals: Optional dictionary mapping those players to their
+            persisted points total after the change; lets a channel seeded
+            concurrently keep the newest total
+    """
+    update = {}
+    if score is not None:
+        update['score'] = score
+    if status is not None:
+        update['status'] = status
+    if player_points:
+        update['player_points'] = {str(player_id): float(delta) for player_id, delta in player_points.items()}
+    if not update:
+        return
+
+    message = {'match_id': str(match_id), 'update': update}
+    if player_points and player_totals:
+        message['player_totals'] = {str(player_id): float(total) for player_id, total in player_totals.items()}
+
+    if 'score' in update or 'status' in update:
+        invalidate_match(match_id)
+    get_pubsub_backend().publish(encode_json(message))
@@ -0,0 +1,30 @@
+"""
+Match catalog queries
+"""
+def build_matches_query(status='all'):
+    """
+    Build the query of the match listing
+
+    Args:
+        status: 'upcoming', 'live', 'completed' or 'all'
+
+    Returns:
+        Mongo query
+    """
+    return {} if status == 'all' else {'status': status}
+
+def build_user_matches_query(user_id, status='all'):
+    """
+    Build the query of a user's matches
+
+    Args:
+        user_id: User ObjectId
+        status: 'upcoming', 'live', 'completed' or 'all'
+
+    Returns:
+        Mongo query matching the (user_id, status) index
+    """
+    query = {'user_id': user_id}
+    if status != 'all':
+        query['status'] = status
+    return query
@@ -0,0 +1,148 @@
+"""
+Materialized fantasy points per player and match
+
+`player_match_points` holds one document per (match, player) with the
+player's stats, total points and points by category (batting, bowling,
+fielding). During a live match it is written by the live scorer, one
+player at a time as their stats change; at completion every player is
+rewritten from the final stats.
+
+`points_snapshots` holds every player's points at the end of each over,
+so "points after over N" and replays are indexed reads.
+"""
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.services.points import (
+    build_stats_matrix,
+    calculate_batch_player_breakdown,
+    calculate_batch_player_points,
+)
+
+def save_player_points(db, match_id, player_id, stats, points, breakdown):
+    """
+    Write one player's materialized points
+
+    Args:
+        db: Database instance
+        match_id: Match ID
+        player_id: Player ID
+        stats: Player statistics so far
+        points: Total points
+        breakdown: Dictionary of category to points
+    """
+    db.player_match_points.update_one(
+        {'match_id': ObjectId(match_id), 'player_id': player_id},
+        {'$set': {'stats': stats, 'points': points, 'breakdown': breakdown, 'updated_at': datetime.utcnow()}},
+        upsert=True
+    )
+
+def materialize_player_points(db, match_id, match_stats, rules=None):
+    """
+    Compute and write every player's points for a match in one bulk write
+
+    Args:
+        db: Database instance
+        match_id: Match ID
+        match_stats: Dictionary mapping player ID to statistics
+        rules: Optional CompiledRuleSet, defaults to the T20 rule set
+
+    Returns:
+        Number of players written
+    """
+    player_ids = list(match_stats)
+    if not player_ids:
+        return 0
+
+    stats_matrix = build_stats_matrix([match_stats[player_id] for player_id in player_ids], rules)
+    points = calculate_batch_player_points(stats_matrix, rules).tolist()
+    breakdowns = calculate_batch_player_breakdown(stats_matrix, rules)
+
+    match_id = ObjectId(match_id)
+    now = datetime.utcnow()
+    db.player_match_points.bulk_write([
+        UpdateOne(
+            {'match_id': match_id, 'player_id': player_id},
+            {'$set': {
+                'stats': match_stats[player_id],
+                'points': player_points,
+                'breakdown': breakdown,
+                'updated_at': now
+            }},
+            upsert=True
+        )
+        for player_id, player_points, breakdown in zip(player_ids, points, breakdowns)
+    ], ordered=False)
+    return len(player_ids)
+
+def get_materialized_points(db, match_id, player_ids=None):
+    """
+    Read materialized player points for a match
+
+    Args:
+        db: Database instance
+        match_id: Match ID
+        player_ids: Optional list of player IDs, all players by default
+
+    Returns:
+        Dictionary mapping player ID to {'points', 'breakdown'}
+    """
+    query = {'match_id': ObjectId(match_id)}
+    if player_ids is not None:
+        query['player_id'] = {'$in': list(player_ids)}
+
+    return {
+        doc['player_id']: {'points': doc['points'], 'breakdown': doc['breakdown']}
+        for doc in db.player_match_points.find(query, {'player_id': 1, 'points': 1, 'breakdown': 1})
+    }
+
+def save_over_snapshot(db, match_id, innings, over, players):
+    """
+    Store every player's points at the end of an over
+
+    Re-saving the same over replaces it.
+
+    Args:
+        db: Database instance
+        match_id: Match ID
+        innings: Innings number
+        over: Over number within the innings
+        players: Dictionary mapping player ID to {'points', 'breakdown'}
+    """
+    db.points_snapshots.update_one(
+        {'match_id': ObjectId(match_id), 'innings': innings, 'over': over},
+        {'$set': {
+            'players': [
+                {'player_id': player_id, 'points': values['points'], 'breakdown': values['breakdown']}
+                for player_id, values in players.items()
+            ],
+            'created_at': datetime.utcnow()
+        }},
+        upsert=True
+    )
+
+def get_points_after_over(db, match_id, innings, over):
+    """
+    Get every player's points as they stood at the end of an over
+
+    Returns:
+        Snapshot document, or None if that over has no snapshot
+    """
+    return db.points_snapshots.find_one(
+        {'match_id': ObjectId(match_id), 'innings': innings, 'over': over},
+        {'_id': 0}
+    )
+
+def iter_replay(db, match_id):
+    """
+    Stream a match's over snapshots in play order
+
+    Yields:
+        Snapshot documents
+    """
+    yield from db.points_snapshots.find(
+        {'match_id': ObjectId(match_id)},
+        {'_id': 0}
+    ).sort([('innings', 1), ('over', 1)])
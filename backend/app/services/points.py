@@ -1,69 +1,172 @@
 """
 Points calculation service for fantasy sports
 """
+import numpy as np
+
+from app.services.scoring_rules import get_default_rule_set
+
+def build_stats_matrix(players_stats, rules=None):
+    """
+    Build a columnar stats matrix for a batch of players
+
+    Args:
+        players_stats: List of player statistics dictionaries
+        rules: Optional CompiledRuleSet, defaults to the T20 rule set
+
+    Returns:
+        Array of shape (players, len(rules.fields)), one row per player
+    """
+    fields = (rules or get_default_rule_set()).fields
+
+    rows = [[stats.get(field, 0) for field in fields] for stats in players_stats]
+    if not rows:
+        return np.zeros((0, len(fields)), dtype=np.int64)
+    return np.asarray(rows)
+
+def calculate_batch_player_points(stats_matrix, rules=None):
+    """
+    Calculate points for every player of a match in a single pass
+
+    Args:
+        stats_matrix: Array built by build_stats_matrix with the same rules
+        rules: Optional CompiledRuleSet, defaults to the T20 rule set
+
+    Returns:
+        Array with the total points of each player
+    """
+    return (rules or get_default_rule_set()).evaluate(stats_matrix)
+
+def calculate_batch_player_breakdown(stats_matrix, rules=None):
+    """
+    Calculate every player's points by category (batting, bowling, ...)
+
+    Args:
+        stats_matrix: Array built by build_stats_matrix with the same rules
+        rules: Optional CompiledRuleSet, defaults to the T20 rule set
+
+    Returns:
+        List with a dictionary of category to points for each player
+    """
+    rules = rules or get_default_rule_set()
+    return [dict(zip(rules.categories, row)) for row in rules.evaluate_categories(stats_matrix).tolist()]
+
+def build_team_matrix(teams, player_index):
+    """
+    Build a matrix of player row indices for a batch of fantasy teams
+
+    Args:
+        teams: List of teams, each a list of player IDs
+        player_index: Dictionary mapping player ID to its stats matrix row
+
+    Returns:
+        Integer array of shape (teams, max team size), padded with -1
+    """
+    width = max((len(team) for team in teams), default=0)
+    team_matrix = np.full((len(teams), width), -1, dtype=np.int64)
+
+    for row, team in enumerate(teams):
+        team_matrix[row, :len(team)] = [player_index[player_id] for player_id in team]
+
+    return team_matrix
+
+def calculate_batch_team_points(player_points, team_matrix):
+    """
+    Calculate totals for a batch of fantasy teams from precomputed player points
+
+    Args:
+        player_points: Array returned by calculate_batch_player_points
+        team_matrix: Array built by build_team_matrix
+
+    Returns:
+        Array with the total points of each team
+    """
+    # Padding slots (-1) read the trailing zero appended here
+    padded_points = np.append(player_points, np.zeros(1, dtype=player_points.dtype))
+
+    totals = np.zeros(len(team_matrix), dtype=padded_points.dtype)
+    for column in range(team_matrix.shape[1]):
+        totals = totals + padded_points[team_matrix[:, column]]
+
+    return totals
+
+def score_match(match_stats, teams, rules=None):
+    """
+    Score every fantasy team of a match, paying the per-player cost once
+
+    Args:
+        match_stats: Dictionary mapping player ID to player statistics
+        teams: List of teams, each a list of player IDs
+        rules: Optional CompiledRuleSet, defaults to the T20 rule set
+
+    Returns:
+        Tuple of (dictionary of player ID to points, array of team totals)
+    """
+    player_ids = list(match_stats)
+    player_index = {player_id: row for row, player_id in enumerate(player_ids)}
+
+    player_points = calculate_batch_player_points(
+        build_stats_matrix([match_stats[player_id] for player_id in player_ids], rules), rules
+    )
+    team_points = calculate_batch_team_points(player_points, build_team_matrix(teams, player_index))
+
+    return dict(zip(player_ids, player_points.tolist())), team_points
+
+def calculate_points_delta(player_stats, stat_delta, rules=None):
+    """
+    Apply a stat delta to a player and calculate the resulting change in points
+
+    Milestone bonuses make points non-linear in the stats, so the change is
+    computed from the cumulative stats before and after the delta rather than
+    from the delta alone.
+
+    Args:
+        player_stats: Dictionary containing the player's statistics so far
+        stat_delta: Dictionary of stat increments (negative for corrections)
+        rules: Optional CompiledRuleSet, defaults to the T20 rule set
+
+    Returns:
+        Tuple of (updated statistics dictionary, change in points)
+    """
+    rules = rules or get_default_rule_set()
+
+    updated_stats = dict(player_stats)
+    for field, value in stat_delta.items():
+        updated_stats[field] = updated_stats.get(field, 0) + value
+
+    return updated_stats, rules.evaluate_row(updated_stats) - rules.evaluate_row(player_stats)
 
 def calculate_player_points(player_stats):
     """
     Calculate points for a player based on their match statistics
-    
+
+    A single player is scored without NumPy, which only pays off for
+    batches; the result equals calculate_batch_player_points exactly.
+
     Args:
         player_stats: Dictionary containing player statistics
-    
+
     Returns:
         Total points scored by the player
     """
-    points = 0
-    
-    # Batting points
-    runs = player_stats.get('runs', 0)
-    points += runs * 1  # 1 point per run
-    
-    fours = player_stats.get('fours', 0)
-    points += fours * 1  # 1 point per four
-    
-    sixes = player_stats.get('sixes', 0)
-    points += sixes * 2  # 2 points per six
-    
-    # Milestone bonuses
-    if runs >= 50:
-        points += 8  # Half century bonus
-    if runs >= 100:
-        points += 16  # Century bonus
-    
-    # Bowling points
-    wickets = player_stats.get('wickets', 0)
-    points += wickets * 25  # 25 points per wicket
-    
-    maidens = player_stats.get('maidens', 0)
-    points += maidens * 12  # 12 points per maiden over
-    
-    # Fielding points
-    catches = player_stats.get('catches', 0)
-    points += catches * 8  # 8 points per catch
-    
-    stumpings = player_stats.get('stumpings', 0)
-    points += stumpings * 12  # 12 points per stumping
-    
-    run_outs = player_stats.get('run_outs', 0)
-    points += run_outs * 6  # 6 points per run out
-    
-    return points
+    return get_default_rule_set().evaluate_row(player_stats)
 
 def calculate_team_points(team):
     """
     Calculate total points for a fantasy team
-    
+
+    A team is a handful of players, so they are scored one at a time and
+    summed in team order, like calculate_batch_team_points.
+
     Args:
         team: Dictionary containing team players and their stats
-    
+
     Returns:
         Total points for the team
     """
+    rules = get_default_rule_set()
+
     total_points = 0
-    
     for player in team.get('players', []):
-        player_points = calculate_player_points(player.get('stats', {}))
-        total_points += player_points
-    
-    return total_points
+        total_points = total_points + rules.evaluate_row(player.get('stats', {}))
 
+    return total_points
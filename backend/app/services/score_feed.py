@@ -0,0 +1,188 @@
+"""
+Live score feed: drive a live match from ball-by-ball events
+
+    python -m app.services.score_feed <match_id> [events.ndjson]
+
+Reads one JSON event per line, from stdin by default:
+
+    {"player_id": "p1", "stats": {"runs": 4}}   a player's stat delta
+    {"score": {"A": "14/0"}}                    the match score
+    {"status": "live"}                          the match status
+    {"innings": 1, "over": 3}                   the end of an over
+
+Stat deltas go through the match's live scorer (app.services.live_scoring),
+which materializes the player's points and publishes the change to the
+match stream. Score and status are stored on the match and published. At
+the end of each over every player's points are snapshotted and the teams'
+running totals are carried over to their league entries (record_over).
+The scorer is rebuilt from `player_match_points` on start, so a restarted
+feed carries on from the stats already recorded. Completing the match is
+left to app.services.match_completion.
+
+The feed stops at the first malformed event rather than skip a delta.
+"""
+import argparse
+import json
+import sys
+
+from bson import ObjectId
+
+from app.services.live_scoring import load_live_scorer, record_live_delta, record_over
+from app.services.match_stream import publish_match_update
+from app.utils.db import read_primary
+
+# Outcomes of start_feed
+STARTED = 'started'
+MATCH_NOT_FOUND = 'match_not_found'
+MATCH_NOT_LIVE = 'match_not_live'
+
+def start_feed(db, match_id):
+    """
+    Register the live scorer of a match, seeded with its recorded stats
+
+    Args:
+        db: Database instance
+        match_id: Match ID
+
+    Returns:
+        Outcome constant
+    """
+    match = read_primary(db.matches).find_one({'_id': ObjectId(match_id)}, {'status': 1})
+    if not match:
+        return MATCH_NOT_FOUND
+    if match.get('status') != 'live':
+        return MATCH_NOT_LIVE
+
+    match_stats = {
+        doc['player_id']: doc['stats']
+        for doc in db.player_match_points.find({'match_id': ObjectId(match_id)}, {'player_id': 1, 'stats': 1})
+        if doc.get('stats')
+    }
+    load_live_scorer(db, match_id, match_stats)
+    return STARTED
+
+def update_match(db, match_id, score=None, status=None):
+    """
+    Store a live match's new score or status and publish it
+
+    The cached match responses are invalidated through the cache backend
+    of this process, so run outside the API workers only with
+    CACHE_REDIS_URL set (main checks it).
+
+    Args:
+        db: Database instance
+        match_id: Match ID
+        score: Optional new score
+        status: Optional new status
+    """
+    changes = {key: value for key, value in (('score', score), ('status', status)) if value is not None}
+    if not changes:
+        return
+    db.matches.update_one({'_id': ObjectId(match_id)}, {'$set': changes})
+    publish_match_update(match_id, score=score, status=status)
+
+def apply_event(db, match_id, event):
+    """
+    Apply one feed event to a match started with start_feed
+
+    Args:
+        db: Database instance
+        match_id: Match ID
+        event: Event dictionary
+
+    Raises:
+        ValueError: If the event is malformed
+    """
+    if not isinstance(event, dict):
+        raise ValueError('Event must be an object')
+
+    if 'player_id' in event:
+        stats = event.get('stats')
+        if not isinstance(stats, dict):
+            raise ValueError('A stat delta needs a "stats" object')
+        if record_live_delta(match_id, event['player_id'], stats, db=db) is None:
+            raise ValueError('The match has no live scorer')
+    elif 'over' in event:
+        innings, over = event.get('innings'), event['over']
+        if not all(isinstance(value, int) and not isinstance(value, bool) for value in (innings, over)):
+            raise ValueError('The end of an over needs integer "innings" and "over"')
+        if not record_over(db, match_id, innings, over):
+            raise ValueError('The match has no live scorer')
+    elif 'score' in event or 'status' in event:
+        if event.get('status') == 'completed':
+            raise ValueError('Complete the match with app.services.match_completion')
+        update_match(db, match_id, event.get('score'), event.get('status'))
+    else:
+        raise ValueError('Unknown event')
+
+def run_feed(db, match_id, lines):
+    """
+    Apply a stream of NDJSON feed events
+
+    Args:
+        db: Database instance
+        match_id: Match ID
+        lines: Iterable of lines, blank lines are skipped
+
+    Returns:
+        Number of events applied
+
+    Raises:
+        ValueError: At the first malformed event, with its line number
+    """
+    applied = 0
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            apply_event(db, match_id, json.loads(line))
+        except ValueError as e:
+            raise ValueError(f'line {number}: {e}')
+        applied += 1
+    return applied
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Feed ball-by-ball events into a live match')
+    parser.add_argument('match_id')
+    parser.add_argument('events', nargs='?', help='NDJSON file of events, stdin by default')
+    args = parser.parse_args(argv)
+
+    from flask import Flask
+    from app.utils.db import init_db, get_db
+    from app.utils.cache import init_cache, require_shared_cache
+    from app.utils.pubsub import init_pubsub, require_shared_pubsub
+
+    app = Flask(__name__)
+    app.config.from_object('app.config.Config')
+    try:
+        # Match stream and leaderboard updates must reach the API workers
+        require_shared_pubsub(app.config, 'for the score feed')
+        # So must the invalidation of their cached match responses
+        require_shared_cache(app.config, 'for the score feed')
+    except RuntimeError as e:
+        parser.error(str(e))
+    init_db(app)
+    init_pubsub(app)
+    init_cache(app)
+
+    db = get_db()
+    outcome = start_feed(db, args.match_id)
+    if outcome != STARTED:
+        print(outcome)
+        return 1
+
+    events = open(args.events) if args.events else sys.stdin
+    try:
+        applied = run_feed(db, args.match_id, events)
+    except ValueError as e:
+        print(f'Stopped at {e}', file=sys.stderr)
+        return 1
+    finally:
+        if events is not sys.stdin:
+            events.close()
+
+    print(f'{applied} events applied')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
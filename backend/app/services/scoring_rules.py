@@ -0,0 +1,281 @@
+"""
+Scoring rule sets for fantasy points
+
+A rule set is a declarative schema stored in the `scoring_rules` collection
+or as a JSON file under `rule_sets/`:
+
+    {
+        "name": "t20",
+        "version": 1,
+        "stats": [{"field": "runs", "category": "batting", "points": 1}, ...],
+        "milestones": [{"field": "runs", "threshold": 50, "bonus": 8}, ...]
+    }
+
+Each (name, version) is compiled once into a weight vector plus threshold
+tables and cached, so scoring under any format costs the same.
+"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.utils.db import read_primary
+
+DEFAULT_RULE_SET = 't20'
+
+RULE_SETS_DIR = os.path.join(os.path.dirname(__file__), 'rule_sets')
+
+# Seconds a "latest version" lookup for an unpinned rule set name is trusted
+LATEST_VERSION_TTL = 60
+
+_default_rule_set = None
+_compiled_rule_sets = {}
+_latest_versions = {}
+_cache_lock = threading.Lock()
+
+class CompiledRuleSet:
+    """
+    Fast evaluator for one version of a scoring schema
+
+    Stats matrices scored by a rule set have one column per entry of
+    `fields`. Columns and milestone bonuses are accumulated category by
+    category, in schema order.
+    """
+
+    def __init__(self, schema):
+        self.name = schema['name']
+        self.version = schema['version']
+
+        stats = schema.get('stats', [])
+        milestones = schema.get('milestones', [])
+
+        self.fields = tuple(stat['field'] for stat in stats)
+        if len(set(self.fields)) != len(self.fields):
+            raise ValueError(f"Rule set {self.name} declares a stat more than once")
+
+        self.weights = np.array([stat['points'] for stat in stats])
+        self.categories = tuple(dict.fromkeys(stat['category'] for stat in stats))
+
+        columns = {field: column for column, field in enumerate(self.fields)}
+        categories = [stat['category'] for stat in stats]
+
+        for milestone in milestones:
+            if milestone['field'] not in columns:
+                raise ValueError(f"Rule set {self.name} has a milestone on unknown stat {milestone['field']}")
+
+        # Threshold tables: stat column, threshold and bonus of each milestone
+        self.milestone_columns = np.array([columns[m['field']] for m in milestones], dtype=np.int64)
+        self.milestone_thresholds = np.array([m['threshold'] for m in milestones])
+        self.milestone_bonuses = np.array([m['bonus'] for m in milestones])
+
+        # Evaluation plan per category: (column, weight) steps for the stats,
+        # then (column, threshold, bonus) steps for the milestones
+        self.plan = []
+        for category in self.categories:
+            stat_steps = [
+                (column, stat['points']) for column, stat in enumerate(stats)
+                if stat['category'] == category
+            ]
+            milestone_steps = [
+                (columns[m['field']], m['threshold'], m['bonus']) for m in milestones
+                if categories[columns[m['field']]] == category
+            ]
+            self.plan.append((category, stat_steps, milestone_steps))
+
+        # The same plan keyed by stat name, for scoring a single stats dictionary
+        self.row_plan = [
+            (
+                [(self.fields[column], weight) for column, weight in stat_steps],
+                [(self.fields[column], threshold, bonus) for column, threshold, bonus in milestone_steps],
+            )
+            for _, stat_steps, milestone_steps in self.plan
+        ]
+
+    @property
+    def key(self):
+        return (self.name, self.version)
+
+    def evaluate(self, stats_matrix):
+        """
+        Calculate points for every row of a stats matrix
+
+        Args:
+            stats_matrix: Array of shape (players, len(fields))
+
+        Returns:
+            Array with the total points of each player
+        """
+        points = np.zeros(len(stats_matrix), dtype=stats_matrix.dtype)
+        for _, stat_steps, milestone_steps in self.plan:
+            points = self._add_steps(points, stats_matrix, stat_steps, milestone_steps)
+        return points
+
+    @staticmethod
+    def _add_steps(points, stats_matrix, stat_steps, milestone_steps):
+        """Add one category's stat and milestone steps to a points array"""
+        # Steps are accumulated one at a time, in the order a per-player
+        # formula would add them, so float totals match it bit for bit
+        for column, weight in stat_steps:
+            points = points + stats_matrix[:, column] * weight
+
+        for column, threshold, bonus in milestone_steps:
+            points = points + (stats_matrix[:, column] >= threshold) * bonus
+
+        return points
+
+    def evaluate_row(self, stats):
+        """
+        Calculate the points of a single player without building a matrix
+
+        Adds the same steps in the same order as evaluate, so the result
+        equals that player's row of the batch result exactly.
+
+        Args:
+            stats: Dictionary of statistics, missing stats count as 0
+
+        Returns:
+            Total points
+        """
+        points = 0
+        for stat_steps, milestone_steps in self.row_plan:
+            for field, weight in stat_steps:
+                points = points + stats.get(field, 0) * weight
+
+            for field, threshold, bonus in milestone_steps:
+                points = points + (stats.get(field, 0) >= threshold) * bonus
+
+        return points
+
+    def evaluate_categories(self, stats_matrix):
+        """
+        Calculate points per category for every row of a stats matrix
+
+        Args:
+            stats_matrix: Array of shape (players, len(fields))
+
+        Returns:
+            Array of shape (players, len(categories)), columns in
+            `categories` order
+        """
+        columns = [
+            self._add_steps(np.zeros(len(stats_matrix), dtype=stats_matrix.dtype), stats_matrix, stat_steps, milestone_steps)
+            for _, stat_steps, milestone_steps in self.plan
+        ]
+
+        if not columns:
+            return np.zeros((len(stats_matrix), 0), dtype=stats_matrix.dtype)
+        return np.column_stack(columns)
+
+def compile_rule_set(schema):
+    """
+    Compile a scoring schema, reusing the cached evaluator for its version
+
+    Args:
+        schema: Rule set dictionary with name, version, stats and milestones
+
+    Returns:
+        CompiledRuleSet for the schema
+    """
+    key = (schema['name'], schema['version'])
+    compiled = _compiled_rule_sets.get(key)
+    if compiled is None:
+        compiled = CompiledRuleSet(schema)
+        with _cache_lock:
+            compiled = _compiled_rule_sets.setdefault(key, compiled)
+    return compiled
+
+def load_rule_set_file(name):
+    """
+    Load a bundled rule set schema from the rule_sets directory
+
+    Args:
+        name: Rule set name
+
+    Returns:
+        Rule set dictionary, or None if no file exists for the name
+    """
+    path = os.path.join(RULE_SETS_DIR, f'{name}.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def get_default_rule_set():
+    """Get the compiled default (T20) rule set bundled with the app"""
+    global _default_rule_set
+    if _default_rule_set is None:
+        _default_rule_set = compile_rule_set(load_rule_set_file(DEFAULT_RULE_SET))
+    return _default_rule_set
+
+def get_rule_set(name, version=None, db=None):
+    """
+    Get a compiled rule set by name and optional version
+
+    Schemas are looked up in the `scoring_rules` collection when a database
+    is given, falling back to the bundled JSON files. Without a version the
+    latest one is used, and the lookup is cached for LATEST_VERSION_TTL.
+
+    Args:
+        name: Rule set name
+        version: Optional schema version
+        db: Optional database instance
+
+    Returns:
+        CompiledRuleSet
+
+    Raises:
+        ValueError: If no schema exists for the name and version
+    """
+    if version is None:
+        latest = _latest_versions.get(name)
+        if latest and latest[1] > time.monotonic():
+            version = latest[0]
+
+    if version is not None:
+        compiled = _compiled_rule_sets.get((name, version))
+        if compiled is not None:
+            return compiled
+
+    schema = None
+    if db is not None:
+        query = {'name': name}
+        if version is not None:
+            query['version'] = version
+        schema = read_primary(db.scoring_rules).find_one(query, {'_id': 0}, sort=[('version', -1)])
+
+    if schema is None:
+        schema = load_rule_set_file(name)
+        if schema is not None and version is not None and schema['version'] != version:
+            schema = None
+
+    if schema is None:
+        raise ValueError(f"Unknown scoring rule set {name} (version {version})")
+
+    compiled = compile_rule_set(schema)
+    if version is None:
+        with _cache_lock:
+            _latest_versions[name] = (compiled.version, time.monotonic() + LATEST_VERSION_TTL)
+    return compiled
+
+def resolve_rule_set(doc, db=None):
+    """
+    Get the rule set referenced by a league or match document
+
+    The `scoring_rules` field may hold a rule set name or a
+    {'name': ..., 'version': ...} reference; without it the default applies.
+
+    Args:
+        doc: League or match document
+        db: Optional database instance
+
+    Returns:
+        CompiledRuleSet
+    """
+    reference = (doc or {}).get('scoring_rules')
+    if not reference:
+        return get_default_rule_set()
+    if isinstance(reference, str):
+        return get_rule_set(reference, db=db)
+    return get_rule_set(reference['name'], reference.get('version'), db=db)
@@ -0,0 +1,274 @@
+"""
+Prize settlement service for completed leagues
+"""
+import time
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.services.ledger import (
+    build_entries,
+    league_account,
+    to_paise,
+    to_rupees,
+    user_account,
+    wallet_increment,
+)
+from app.utils.cache import invalidate_leagues
+from app.utils.db import read_primary, run_in_transaction
+
+SETTLEMENT_CHUNK_SIZE = 1000
+
+# A chunk that aborts on a conflict is re-read and retried this many times
+SETTLEMENT_CHUNK_ATTEMPTS = 5
+SETTLEMENT_RETRY_DELAY = 0.05  # seconds, doubled on each retry
+
+# Outcomes of settle_league
+SETTLED = 'settled'
+LEAGUE_NOT_FOUND = 'league_not_found'
+MATCH_NOT_COMPLETED = 'match_not_completed'
+ALREADY_SETTLED = 'already_settled'
+
+# League statuses; a league without one is open
+SETTLING = 'settling'
+
+def build_prize_ladder(prize_table):
+    """
+    Expand a league prize table into a prize per rank
+
+    Args:
+        prize_table: List of {'rank_from', 'rank_to', 'amount'} dictionaries
+
+    Returns:
+        List where index i holds the prize for rank i + 1, in integer paise
+    """
+    paid_ranks = max((row['rank_to'] for row in prize_table), default=0)
+    ladder = [0] * paid_ranks
+    for row in prize_table:
+        for rank in range(row['rank_from'], row['rank_to'] + 1):
+            ladder[rank - 1] = to_paise(row['amount'])
+    return ladder
+
+def split_tied_prize(ladder, rank, tied_entries):
+    """
+    Share the prizes of the ranks covered by a group of tied entries
+
+    The pooled prize is split evenly in paise. The paise left over go one
+    each to the first entries of the tie in standings order, so the whole
+    pool is paid and the split is the same on every run.
+
+    Args:
+        ladder: Prize per rank from build_prize_ladder, in paise
+        rank: Rank shared by the tied entries
+        tied_entries: Number of entries in the tie
+
+    Returns:
+        List of the prize of each tied entry in standings order, in paise
+    """
+    pooled = sum(ladder[rank - 1:rank - 1 + tied_entries])
+    share, remainder = divmod(pooled, tied_entries)
+    return [share + 1] * remainder + [share] * (tied_entries - remainder)
+
+def iter_winners(db, league_id, ladder, batch_size=SETTLEMENT_CHUNK_SIZE):
+    """
+    Stream a league's final standings and yield the entries that win a prize
+
+    Args:
+        db: Database instance
+        league_id: League ObjectId
+        ladder: Prize per rank from build_prize_ladder
+        batch_size: Cursor batch size
+
+    Yields:
+        Tuples of (entry, rank, amount in paise)
+    """
+    if not ladder:
+        return
+
+    cursor = db.league_participants.find(
+        {'league_id': league_id},
+        {'user_id': 1, 'points': 1}
+    ).sort([('points', -1), ('_id', 1)]).batch_size(batch_size)
+
+    position = 0
+    tie = []
+
+    def settle_tie():
+        rank = position - len(tie) + 1
+        amounts = split_tied_prize(ladder, rank, len(tie))
+        return [(entry, rank, amount) for entry, amount in zip(tie, amounts) if amount > 0]
+
+    for entry in cursor:
+        if tie and entry.get('points', 0) != tie[0].get('points', 0):
+            yield from settle_tie()
+            tie = []
+            # Ranks past the ladder win nothing, and neither can later ties
+            if position >= len(ladder):
+                break
+        tie.append(entry)
+        position += 1
+    else:
+        if tie:
+            yield from settle_tie()
+
+def _apply_chunk(db, league, chunk):
+    """
+    Write the credits of one chunk of winners, skipping settled entries
+
+    Returns:
+        Tuple of (entries paid, amount paid in paise)
+    """
+    keys = [f"settlement:{league['_id']}:{entry['_id']}" for entry, _, _ in chunk]
+    settled = {
+        transaction['idempotency_key']
+        for transaction in db.transactions.find(
+            {'idempotency_key': {'$in': keys}},
+            {'idempotency_key': 1}
+        )
+    }
+
+    pending = [(key, winner) for key, winner in zip(keys, chunk) if key not in settled]
+    if not pending:
+        return 0, 0
+
+    # The ledger and wallets hold paise; the user-facing records show rupees
+    pending = [(key, (entry, rank, paise, to_rupees(paise))) for key, (entry, rank, paise) in pending]
+
+    now = datetime.utcnow()
+    transactions = [
+        {
+            'user_id': entry['user_id'],
+            'type': 'credit',
+            'amount': amount,
+            'description': f"Winnings - {league.get('name', 'League')} (rank {rank})",
+            'league_id': league['_id'],
+            'idempotency_key': key,
+            'created_at': now
+        }
+        for key, (entry, rank, _, amount) in pending
+    ]
+    entries = []
+    for key, (entry, _, paise, _) in pending:
+        entries.extend(build_entries(
+            key,
+            [(user_account(entry['user_id']), paise), (league_account(league['_id']), -paise)],
+            'Winnings',
+            now
+        ))
+    credits = [
+        UpdateOne({'_id': entry['user_id']}, wallet_increment(paise))
+        for _, (entry, _, paise, _) in pending
+    ]
+    results = [
+        UpdateOne({'_id': entry['_id']}, {'$set': {'rank': rank, 'winnings': amount}})
+        for _, (entry, rank, _, amount) in pending
+    ]
+
+    def write(session):
+        # The unique idempotency_key index aborts the whole chunk if a
+        # concurrent settlement already credited any of these entries
+        db.transactions.insert_many(transactions, ordered=False, session=session)
+        db.ledger_entries.insert_many(entries, ordered=False, session=session)
+        db.users.bulk_write(credits, ordered=False, session=session)
+        db.league_participants.bulk_write(results, ordered=False, session=session)
+
+    run_in_transaction(write)
+    return len(pending), sum(paise for _, (_, _, paise, _) in pending)
+
+def _is_conflict(error):
+    """A chunk error that a retry resolves: a transaction conflict, or a concurrent run's credits"""
+    if error.has_error_label('TransientTransactionError'):
+        return True
+    return isinstance(error, BulkWriteError) and any(
+        write_error.get('code') == 11000 for write_error in error.details.get('writeErrors', [])
+    )
+
+def _settle_chunk(db, league, chunk):
+    """
+    Apply a chunk, retrying it when its transaction aborts on a conflict
+
+    The driver retries transient errors for a while on its own; a chunk
+    that still aborts, or that collides with credits a concurrent run
+    wrote, is retried from its read of the settled entries, so only the
+    entries still unpaid are credited.
+    """
+    for attempt in range(SETTLEMENT_CHUNK_ATTEMPTS):
+        try:
+            return _apply_chunk(db, league, chunk)
+        except PyMongoError as e:
+            if attempt == SETTLEMENT_CHUNK_ATTEMPTS - 1 or not _is_conflict(e):
+                raise
+            time.sleep(SETTLEMENT_RETRY_DELAY * 2 ** attempt)
+
+def settle_league(db, league_id, chunk_size=SETTLEMENT_CHUNK_SIZE):
+    """
+    Pay out a league's prizes from its final leaderboard
+
+    Only a league whose match is completed is settled. The league is marked
+    `settling` before any prize is paid and `settled` once all are, after
+    which it is never paid again. Winners are credited in chunks; each chunk
+    inserts its `transactions` records, ledger entries and wallet credits in
+    one multi-document transaction using unordered bulk writes. Every credit
+    carries an idempotency key, so re-running a league left `settling` by an
+    interrupted run only pays the remaining entries.
+
+    Args:
+        db: Database instance
+        league_id: League ID
+        chunk_size: Number of winners written per chunk
+
+    Returns:
+        Tuple of (outcome constant, dictionary with the number of entries
+        paid and the total amount, or None unless SETTLED)
+    """
+    league = read_primary(db.leagues).find_one(
+        {'_id': ObjectId(league_id)},
+        {'name': 1, 'prize_table': 1, 'status': 1, 'match_id': 1}
+    )
+    if not league:
+        return LEAGUE_NOT_FOUND, None
+    if league.get('status') == SETTLED:
+        return ALREADY_SETTLED, None
+
+    match = read_primary(db.matches).find_one({'_id': league.get('match_id')}, {'status': 1}) \
+        if league.get('match_id') else None
+    if not match or match.get('status') != 'completed':
+        return MATCH_NOT_COMPLETED, None
+
+    # Claim the league; a run that lost the race to finish it stops here
+    claimed = db.leagues.update_one(
+        {'_id': league['_id'], 'status': {'$ne': SETTLED}},
+        {'$set': {'status': SETTLING}}
+    )
+    if claimed.matched_count == 0:
+        return ALREADY_SETTLED, None
+    if claimed.modified_count:
+        invalidate_leagues()
+
+    ladder = build_prize_ladder(league.get('prize_table', []))
+
+    paid_entries = 0
+    paid_amount = 0
+    chunk = []
+    for winner in iter_winners(db, league['_id'], ladder, chunk_size):
+        chunk.append(winner)
+        if len(chunk) == chunk_size:
+            count, amount = _settle_chunk(db, league, chunk)
+            paid_entries, paid_amount = paid_entries + count, paid_amount + amount
+            chunk = []
+
+    if chunk:
+        count, amount = _settle_chunk(db, league, chunk)
+        paid_entries, paid_amount = paid_entries + count, paid_amount + amount
+
+    db.leagues.update_one(
+        {'_id': league['_id']},
+        {'$set': {'status': SETTLED, 'settled_at': datetime.utcnow()}}
+    )
+    # The listing shows the status; other workers only see it through a
+    # shared cache backend, else once their cached listing expires
+    invalidate_leagues()
+
+    return SETTLED, {'paid_entries': paid_entries, 'paid_amount': to_rupees(paid_amount)}
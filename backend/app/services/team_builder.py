@@ -0,0 +1,299 @@
+"""
+Fantasy team builder
+
+Teams are checked against a per-match PlayerTable, built once from the
+match's `players` and kept in process. Each player of the squad is one bit:
+a team is the OR of its players' bits, so the duplicate check is a
+popcount, and each role or side count is the popcount of the team mask
+ANDed with that role's or side's mask. Credits are summed from a
+precomputed tuple.
+"""
+import hashlib
+import threading
+import time
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.utils.db import read_primary
+
+# Team constraints
+TEAM_SIZE = 11
+CREDIT_CAP = 100
+MAX_PER_SIDE = 7  # players from one real team
+ROLE_LIMITS = {'wk': (1, 4), 'bat': (3, 6), 'ar': (1, 4), 'bowl': (3, 6)}  # (min, max)
+
+# Teams a user may hold per match, and so submit in one request
+MAX_TEAMS_PER_MATCH = 20
+
+# Seconds a loaded player table is used before it is reloaded, so that
+# squad changes made by other processes are picked up
+PLAYER_TABLE_MAX_AGE = 60
+
+# Outcomes of a team submission
+CREATED = 'created'
+VALID = 'valid'
+WRONG_TEAM_SIZE = 'wrong_team_size'
+UNKNOWN_PLAYER = 'unknown_player'
+DUPLICATE_PLAYER = 'duplicate_player'
+OVER_CREDIT_CAP = 'over_credit_cap'
+ROLE_LIMIT = 'role_limit'
+SIDE_LIMIT = 'side_limit'
+DUPLICATE_TEAM = 'duplicate_team'
+TEAM_LIMIT = 'team_limit'
+
+# Outcomes of a whole request
+MATCH_NOT_FOUND = 'match_not_found'
+MATCH_LOCKED = 'match_locked'
+TOO_MANY_TEAMS = 'too_many_teams'
+
+_player_tables = {}
+_player_tables_lock = threading.Lock()
+
+def lineup_hash(player_ids):
+    """
+    Canonical hash of a lineup: the same players in any order hash the same
+
+    Args:
+        player_ids: Iterable of player IDs
+
+    Returns:
+        Hex digest
+    """
+    return hashlib.sha1('|'.join(sorted(map(str, player_ids))).encode()).hexdigest()
+
+class PlayerTable:
+    """
+    Squad of one match, precomputed for team validation
+
+    Rows follow player ID order. Credits are kept in tenths so that sums
+    are exact.
+    """
+
+    def __init__(self, match_id, players):
+        """
+        Args:
+            match_id: Match ID
+            players: Iterable of {'player_id', 'role', 'team', 'credits'}
+        """
+        self.match_id = str(match_id)
+        self.loaded_at = time.monotonic()
+        self.rows = {}
+        self.role_masks = dict.fromkeys(ROLE_LIMITS, 0)
+        self.side_masks = {}
+        credits = []
+
+        for row, player in enumerate(sorted(players, key=lambda player: str(player['player_id']))):
+            bit = 1 << row
+            self.rows[str(player['player_id'])] = row
+            credits.append(round(player.get('credits', 0) * 10))
+            if player.get('role') not in self.role_masks:
+                raise ValueError(f"Player {player['player_id']} has unknown role {player.get('role')!r}")
+            self.role_masks[player['role']] |= bit
+            self.side_masks[player['team']] = self.side_masks.get(player['team'], 0) | bit
+
+        self.credits = tuple(credits)
+        self._side_masks = tuple(self.side_masks.values())
+        self._role_checks = tuple(
+            (self.role_masks[role], low, high) for role, (low, high) in ROLE_LIMITS.items()
+        )
+        self._credit_cap = CREDIT_CAP * 10
+
+    def validate(self, player_ids):
+        """
+        Check a lineup against the team constraints
+
+        Args:
+            player_ids: List of player IDs (strings)
+
+        Returns:
+            VALID or the first constraint the lineup breaks
+        """
+        if len(player_ids) != TEAM_SIZE:
+            return WRONG_TEAM_SIZE
+
+        rows = self.rows
+        credits = self.credits
+        mask = 0
+        total = 0
+        for player_id in player_ids:
+            row = rows.get(player_id)
+            if row is None:
+                return UNKNOWN_PLAYER
+            mask |= 1 << row
+            total += credits[row]
+
+        if mask.bit_count() != TEAM_SIZE:
+            return DUPLICATE_PLAYER
+        if total > self._credit_cap:
+            return OVER_CREDIT_CAP
+        for role_mask, low, high in self._role_checks:
+            if not low <= (mask & role_mask).bit_count() <= high:
+                return ROLE_LIMIT
+        for side_mask in self._side_masks:
+            if (mask & side_mask).bit_count() > MAX_PER_SIDE:
+                return SIDE_LIMIT
+        return VALID
+
+def get_player_table(db, match_id):
+    """
+    Get the player table of a match, loading it if missing or stale
+
+    Args:
+        db: Database instance
+        match_id: Match ID
+
+    Returns:
+        PlayerTable, or None if the match does not exist
+    """
+    match_id = str(match_id)
+    table = _player_tables.get(match_id)
+    if table is not None and time.monotonic() - table.loaded_at < PLAYER_TABLE_MAX_AGE:
+        return table
+
+    match = read_primary(db.matches).find_one({'_id': ObjectId(match_id)}, {'players': 1})
+    if match is None:
+        return None
+
+    table = PlayerTable(match_id, match.get('players', []))
+    with _player_tables_lock:
+        _player_tables[match_id] = table
+    return table
+
+def drop_player_table(match_id):
+    """Forget a match's player table, e.g. after its squad changes"""
+    with _player_tables_lock:
+        _player_tables.pop(str(match_id), None)
+
+def _reserve_slots(db, user_id, match_id, wanted):
+    """
+    Reserve up to `wanted` of a user's team slots for a match
+
+    Slots are counted on one `team_quotas` document per (user, match),
+    only ever changed by guarded updates, so concurrent batches cannot
+    take more than MAX_TEAMS_PER_MATCH between them. The first reservation
+    starts the counter at the teams the user already holds.
+
+    Returns:
+        Tuple of (quota document ID, number of slots reserved)
+    """
+    quota_id = f'{user_id}:{match_id}'
+    if not db.team_quotas.find_one({'_id': quota_id}, {'_id': 1}):
+        # Matches the partial lineup index, so the count is served from it
+        held = db.user_matches.count_documents(
+            {'user_id': user_id, 'match_id': match_id, 'lineup_hash': {'$type': 'string'}}
+        )
+        try:
+            db.team_quotas.update_one({'_id': quota_id}, {'$setOnInsert': {'teams_count': held}}, upsert=True)
+        except DuplicateKeyError:
+            pass  # created by a concurrent batch
+
+    while wanted > 0:
+        # Take all the slots wanted if they are free
+        quota = db.team_quotas.find_one_and_update(
+            {'_id': quota_id, 'teams_count': {'$lte': MAX_TEAMS_PER_MATCH - wanted}},
+            {'$inc': {'teams_count': wanted}},
+            return_document=ReturnDocument.AFTER
+        )
+        if quota is not None:
+            return quota_id, wanted
+        # Otherwise retry for the slots left
+        quota = db.team_quotas.find_one({'_id': quota_id})
+        wanted = min(wanted, MAX_TEAMS_PER_MATCH - quota['teams_count'])
+    return quota_id, 0
+
+def _release_slots(db, quota_id, count):
+    if count:
+        db.team_quotas.update_one({'_id': quota_id}, {'$inc': {'teams_count': -count}})
+
+def create_teams(db, match_id, user_id, lineups):
+    """
+    Validate and save a batch of a user's teams for a match
+
+    Each lineup is checked on its own; the valid ones are inserted in one
+    unordered write. A lineup the user already holds for the match, or
+    one repeated in the batch, is rejected through its canonical hash
+    (backed by a unique index). Slots under MAX_TEAMS_PER_MATCH are
+    reserved atomically before the write and those left unused returned.
+
+    Args:
+        db: Database instance
+        match_id: Match ID
+        user_id: User ObjectId
+        lineups: List of lists of player IDs
+
+    Returns:
+        Tuple of (request outcome constant or None, list of per-team
+        results {'status', 'team_id'})
+    """
+    if len(lineups) > MAX_TEAMS_PER_MATCH:
+        return TOO_MANY_TEAMS, []
+
+    table = get_player_table(db, match_id)
+    if table is None:
+        return MATCH_NOT_FOUND, []
+    # Read fresh, teams lock as soon as the match starts
+    if not read_primary(db.matches).find_one({'_id': ObjectId(match_id), 'status': 'upcoming'}, {'_id': 1}):
+        return MATCH_LOCKED, []
+
+    match_id = ObjectId(match_id)
+
+    results = []
+    documents = []
+    created = []  # results of the documents, in insert order
+    seen = set()
+    now = datetime.utcnow()
+    for lineup in lineups:
+        player_ids = [str(player_id) for player_id in lineup]
+        result = {'status': table.validate(player_ids), 'team_id': None}
+        results.append(result)
+        if result['status'] != VALID:
+            continue
+
+        team_hash = lineup_hash(player_ids)
+        if team_hash in seen:
+            result['status'] = DUPLICATE_TEAM
+        else:
+            seen.add(team_hash)
+            documents.append({
+                'user_id': user_id,
+                'match_id': match_id,
+                'players': [{'player_id': player_id} for player_id in player_ids],
+                'lineup_hash': team_hash,
+                'status': 'upcoming',
+                'created_at': now
+            })
+            created.append(result)
+
+    duplicates = set()
+    if documents:
+        quota_id, slots = _reserve_slots(db, user_id, match_id, len(documents))
+        for result in created[slots:]:
+            result['status'] = TEAM_LIMIT
+        created, documents = created[:slots], documents[:slots]
+
+    if documents:
+        try:
+            db.user_matches.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            if any(error['code'] != 11000 for error in errors):
+                _release_slots(db, quota_id, len(documents) - e.details.get('nInserted', 0))
+                raise
+            duplicates = {error['index'] for error in errors}
+        except Exception:
+            _release_slots(db, quota_id, len(documents))
+            raise
+        _release_slots(db, quota_id, len(duplicates))
+
+    # insert_many sets each document's _id
+    for index, (result, document) in enumerate(zip(created, documents)):
+        if index in duplicates:
+            result['status'] = DUPLICATE_TEAM
+        else:
+            result['status'] = CREATED
+            result['team_id'] = document['_id']
+
+    return None, results
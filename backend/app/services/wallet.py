@@ -0,0 +1,147 @@
+"""
+Wallet transaction history service
+"""
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import DESCENDING
+
+# Fields of a transaction sent to clients
+TRANSACTION_FIELDS = ('type', 'amount', 'description', 'created_at')
+
+TRANSACTION_TYPES = ('credit', 'debit')
+
+# Newest first; _id breaks ties between transactions created together
+TRANSACTION_SORT = [('created_at', DESCENDING), ('_id', DESCENDING)]
+
+def build_transactions_query(user_id, transaction_type=None, date_from=None, date_to=None, cursor=None):
+    """
+    Build the query for a user's transaction history
+
+    Args:
+        user_id: User ObjectId
+        transaction_type: Optional 'credit' or 'debit'
+        date_from: Optional ISO date; transactions created at or after it
+        date_to: Optional ISO date; transactions created before it
+        cursor: Optional [created_at ISO string, transaction ID] of the last
+            transaction already sent
+
+    Returns:
+        Mongo query matching the (user_id, created_at, _id) index
+
+    Raises:
+        ValueError: If the type, a date or the cursor is invalid
+    """
+    query = {'user_id': user_id}
+
+    if transaction_type:
+        if transaction_type not in TRANSACTION_TYPES:
+            raise ValueError('Invalid transaction type')
+        query['type'] = transaction_type
+
+    created_at = {}
+    if date_from:
+        created_at['$gte'] = datetime.fromisoformat(date_from)
+    if date_to:
+        created_at['$lt'] = datetime.fromisoformat(date_to)
+    if created_at:
+        query['created_at'] = created_at
+
+    if cursor:
+        # Cursors come back from clients; reject any other shape as invalid
+        if len(cursor) != 2 or not all(isinstance(value, str) for value in cursor) \
+                or not ObjectId.is_valid(cursor[1]):
+            raise ValueError('Invalid cursor')
+        last_created_at, last_id = cursor
+        last_created_at = datetime.fromisoformat(last_created_at)
+        query = {'$and': [query, {'$or': [
+            {'created_at': {'$lt': last_created_at}},
+            {'created_at': last_created_at, '_id': {'$lt': ObjectId(last_id)}}
+        ]}]}
+
+    return query
+
+def format_timestamp(value):
+    """
+    Format a transaction's created_at for a CSV statement
+
+    Older or hand-written transactions may lack it or hold a string, so
+    anything but a datetime is written as is (or empty) rather than failing
+    the export halfway through.
+    """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return '' if value is None else str(value)
+
+def list_transactions(db, query, limit):
+    """
+    Get one page of transaction history
+
+    Args:
+        db: Database instance
+        query: Query from build_transactions_query
+        limit: Page size
+
+    Returns:
+        Tuple of (list of transaction documents, next cursor values or None)
+    """
+    transactions = list(find_transactions_page(db, query, limit))
+    return transactions, next_transactions_cursor(transactions, limit)
+
+def find_transactions_page(db, query, limit):
+    """
+    Open the driver cursor over one page of transaction history
+
+    Works with both pymongo and Motor databases, so the async routes share
+    the page's projection and sort with list_transactions.
+
+    Args:
+        db: Database instance, sync or async
+        query: Query from build_transactions_query
+        limit: Page size
+
+    Returns:
+        Driver cursor of transaction documents
+    """
+    return db.transactions.find(query, {field: 1 for field in TRANSACTION_FIELDS}).sort(TRANSACTION_SORT).limit(limit)
+
+def next_transactions_cursor(transactions, limit):
+    """
+    Get the cursor values after a page of transactions
+
+    Args:
+        transactions: Transaction documents of the page
+        limit: Page size
+
+    Returns:
+        [created_at ISO string, transaction ID] of the last transaction, or
+        None if the page is the last one
+    """
+    if len(transactions) < limit:
+        return None
+    last = transactions[-1]
+    return [last['created_at'].isoformat(), str(last['_id'])]
+
+def iter_transactions(db, query, batch_size=500):
+    """
+    Stream transaction history from the cursor, newest first
+
+    Only one cursor batch is held in memory at a time.
+
+    Args:
+        db: Database instance
+        query: Query from build_transactions_query
+        batch_size: Documents fetched per round trip
+
+    Yields:
+        Transaction documents
+    """
+    cursor = (
+        db.transactions.find(query, {field: 1 for field in TRANSACTION_FIELDS})
+        .sort(TRANSACTION_SORT)
+        .batch_size(batch_size)
+    )
+    try:
+        yield from cursor
+    finally:
+        cursor.close()
@@ -0,0 +1,62 @@
+"""
+Motor (asyncio MongoDB driver) connection for the ASGI entry point
+
+Uses the same pool settings, pool metrics and per-collection read
+preferences and write concerns as app.utils.db.
+"""
+from app.utils.db import build_client_options, build_collection_options
+
+async_client = None
+async_db = None
+
+class AsyncDatabase:
+    """Motor database whose collections get per-collection read/write options"""
+
+    def __init__(self, database, collection_options):
+        self._database = database
+        self._collection_options = collection_options
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        return self._database.get_collection(name, **self._collection_options.get(name, {}))
+
+def init_async_db(config):
+    """
+    Initialize the Motor client; call it from inside the running event loop
+
+    Args:
+        config: App config mapping
+
+    Returns:
+        AsyncDatabase instance
+    """
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    global async_client, async_db
+
+    async_client = AsyncIOMotorClient(
+        config.get('MONGO_URI', 'mongodb://localhost:27017/'),
+        **build_client_options(config)
+    )
+    async_db = AsyncDatabase(
+        async_client[config.get('DB_NAME', 'fantasy11')],
+        build_collection_options(config)
+    )
+    return async_db
+
+def get_async_db():
+    """Get the Motor database instance"""
+    if async_db is None:
+        raise Exception("Async database not initialized. Call init_async_db() first.")
+    return async_db
+
+def close_async_db():
+    """Close the Motor client"""
+    global async_client, async_db
+    if async_client:
+        async_client.close()
+    async_client = async_db = None
@@ -0,0 +1,80 @@
+import hashlib
+import time
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import g, request
+
+from app.utils.cache import TTLCache
+from app.utils.jwt_helper import decode_token
+from app.utils.metrics import record_phase
+
+# Verified tokens by SHA-256 digest; each entry expires with its token
+_token_cache = TTLCache(1024)
+
+def configure_token_cache(max_entries):
+    """
+    Resize the verified-token cache
+
+    Args:
+        max_entries: Number of tokens kept, 0 disables the cache
+    """
+    global _token_cache
+    _token_cache = TTLCache(max_entries) if max_entries else None
+
+def resolve_user_id(authorization):
+    """
+    Resolve the user of an Authorization header
+
+    A token's signature is checked once; later requests with the same token
+    are served from the cache until the token's own expiry.
+
+    Args:
+        authorization: Authorization header value, e.g. 'Bearer <token>'
+
+    Returns:
+        User ObjectId, or None if the token is missing or invalid
+    """
+    token = authorization.replace('Bearer ', '')
+    if not token:
+        return None
+
+    digest = hashlib.sha256(token.encode()).digest()
+    if _token_cache is not None:
+        user_id = _token_cache.get(digest)
+        if user_id is not None:
+            return user_id
+
+    payload = decode_token(token)
+    if payload is None:
+        return None
+
+    try:
+        user_id = ObjectId(payload.get('user_id'))
+    except (InvalidId, TypeError):
+        return None
+
+    if _token_cache is not None and 'exp' in payload:
+        ttl = payload['exp'] - time.time()
+        if ttl > 0:
+            _token_cache.set(digest, user_id, ttl)
+    return user_id
+
+def init_auth(app):
+    """
+    Register the shared authentication layer
+
+    Every request's bearer token is resolved once, before the view runs,
+    and the user's ObjectId is stored on flask.g.
+    """
+    configure_token_cache(app.config.get('AUTH_TOKEN_CACHE_SIZE', 1024))
+
+    @app.before_request
+    def load_current_user():
+        started = time.perf_counter()
+        g.user_id = resolve_user_id(request.headers.get('Authorization', ''))
+        record_phase('auth', time.perf_counter() - started)
+
+def get_current_user():
+    """Get the ObjectId of the authenticated user, or None"""
+    return g.get('user_id')
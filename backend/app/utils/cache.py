@@ -0,0 +1,280 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request, make_response, Response
+
+# Extra seconds a counter outlives the longest entry TTL, covering a view
+# that reads a generation and only stores its response later
+COUNTER_GRACE_SECONDS = 300
+
+class TTLCache:
+    """
+    In-process LRU cache with a per-entry time to live
+
+    This is the default cache backend. Every backend stores bytes values
+    and provides get, set, delete, incr and clear.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # Counters (invalidation generations) as key -> (value, last used),
+        # least recently used first. A counter is only dropped once it has
+        # gone unused for longer than any entry lives (plus a grace period):
+        # every entry keyed on one of its generations was stored after
+        # reading it, so has expired, and a counter restarting from 0
+        # cannot resurrect one.
+        self._counters = OrderedDict()
+        self._max_ttl = 0
+        self._lock = threading.Lock()
+
+    def _expire_counters(self, now):
+        while self._counters:
+            key, (_, last_used) = next(iter(self._counters.items()))
+            if now - last_used <= self._max_ttl + COUNTER_GRACE_SECONDS:
+                break
+            del self._counters[key]
+
+    def get(self, key):
+        with self._lock:
+            if key in self._counters:
+                now = time.monotonic()
+                value, _ = self._counters[key]
+                self._counters[key] = (value, now)
+                self._counters.move_to_end(key)
+                self._expire_counters(now)
+                return value
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            # An entry without a TTL keeps every counter for good
+            self._max_ttl = max(self._max_ttl, ttl or float('inf'))
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            now = time.monotonic()
+            value = int(self._counters.get(key, (0, None))[0]) + 1
+            self._counters[key] = (str(value).encode(), now)
+            self._counters.move_to_end(key)
+            self._expire_counters(now)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+class RedisCache:
+    """
+    Cache backend over a Redis client shared by every worker
+
+    Any object with the redis-py get/set/delete/incr/flushdb methods works,
+    so a local stand-in can replace the server. redis-py itself is in
+    requirements.txt.
+    """
+
+    def __init__(self, client, prefix='fantasy11:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def clear(self):
+        self.client.flushdb()
+
+_backend = TTLCache()
+
+def init_cache(app):
+    """
+    Configure the response cache backend from the app config
+
+    CACHE_REDIS_URL selects a shared Redis backend; otherwise an
+    in-process TTLCache is used, whose invalidations only reach the worker
+    that issued them.
+    """
+    global _backend
+
+    redis_url = app.config.get('CACHE_REDIS_URL')
+    if redis_url:
+        import redis
+        _backend = RedisCache(redis.Redis.from_url(redis_url))
+    else:
+        _backend = TTLCache(app.config.get('CACHE_MAX_ENTRIES', 1024))
+
+def require_shared_cache(config, reason):
+    """
+    Fail unless CACHE_REDIS_URL is configured
+
+    Call it wherever a process invalidates responses cached by others (a
+    CLI changing a match's status or score): the in-process TTLCache
+    would only bump its own generations, and the API workers would keep
+    serving the stale responses until CATALOG_CACHE_TTL expires.
+
+    Args:
+        config: App config mapping
+        reason: Why the backend must be shared, for the error message
+
+    Raises:
+        RuntimeError: If no shared backend is configured
+    """
+    if not config.get('CACHE_REDIS_URL'):
+        raise RuntimeError(
+            f'CACHE_REDIS_URL must be set {reason}: the in-process cache '
+            'cannot invalidate the responses cached by the API workers'
+        )
+
+def set_cache_backend(backend):
+    """Replace the cache backend, e.g. with a local stand-in"""
+    global _backend
+    _backend = backend
+
+def get_cache_backend():
+    return _backend
+
+def _generation(tag):
+    return int(_backend.get('gen:' + tag) or 0)
+
+def invalidate(*tags):
+    """
+    Invalidate every cached response carrying any of the given tags
+
+    Tags are versioned: bumping a tag's generation changes the cache key of
+    every response that depends on it, and old entries age out.
+    """
+    for tag in tags:
+        _backend.incr('gen:' + tag)
+
+def invalidate_match(match_id):
+    """
+    Invalidate cached match responses after a status or score change
+
+    With the in-process backend this only reaches the calling process;
+    other workers serve their cached copy until CATALOG_CACHE_TTL expires.
+    """
+    invalidate('matches', f'match:{match_id}')
+
+def invalidate_leagues():
+    """
+    Invalidate cached league listings after a teams_count change
+
+    With the in-process backend other workers see the change once their
+    cached listing expires (CATALOG_CACHE_TTL).
+    """
+    invalidate('leagues')
+
+def response_cache_key(tags, path, args):
+    """
+    Build the cache key of a response
+
+    Args:
+        tags: Invalidation tag names, already formatted
+        path: Request path
+        args: Iterable of (name, value) query args
+
+    Returns:
+        Cache key including the current generation of every tag
+    """
+    generations = ','.join(str(_generation(tag)) for tag in tags)
+    query = '&'.join(f'{k}={v}' for k, v in sorted(args))
+    return f'resp:{path}?{query}#{generations}'
+
+def get_cached_response(key):
+    """Get a cached (etag, body) pair, or None"""
+    cached = _backend.get(key)
+    if cached is None:
+        return None
+    etag, body = cached.split(b'\n', 1)
+    return etag.decode(), body
+
+def store_response(key, body, ttl):
+    """Cache a response body and return its etag"""
+    etag = hashlib.sha1(body).hexdigest()
+    _backend.set(key, etag.encode() + b'\n' + body, ttl)
+    return etag
+
+def view_cache_key(tags, view_kwargs, current_request):
+    """
+    Build the cache key of a view's response to a Flask or Quart request
+
+    Args:
+        tags: Invalidation tags, formatted with the view's URL arguments
+        view_kwargs: The view's URL arguments
+        current_request: The request being served
+    """
+    return response_cache_key(
+        [tag.format(**view_kwargs) for tag in tags],
+        current_request.path,
+        current_request.args.items(multi=True)
+    )
+
+def store_view_response(key, body, ttl, config):
+    """
+    Cache a view's response body
+
+    Returns:
+        Tuple of (etag, body), like get_cached_response
+    """
+    return store_response(key, body, ttl or config.get('CATALOG_CACHE_TTL', 10)), body
+
+def etag_response(response_class, etag, body):
+    """Build the 200 JSON response of a cached body, before make_conditional"""
+    response = response_class(body, status=200, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+def cached_response(tags=(), ttl=None):
+    """
+    Cache a public GET endpoint's serialized JSON per path and query args
+
+    Responses carry an ETag and a matching If-None-Match gets a 304.
+    Only 200 responses are cached.
+
+    Args:
+        tags: Invalidation tags; may use the view's URL arguments,
+            e.g. 'match:{match_id}'
+        ttl: Seconds a cached response is served, CATALOG_CACHE_TTL by default
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            key = view_cache_key(tags, kwargs, request)
+            cached = get_cached_response(key)
+            if cached is None:
+                response = make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+                cached = store_view_response(key, response.get_data(), ttl, current_app.config)
+            return etag_response(Response, *cached).make_conditional(request)
+        return wrapper
+    return decorator
@@ -1,24 +1,240 @@
-from pymongo import MongoClient
+import threading
+import time
+
+import pymongo
+from pymongo import MongoClient, ReadPreference
+from pymongo.database import Database
+from pymongo.monitoring import ConnectionPoolListener, ConnectionCheckOutFailedReason
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
+from pymongo.write_concern import WriteConcern
 from flask import current_app
 
+from app.utils.metrics import command_metrics
+
 db_client = None
 db = None
 
+# Config saved by a lazy init_db; the client is created on first use
+_lazy_config = None
+_connect_lock = threading.Lock()
+
+# Collections that may be served by secondaries
+CATALOG_COLLECTIONS = ('matches', 'leagues', 'scoring_rules')
+
+# Collections that hold money or entries; writes wait for a majority
+WALLET_COLLECTIONS = (
+    'users', 'transactions', 'ledger_entries', 'balance_snapshots', 'ledger_meta', 'league_participants'
+)
+
+READ_PREFERENCES = {
+    'primaryPreferred': PrimaryPreferred,
+    'secondary': Secondary,
+    'secondaryPreferred': SecondaryPreferred,
+    'nearest': Nearest,
+}
+
+class PoolMetrics(ConnectionPoolListener):
+    """
+    Connection pool listener recording how long requests wait for a connection
+
+    Checkout waits that grow, or any checkout timeouts, mean the workers
+    share too few connections; a pool that never fills means it is too big.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.checkout_timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.in_use = 0
+            self.open = 0
+
+    def _wait(self):
+        started = getattr(self._started, 'at', None)
+        self._started.at = None
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+
+    def connection_check_out_started(self, event):
+        self._started.at = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        wait = self._wait()
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def connection_check_out_failed(self, event):
+        self._wait()
+        with self._lock:
+            self.checkout_failures += 1
+            if event.reason == ConnectionCheckOutFailedReason.TIMEOUT:
+                self.checkout_timeouts += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def snapshot(self):
+        """Get the counters as a dictionary, with waits in milliseconds"""
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'checkout_failures': self.checkout_failures,
+                'checkout_timeouts': self.checkout_timeouts,
+                'wait_avg_ms': round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+                'in_use': self.in_use,
+                'open': self.open,
+            }
+
+pool_metrics = PoolMetrics()
+
+class ConfiguredDatabase(Database):
+    """Database whose collections get per-collection read/write options"""
+
+    def __init__(self, client, name, collection_options):
+        super().__init__(client, name)
+        self._collection_options = collection_options
+
+    def __getitem__(self, name):
+        return self.get_collection(name, **self._collection_options.get(name, {}))
+
+def build_collection_options(config):
+    """
+    Build the read preference and write concern of each configured collection
+
+    Args:
+        config: App config mapping
+
+    Returns:
+        Dictionary of collection name to get_collection keyword arguments
+    """
+    mode = config.get('MONGO_CATALOG_READ_PREFERENCE', 'primary')
+    if mode == 'primary':
+        catalog_read = ReadPreference.PRIMARY
+    elif mode in READ_PREFERENCES:
+        catalog_read = READ_PREFERENCES[mode](
+            max_staleness=config.get('MONGO_CATALOG_MAX_STALENESS_SECONDS', -1)
+        )
+    else:
+        raise ValueError(f'Unknown read preference: {mode}')
+
+    options = {name: {'read_preference': catalog_read} for name in CATALOG_COLLECTIONS}
+    for name in WALLET_COLLECTIONS:
+        options[name] = {
+            'read_preference': ReadPreference.PRIMARY,
+            'write_concern': WriteConcern(w='majority', wtimeout=config.get('MONGO_SOCKET_TIMEOUT_MS', 10000))
+        }
+    return options
+
+def read_primary(collection):
+    """
+    Get a collection that reads from the primary
+
+    Catalog collections may read from secondaries up to
+    MONGO_CATALOG_MAX_STALENESS_SECONDS behind; use this for the catalog
+    reads a decision depends on, such as a match's status or whether a
+    league exists. Works with pymongo and Motor collections.
+
+    Args:
+        collection: Collection instance
+
+    Returns:
+        The collection with a primary read preference
+    """
+    return collection.with_options(read_preference=ReadPreference.PRIMARY)
+
+def build_client_options(config):
+    """
+    Build the MongoClient pool, timeout and compression options
+
+    Args:
+        config: App config mapping
+
+    Returns:
+        Dictionary of MongoClient keyword arguments
+    """
+    options = {
+        'maxPoolSize': config.get('MONGO_MAX_POOL_SIZE', 50),
+        'minPoolSize': config.get('MONGO_MIN_POOL_SIZE', 0),
+        'waitQueueTimeoutMS': config.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000),
+        'serverSelectionTimeoutMS': config.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000),
+        'connectTimeoutMS': config.get('MONGO_CONNECT_TIMEOUT_MS', 5000),
+        'socketTimeoutMS': config.get('MONGO_SOCKET_TIMEOUT_MS', 10000),
+        'event_listeners': [pool_metrics, command_metrics],
+    }
+    if config.get('MONGO_COMPRESSORS'):
+        options['compressors'] = config['MONGO_COMPRESSORS']
+    return options
+
 def init_db(app):
-    """Initialize database connection"""
-    global db_client, db
+    """
+    Initialize database connection
+
+    With DB_LAZY_CONNECT the client is only created on first use (get_db),
+    so the app starts even while MongoDB is unreachable.
+
+    Indexes are not built here; run `python -m app.utils.indexes ensure`
+    when deploying.
+    """
+    global _lazy_config
     
-    mongo_uri = app.config.get('MONGO_URI', 'mongodb://localhost:27017/')
-    db_name = app.config.get('DB_NAME', 'fantasy11')
+    if app.config.get('DB_LAZY_CONNECT'):
+        _lazy_config = dict(app.config)
+        return None
     
-    db_client = MongoClient(mongo_uri)
-    db = db_client[db_name]
+    return connect_db(app.config)
+
+def connect_db(config):
+    """
+    Create the MongoDB client and database handle
+
+    Args:
+        config: App config mapping
+
+    Returns:
+        Database instance
+    """
+    global db_client, db
+    
+    mongo_uri = config.get('MONGO_URI', 'mongodb://localhost:27017/')
+    db_name = config.get('DB_NAME', 'fantasy11')
     
-    # Create indexes
-    db.users.create_index('email', unique=True)
-    db.users.create_index('mobile', unique=True)
-    db.matches.create_index('status')
-    db.leagues.create_index('entry_fee')
+    db_client = MongoClient(mongo_uri, **build_client_options(config))
+    db = ConfiguredDatabase(db_client, db_name, build_collection_options(config))
     
     return db
 
@@ -26,9 +242,53 @@ def get_db():
     """Get database instance"""
     global db
     if db is None:
-        raise Exception("Database not initialized. Call init_db() first.")
+        if _lazy_config is None:
+            raise Exception("Database not initialized. Call init_db() first.")
+        with _connect_lock:
+            if db is None:
+                connect_db(_lazy_config)
     return db
 
+def ping_db(timeout=1.0):
+    """
+    Check that MongoDB answers, connecting a lazy client if needed
+
+    Args:
+        timeout: Seconds to wait for the server
+
+    Returns:
+        True if a ping succeeded within the timeout
+    """
+    try:
+        get_db()
+        with pymongo.timeout(timeout):
+            db_client.admin.command('ping')
+        return True
+    except Exception:
+        return False
+
+def run_in_transaction(callback):
+    """
+    Run a callback inside a multi-document transaction
+
+    Transactions read from the primary and commit with w=majority. Transient
+    errors and unknown commit results are retried by the driver.
+
+    Args:
+        callback: Function taking the session; its writes must pass session=session
+
+    Returns:
+        The callback's return value
+    """
+    get_db()
+    with db_client.start_session() as session:
+        return session.with_transaction(
+            callback,
+            read_concern=ReadConcern('majority'),
+            write_concern=WriteConcern(w='majority'),
+            read_preference=ReadPreference.PRIMARY
+        )
+
 def close_db():
     """Close database connection"""
     global db_client
@@ -0,0 +1,249 @@
+"""
+Index registry
+
+Each model in app/models declares its collection's INDEXES and the
+QUERY_SHAPES the app runs against it. Indexes are built out-of-band with
+this module's CLI instead of on every worker boot:
+
+    python -m app.utils.indexes ensure   # create missing indexes
+    python -m app.utils.indexes drift    # declared vs existing indexes
+    python -m app.utils.indexes report   # explain every query shape
+
+drift and report exit with status 1 when they find a problem, so they can
+gate a deploy. The unique indexes are also required at runtime: the
+launcher refuses to start, and the readiness probe fails, while any is
+missing (see require_unique_indexes).
+"""
+import argparse
+import logging
+import sys
+
+from app.models.user import User
+from app.models.match import Match
+from app.models.league import League
+from app.models.league_participant import LeagueParticipant
+from app.models.user_match import UserMatch
+from app.models.transaction import Transaction
+from app.models.ledger_entry import LedgerEntry
+from app.models.scoring_rule_set import ScoringRuleSet
+from app.models.player_match_points import PlayerMatchPoints
+from app.models.points_snapshot import PointsSnapshot
+
+MODELS = (
+    User, Match, League, LeagueParticipant, UserMatch, Transaction, LedgerEntry, ScoringRuleSet,
+    PlayerMatchPoints, PointsSnapshot,
+)
+
+# Index options that change what an index enforces or covers
+INDEX_OPTIONS = ('unique', 'sparse', 'partialFilterExpression', 'expireAfterSeconds')
+
+logger = logging.getLogger(__name__)
+
+# Set once this process has seen every unique index in place
+_unique_indexes_present = False
+
+def _freeze(value):
+    """Hashable form of an index option value, such as a partial filter"""
+    if isinstance(value, dict):
+        return tuple((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _index_signature(spec):
+    """Comparable (keys, options) of an index document or index_information entry"""
+    keys = tuple((field, direction) for field, direction in spec['key'].items()) \
+        if isinstance(spec['key'], dict) else tuple(spec['key'])
+    options = tuple((option, _freeze(spec[option])) for option in INDEX_OPTIONS if spec.get(option))
+    return keys, options
+
+def ensure_indexes(db, models=MODELS):
+    """
+    Create the declared indexes that do not exist yet
+
+    Args:
+        db: Database instance
+        models: Models whose indexes to build
+
+    Returns:
+        Dictionary of collection name to names of the declared indexes
+    """
+    created = {}
+    for model in models:
+        created[model.COLLECTION] = db[model.COLLECTION].create_indexes(model.INDEXES)
+    return created
+
+def index_drift(db, models=MODELS):
+    """
+    Compare the declared indexes with the ones in the database
+
+    Args:
+        db: Database instance
+        models: Models to check
+
+    Returns:
+        List of (collection, 'missing' or 'extra', index keys) tuples
+    """
+    drift = []
+    for model in models:
+        declared = {_index_signature(index.document) for index in model.INDEXES}
+        existing = {
+            _index_signature(info)
+            for name, info in db[model.COLLECTION].index_information().items()
+            if name != '_id_'
+        }
+        drift.extend((model.COLLECTION, 'missing', keys) for keys, _ in sorted(declared - existing))
+        drift.extend((model.COLLECTION, 'extra', keys) for keys, _ in sorted(existing - declared))
+    return drift
+
+def missing_unique_indexes(db, models=MODELS):
+    """
+    List the declared unique indexes that do not exist
+
+    Args:
+        db: Database instance
+        models: Models to check
+
+    Returns:
+        List of (collection, index keys) tuples
+    """
+    missing = []
+    for model in models:
+        declared = [
+            signature for signature in (_index_signature(index.document) for index in model.INDEXES)
+            if ('unique', True) in signature[1]
+        ]
+        if not declared:
+            continue
+        existing = {_index_signature(info) for info in db[model.COLLECTION].index_information().values()}
+        missing.extend((model.COLLECTION, keys) for keys, options in declared if (keys, options) not in existing)
+    return missing
+
+def require_unique_indexes(db, models=MODELS):
+    """
+    Check that every declared unique index exists
+
+    Joins, postings and signups rely on these indexes to reject duplicates
+    (a second entry of a user in a league, a replayed posting), so the app
+    must not serve traffic without them.
+
+    Raises:
+        RuntimeError: If any is missing
+    """
+    global _unique_indexes_present
+    if _unique_indexes_present:
+        return
+    missing = missing_unique_indexes(db, models)
+    if missing:
+        listed = ', '.join(f'{collection} {list(keys)}' for collection, keys in missing)
+        raise RuntimeError(f'Unique indexes missing: {listed}; run `python -m app.utils.indexes ensure`')
+    _unique_indexes_present = True
+
+def unique_indexes_ready(db):
+    """Readiness check: True once every declared unique index exists"""
+    try:
+        require_unique_indexes(db)
+    except RuntimeError as e:
+        logger.warning('%s', e)
+        return False
+    return True
+
+def _plan_stages(plan):
+    """Yield every stage of an explain plan tree"""
+    if 'queryPlan' in plan:
+        plan = plan['queryPlan']
+    if 'stage' in plan:
+        yield plan
+    for child in [plan.get('inputStage')] + plan.get('inputStages', []):
+        if child:
+            yield from _plan_stages(child)
+
+def explain_shape(db, collection, shape):
+    """
+    Explain one query shape
+
+    Args:
+        db: Database instance
+        collection: Collection name
+        shape: Dictionary with 'name', 'filter' and optional 'sort',
+            'projection' and 'limit'
+
+    Returns:
+        Dictionary with the shape name, a plan summary and its problems
+    """
+    cursor = db[collection].find(shape['filter'], shape.get('projection'))
+    if shape.get('sort'):
+        cursor = cursor.sort(shape['sort'])
+    if shape.get('limit'):
+        cursor = cursor.limit(shape['limit'])
+
+    stages = list(_plan_stages(cursor.explain()['queryPlanner']['winningPlan']))
+    problems = []
+    if any(stage['stage'] == 'COLLSCAN' for stage in stages):
+        problems.append('collection scan')
+    if any(stage['stage'] == 'SORT' for stage in stages):
+        problems.append('in-memory sort')
+
+    return {
+        'collection': collection,
+        'name': shape['name'],
+        'plan': ' <- '.join(
+            stage['stage'] + (f" {stage['indexName']}" if stage.get('indexName') else '')
+            for stage in stages
+        ),
+        'problems': problems
+    }
+
+def explain_query_shapes(db, models=MODELS):
+    """
+    Explain every declared query shape
+
+    Args:
+        db: Database instance
+        models: Models whose shapes to explain
+
+    Returns:
+        List of explain_shape results
+    """
+    return [
+        explain_shape(db, model.COLLECTION, shape)
+        for model in models
+        for shape in model.QUERY_SHAPES
+    ]
+
+def _connect():
+    from flask import Flask
+    from app.utils.db import init_db
+
+    app = Flask(__name__)
+    app.config.from_object('app.config.Config')
+    return init_db(app)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the declared MongoDB indexes')
+    parser.add_argument('command', choices=('ensure', 'drift', 'report'))
+    args = parser.parse_args(argv)
+
+    db = _connect()
+
+    if args.command == 'ensure':
+        for collection, names in ensure_indexes(db).items():
+            print(f"{collection}: {', '.join(names)}")
+        return 0
+
+    if args.command == 'drift':
+        drift = index_drift(db)
+        for collection, kind, keys in drift:
+            print(f"{collection}: {kind} {list(keys)}")
+        if not drift:
+            print('No index drift')
+        return 1 if drift else 0
+
+    results = explain_query_shapes(db)
+    for result in results:
+        status = ', '.join(result['problems']) or 'ok'
+        print(f"{result['collection']}.{result['name']}: {status} ({result['plan']})")
+    return 1 if any(result['problems'] for result in results) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
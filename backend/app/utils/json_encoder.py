@@ -1,6 +1,17 @@
-from bson import ObjectId
+import json
+import time
 from datetime import datetime
 
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+from app.utils.metrics import record_phase
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 def convert_objectid_to_str(obj):
     """
     Recursively convert ObjectId and datetime objects to strings
@@ -32,3 +43,89 @@ def clean_document(doc):
     # Recursively convert all ObjectIds and datetimes
     return convert_objectid_to_str(doc)
 
+
+def bson_default(obj):
+    """
+    Default hook for the JSON encoder: ObjectId and datetime to strings
+
+    Raises:
+        TypeError: For any other unsupported type
+    """
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+def serialize_document(doc, fields=None):
+    """
+    Prepare a MongoDB document for encoding, without walking nested values
+
+    Renames _id to id and keeps only the allowed fields, so excluded fields
+    (like passwords) never reach the encoder. Nested ObjectIds and datetimes
+    are converted by the encoder's default hook during its single pass.
+
+    Args:
+        doc: MongoDB document
+        fields: Optional iterable of fields to keep (id is always kept)
+
+    Returns:
+        New dictionary ready for encode_json or jsonify
+    """
+    if not doc:
+        return doc
+
+    if fields is None:
+        serialized = {key: value for key, value in doc.items() if key != '_id'}
+    else:
+        serialized = {field: doc[field] for field in fields if field in doc}
+
+    if '_id' in doc:
+        serialized['id'] = str(doc['_id'])
+    return serialized
+
+_encoder = json.JSONEncoder(
+    default=bson_default,
+    ensure_ascii=False,
+    sort_keys=True,
+    separators=(',', ':')
+)
+
+def encode_json(obj):
+    """
+    Encode an object to JSON bytes in one pass
+
+    Uses orjson (requirements.txt) when it is installed, the standard
+    library encoder otherwise; both give the same bytes, so ETags match
+    across workers.
+
+    Args:
+        obj: Object to encode, may contain ObjectIds and datetimes
+
+    Returns:
+        UTF-8 encoded JSON bytes
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=bson_default, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            # Non-string keys: orjson rejects them, json sorts then stringifies
+            # them. Unsupported values raise again below
+            pass
+    return _encoder.encode(obj).encode()
+
+class BSONJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes responses with encode_json"""
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            kwargs.setdefault('default', bson_default)
+            return json.dumps(obj, **kwargs)
+        return encode_json(obj).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        started = time.perf_counter()
+        body = encode_json(obj)
+        record_phase('serialize', time.perf_counter() - started)
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -25,7 +25,7 @@ def generate_token(user_id):
     token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
     return token
 
-def verify_token(token):
+def decode_token(token):
     """
     Verify and decode JWT token
     
@@ -33,13 +33,26 @@ def verify_token(token):
         token: JWT token string
     
     Returns:
-        User ID if token is valid, None otherwise
+        Token payload if token is valid, None otherwise
     """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload.get('user_id')
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
 
+def verify_token(token):
+    """
+    Verify and decode JWT token
+    
+    Args:
+        token: JWT token string
+    
+    Returns:
+        User ID if token is valid, None otherwise
+    """
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    return payload.get('user_id')
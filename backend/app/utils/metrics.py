@@ -0,0 +1,303 @@
+"""
+Request and MongoDB instrumentation, exposed as Prometheus text on /metrics
+
+Each request gets a timer in a context variable. The request hooks record
+its latency per endpoint; the auth hook and the JSON provider add the time
+they spend; the MongoDB command listener adds every round trip's duration
+and logs the shape of slow commands. All of it lands in one in-process
+registry per worker, so scrape each worker (or run one per host).
+
+Motor runs commands on its own threads, so in ASGI mode the async
+handlers' round trips are counted per command but not per request.
+"""
+import bisect
+import contextvars
+import hmac
+import logging
+import threading
+import time
+
+from pymongo.monitoring import CommandListener
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, and round trips per request
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+ROUND_TRIP_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+
+# Command fields that are not part of a command's shape
+COMMAND_METADATA = frozenset((
+    'lsid', '$db', '$clusterTime', 'txnNumber', 'autocommit', 'startTransaction',
+    '$readPreference', 'readConcern', 'writeConcern', 'comment', 'apiVersion',
+))
+
+_current = contextvars.ContextVar('request_timer', default=None)
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus expects"""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum!r}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+class RequestTimer:
+    """Time spent by one request, by phase"""
+
+    __slots__ = ('started', 'db_time', 'db_calls', 'phases')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.db_calls = 0
+        self.phases = {}
+
+class EndpointStats:
+    """Metrics of one (endpoint, method)"""
+
+    __slots__ = ('latency', 'round_trips', 'statuses', 'phase_time')
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.round_trips = Histogram(ROUND_TRIP_BUCKETS)
+        self.statuses = {}
+        self.phase_time = {'db': 0.0}
+
+class MetricsRegistry:
+    """Per-worker request and command metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}      # (endpoint, method) -> EndpointStats
+            self.commands = {}       # command -> Histogram
+            self.slow_commands = {}  # command -> count
+
+    def observe_request(self, endpoint, method, status, timer, elapsed):
+        with self._lock:
+            stats = self.endpoints.get((endpoint, method))
+            if stats is None:
+                stats = self.endpoints[(endpoint, method)] = EndpointStats()
+            stats.latency.observe(elapsed)
+            stats.round_trips.observe(timer.db_calls)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+            phase_time = stats.phase_time
+            phase_time['db'] += timer.db_time
+            for phase, seconds in timer.phases.items():
+                phase_time[phase] = phase_time.get(phase, 0.0) + seconds
+
+    def observe_command(self, command, elapsed, slow):
+        with self._lock:
+            histogram = self.commands.get(command)
+            if histogram is None:
+                histogram = self.commands[command] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(elapsed)
+            if slow:
+                self.slow_commands[command] = self.slow_commands.get(command, 0) + 1
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format"""
+        with self._lock:
+            endpoints = sorted(
+                (f'endpoint="{endpoint}",method="{method}"', stats)
+                for (endpoint, method), stats in self.endpoints.items()
+            )
+
+            lines = [
+                '# HELP http_request_duration_seconds Request latency by endpoint',
+                '# TYPE http_request_duration_seconds histogram',
+            ]
+            for labels, stats in endpoints:
+                lines += stats.latency.render('http_request_duration_seconds', labels)
+
+            lines += ['# HELP http_requests_total Requests by endpoint and status', '# TYPE http_requests_total counter']
+            for labels, stats in endpoints:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'http_requests_total{{{labels},status="{status}"}} {count}')
+
+            lines += [
+                '# HELP http_request_db_round_trips MongoDB commands per request',
+                '# TYPE http_request_db_round_trips histogram',
+            ]
+            for labels, stats in endpoints:
+                lines += stats.round_trips.render('http_request_db_round_trips', labels)
+
+            lines += [
+                '# HELP http_request_phase_seconds_total Time spent in MongoDB (db), JSON encoding (serialize) and auth',
+                '# TYPE http_request_phase_seconds_total counter',
+            ]
+            for labels, stats in endpoints:
+                for phase, seconds in sorted(stats.phase_time.items()):
+                    lines.append(f'http_request_phase_seconds_total{{{labels},phase="{phase}"}} {seconds!r}')
+
+            lines += ['# HELP mongo_command_duration_seconds MongoDB command latency', '# TYPE mongo_command_duration_seconds histogram']
+            for command, histogram in sorted(self.commands.items()):
+                lines += histogram.render('mongo_command_duration_seconds', f'command="{command}"')
+
+            lines += ['# HELP mongo_slow_commands_total Commands over the slow query threshold', '# TYPE mongo_slow_commands_total counter']
+            for command, count in sorted(self.slow_commands.items()):
+                lines.append(f'mongo_slow_commands_total{{command="{command}"}} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+registry = MetricsRegistry()
+
+def start_request():
+    """Start timing the current request"""
+    _current.set(RequestTimer())
+
+def finish_request(endpoint, method, status):
+    """Record the current request; endpoint is None for unrouted paths"""
+    timer = _current.get()
+    if timer is None:
+        return
+    _current.set(None)
+    registry.observe_request(endpoint or 'unmatched', method, status, timer, time.perf_counter() - timer.started)
+
+def record_phase(phase, seconds):
+    """Add time spent in a phase (e.g. 'auth', 'serialize') to the current request"""
+    timer = _current.get()
+    if timer is not None:
+        timer.phases[phase] = timer.phases.get(phase, 0.0) + seconds
+
+def command_shape(value, depth=0):
+    """
+    Strip the values out of a command, keeping its keys and operators
+
+    Args:
+        value: Command document or part of one
+
+    Returns:
+        The same structure with every value replaced by '?'
+    """
+    if depth > 4:
+        return '...'
+    if isinstance(value, dict):
+        return {
+            key: command_shape(item, depth + 1)
+            for key, item in value.items() if key not in COMMAND_METADATA
+        }
+    if isinstance(value, (list, tuple)):
+        return [command_shape(value[0], depth + 1)] if value else []
+    return '?'
+
+class CommandMetrics(CommandListener):
+    """
+    Command listener timing every MongoDB round trip
+
+    Durations are added to the current request and to the per-command
+    histograms. Commands slower than slow_threshold seconds are logged
+    with their shape; started commands are only kept to that end.
+    """
+
+    def __init__(self, slow_threshold=0.1):
+        self.slow_threshold = slow_threshold
+        self._started = {}
+
+    def started(self, event):
+        if self.slow_threshold is not None:
+            self._started[(event.connection_id, event.request_id)] = event.command
+
+    def _finished(self, event):
+        elapsed = event.duration_micros / 1e6
+        command = self._started.pop((event.connection_id, event.request_id), None)
+
+        timer = _current.get()
+        if timer is not None:
+            timer.db_time += elapsed
+            timer.db_calls += 1
+
+        slow = self.slow_threshold is not None and elapsed >= self.slow_threshold
+        registry.observe_command(event.command_name, elapsed, slow)
+        if slow and command is not None:
+            logger.warning(
+                'Slow MongoDB %s on %s: %.1f ms %s',
+                event.command_name, event.database_name, elapsed * 1000, command_shape(command)
+            )
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+
+command_metrics = CommandMetrics()
+
+def _is_local(remote_addr):
+    return remote_addr in ('127.0.0.1', '::1', 'localhost', None)
+
+# Headers a reverse proxy adds; behind one, remote_addr is the proxy's
+FORWARDED_HEADERS = ('Forwarded', 'X-Forwarded-For', 'X-Real-IP')
+
+def metrics_allowed(config, remote_addr, headers):
+    """
+    Whether a request may read /metrics
+
+    With METRICS_TOKEN set, only a request bearing it may, from any
+    address. Otherwise only a loopback client may, and never through a
+    reverse proxy, whose own loopback address would let every forwarded
+    client through; METRICS_ALLOW_REMOTE lifts the restriction.
+
+    Args:
+        config: App config mapping
+        remote_addr: Address of the connecting peer
+        headers: Request headers
+    """
+    token = config.get('METRICS_TOKEN')
+    if token:
+        return hmac.compare_digest(headers.get('Authorization', ''), f'Bearer {token}')
+    if config.get('METRICS_ALLOW_REMOTE', False):
+        return True
+    return _is_local(remote_addr) and not any(header in headers for header in FORWARDED_HEADERS)
+
+def init_metrics(app):
+    """
+    Time every request and register the /metrics endpoint
+
+    Call it before any other hook is registered: its before_request hook
+    then runs first and its after_request hook last, so the timer spans
+    every other hook. /metrics is gated by metrics_allowed.
+    """
+    from flask import request, Response
+
+    command_metrics.slow_threshold = app.config.get('METRICS_SLOW_QUERY_MS', 100) / 1000
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    @app.before_request
+    def start_request_timer():
+        start_request()
+
+    @app.after_request
+    def record_request(response):
+        finish_request(request.endpoint, request.method, response.status_code)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        if not metrics_allowed(app.config, request.remote_addr, request.headers):
+            return Response('Forbidden\n', status=403, mimetype='text/plain')
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
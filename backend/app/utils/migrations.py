@@ -0,0 +1,242 @@
+"""
+One-off data migrations
+
+Run from the backend directory:
+
+    python -m app.utils.migrations backfill_identities
+    python -m app.utils.migrations drop_legacy_identity_indexes
+    python -m app.utils.migrations backfill_wallet_paise
+    python -m app.utils.migrations post_opening_balances
+    python -m app.utils.migrations dedupe_league_participants
+    python -m app.utils.migrations backfill_league_sort_fields
+
+Run them before `python -m app.utils.indexes ensure`: backfill_identities
+and dedupe_league_participants clear the way for unique indexes that
+cannot be built over the old data. Run backfill_wallet_paise before
+post_opening_balances, and both before deploying code that posts in paise.
+Each migration can be re-run safely.
+"""
+import argparse
+import sys
+
+from pymongo import UpdateOne
+
+from app.models.league_participant import LeagueParticipant
+from app.services.leagues import LEAGUE_SORTS
+from app.services.ledger import post_opening_balances, to_paise
+from app.utils.db import read_primary
+from app.utils.validations import identity_keys
+
+def backfill_identities(db, batch_size=1000):
+    """
+    Set the `identities` field of users created before it existed
+
+    Run it before building the unique identities index. Users that share a
+    normalized email or mobile are reported, since the index cannot be
+    built until they are merged or changed.
+
+    Args:
+        db: Database instance
+        batch_size: Users updated per bulk write
+
+    Returns:
+        Dictionary with the number of users updated and the conflicting
+        identities as {identity: [user IDs]}
+    """
+    updated = 0
+    operations = []
+    for user in db.users.find({'identities': {'$exists': False}}, {'email': 1, 'mobile': 1}):
+        operations.append(UpdateOne(
+            {'_id': user['_id']},
+            {'$set': {'identities': identity_keys(user.get('email', ''), user.get('mobile', ''))}}
+        ))
+        if len(operations) == batch_size:
+            updated += db.users.bulk_write(operations, ordered=False).modified_count
+            operations = []
+
+    if operations:
+        updated += db.users.bulk_write(operations, ordered=False).modified_count
+
+    conflicts = {
+        group['_id']: group['users']
+        for group in db.users.aggregate([
+            {'$unwind': '$identities'},
+            {'$group': {'_id': '$identities', 'users': {'$addToSet': '$_id'}}},
+            {'$match': {'users.1': {'$exists': True}}}
+        ], allowDiskUse=True)
+    }
+
+    return {'updated': updated, 'conflicts': conflicts}
+
+def drop_legacy_identity_indexes(db):
+    """
+    Drop the unique email and mobile indexes replaced by `identities`
+
+    They compare the raw values, so they let 'A@x.com' and 'a@x.com' (or
+    two spellings of one mobile) through while rejecting nothing the
+    identities index does not, and they would block storing a mobile in
+    its canonical form. Run it once the identities index is built.
+
+    Args:
+        db: Database instance
+
+    Returns:
+        List of the names of the dropped indexes
+    """
+    dropped = []
+    for name, info in db.users.index_information().items():
+        if info.get('unique') and list(info['key']) in ([('email', 1)], [('mobile', 1)]):
+            db.users.drop_index(name)
+            dropped.append(name)
+    return dropped
+
+def _convert_to_paise(collection, rupee_field, paise_field, batch_size):
+    """Replace a rupee field with its integer paise field where not done yet"""
+    converted = 0
+    operations = []
+    for document in collection.find({paise_field: {'$exists': False}, rupee_field: {'$exists': True}}, {rupee_field: 1}):
+        operations.append(UpdateOne(
+            {'_id': document['_id'], paise_field: {'$exists': False}},
+            {'$set': {paise_field: to_paise(document[rupee_field] or 0)}, '$unset': {rupee_field: ''}}
+        ))
+        if len(operations) == batch_size:
+            converted += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+
+    if operations:
+        converted += collection.bulk_write(operations, ordered=False).modified_count
+    return converted
+
+def backfill_wallet_paise(db, batch_size=1000):
+    """
+    Move wallets and the ledger from float rupees to integer paise
+
+    Sets users' wallet_paise from wallet_balance, and replaces `amount` on
+    ledger entries and `balance` on balance snapshots with `amount_paise`
+    and `balance_paise`. Run it before deploying code that posts in paise:
+    that code treats a wallet without wallet_paise as empty.
+
+    Args:
+        db: Database instance
+        batch_size: Documents updated per bulk write
+
+    Returns:
+        Dictionary with the number of users, entries and snapshots converted
+    """
+    users = 0
+    operations = []
+    for user in db.users.find({'wallet_paise': {'$exists': False}}, {'wallet_balance': 1}):
+        operations.append(UpdateOne(
+            {'_id': user['_id'], 'wallet_paise': {'$exists': False}},
+            {'$set': {'wallet_paise': to_paise(user.get('wallet_balance') or 0)}}
+        ))
+        if len(operations) == batch_size:
+            users += db.users.bulk_write(operations, ordered=False).modified_count
+            operations = []
+
+    if operations:
+        users += db.users.bulk_write(operations, ordered=False).modified_count
+
+    return {
+        'users': users,
+        'entries': _convert_to_paise(db.ledger_entries, 'amount', 'amount_paise', batch_size),
+        'snapshots': _convert_to_paise(db.balance_snapshots, 'balance', 'balance_paise', batch_size),
+    }
+
+def dedupe_league_participants(db):
+    """
+    Remove duplicate league entries of the same user, then build the
+    unique (league_id, user_id) index
+
+    The index cannot be built while a user holds two entries in a league
+    (joins before the guarded join could race), and without it two joins
+    of the same user can both succeed. The earliest entry is kept; the
+    others are deleted and their seats released. Extra entries in paid
+    leagues are reported for refund rather than credited here, since their
+    fees may predate the ledger.
+
+    Args:
+        db: Database instance
+
+    Returns:
+        Dictionary with the number of entries removed, the refunds due as
+        [{'league_id', 'user_id', 'entries', 'entry_fee'}] and the names of
+        the unique indexes built
+    """
+    removed = 0
+    refunds_due = []
+    groups = db.league_participants.aggregate([
+        {'$sort': {'_id': 1}},
+        {'$group': {'_id': {'league_id': '$league_id', 'user_id': '$user_id'}, 'entries': {'$push': '$_id'}}},
+        {'$match': {'entries.1': {'$exists': True}}}
+    ], allowDiskUse=True)
+
+    for group in groups:
+        league_id, user_id = group['_id']['league_id'], group['_id']['user_id']
+        deleted = db.league_participants.delete_many({'_id': {'$in': group['entries'][1:]}}).deleted_count
+        if not deleted:
+            continue
+        removed += deleted
+        db.leagues.update_one({'_id': league_id}, {'$inc': {'teams_count': -deleted}})
+
+        league = read_primary(db.leagues).find_one({'_id': league_id}, {'entry_fee': 1})
+        if league and league.get('entry_fee', 0) > 0:
+            refunds_due.append({
+                'league_id': league_id,
+                'user_id': user_id,
+                'entries': deleted,
+                'entry_fee': league['entry_fee']
+            })
+
+    # Entries joined while this ran are caught by the index build failing
+    indexes = db.league_participants.create_indexes(
+        [index for index in LeagueParticipant.INDEXES if index.document.get('unique')]
+    )
+
+    return {'removed': removed, 'refunds_due': refunds_due, 'indexes': indexes}
+
+def backfill_league_sort_fields(db):
+    """
+    Store 0 in the league listing sort fields of leagues that lack them
+
+    The listing used to sort in memory with a missing field counted as 0;
+    Mongo sorts a missing field before every number, so without this such
+    leagues move to the end of a descending listing.
+
+    Args:
+        db: Database instance
+
+    Returns:
+        Dictionary of sort field to the number of leagues updated
+    """
+    return {
+        field: db.leagues.update_many({field: None}, {'$set': {field: 0}}).modified_count
+        for field, _ in LEAGUE_SORTS.values()
+    }
+
+MIGRATIONS = {
+    'backfill_identities': backfill_identities,
+    'drop_legacy_identity_indexes': drop_legacy_identity_indexes,
+    'backfill_wallet_paise': backfill_wallet_paise,
+    'post_opening_balances': post_opening_balances,
+    'dedupe_league_participants': dedupe_league_participants,
+    'backfill_league_sort_fields': backfill_league_sort_fields,
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run a one-off data migration')
+    parser.add_argument('migration', choices=sorted(MIGRATIONS))
+    args = parser.parse_args(argv)
+
+    from flask import Flask
+    from app.utils.db import init_db
+
+    app = Flask(__name__)
+    app.config.from_object('app.config.Config')
+    db = init_db(app)
+
+    print(MIGRATIONS[args.migration](db))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
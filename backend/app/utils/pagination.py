@@ -0,0 +1,56 @@
+import base64
+import json
+
+def encode_cursor(values):
+    """
+    Encode the sort key of the last item on a page as an opaque cursor
+
+    Args:
+        values: List of JSON-serializable sort key values
+
+    Returns:
+        URL-safe cursor string
+    """
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor
+
+    Args:
+        cursor: Cursor string from a previous page
+
+    Returns:
+        List of sort key values
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
+def parse_limit(value, default=20, maximum=100):
+    """
+    Parse a page size query parameter, clamped to [1, maximum]
+
+    Args:
+        value: Raw query parameter value or None
+        default: Page size when the parameter is missing
+        maximum: Largest page size allowed
+
+    Returns:
+        Page size as an integer
+
+    Raises:
+        ValueError: If the value is not an integer
+    """
+    if value is None:
+        return default
+    return max(1, min(int(value), maximum))
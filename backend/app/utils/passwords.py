@@ -0,0 +1,179 @@
+"""
+Password hashing
+
+Passwords are hashed with scrypt, a memory-hard KDF. Each hash costs tens
+of milliseconds of CPU, so hashing runs in a dedicated process pool rather
+than on the request thread: a login storm then queues for the pool instead
+of starving every other route of the GIL. The queue is bounded; when it is
+full, PasswordHasherBusy is raised and the caller should answer 503.
+
+Stored hashes look like `scrypt$<n>$<r>$<p>$<salt>$<hash>` (base64 salt and
+hash). Anything else is a legacy plaintext password, which verifies by
+constant-time comparison and is reported as needing a rehash.
+"""
+import atexit
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+HASH_PREFIX = 'scrypt'
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+class PasswordHasherBusy(Exception):
+    """The hashing queue is full or a hash took longer than the timeout"""
+
+_settings = {
+    'n': 2 ** 14,
+    'r': 8,
+    'p': 1,
+    'workers': 2,
+    'queue_depth': 8,
+    'timeout': 5.0,
+}
+
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+
+def init_passwords(app):
+    """
+    Configure the hashing cost and pool from the app config
+
+    The pool itself starts on first use, so each worker process that
+    forks after create_app gets its own.
+    """
+    global _slots
+
+    _settings.update(
+        n=app.config.get('PASSWORD_SCRYPT_N', _settings['n']),
+        r=app.config.get('PASSWORD_SCRYPT_R', _settings['r']),
+        p=app.config.get('PASSWORD_SCRYPT_P', _settings['p']),
+        workers=size_hash_workers(app.config),
+        queue_depth=app.config.get('PASSWORD_HASH_QUEUE_DEPTH', _settings['queue_depth']),
+        timeout=app.config.get('PASSWORD_HASH_TIMEOUT', _settings['timeout']),
+    )
+    with _executor_lock:
+        _shutdown()
+        _slots = None
+
+def size_hash_workers(config, web_workers=None, cpu_count=None):
+    """
+    Size the hashing pool of one web worker
+
+    Every web worker starts its own pool, so the CPUs are split between
+    them: each gets CPUs // web workers processes, and at least one.
+    PASSWORD_HASH_WORKERS overrides this.
+
+    Args:
+        config: App config mapping
+        web_workers: Web worker count; WEB_WORKERS, then the uvicorn
+            WEB_CONCURRENCY, then 1 by default
+        cpu_count: CPU count, os.cpu_count() by default
+
+    Returns:
+        Hashing process count
+    """
+    if config.get('PASSWORD_HASH_WORKERS'):
+        return config['PASSWORD_HASH_WORKERS']
+    cpu_count = cpu_count or os.cpu_count() or 1
+    web_workers = web_workers or config.get('WEB_WORKERS') or int(os.environ.get('WEB_CONCURRENCY') or 1)
+    return max(1, cpu_count // web_workers)
+
+def set_hash_workers(workers):
+    """Resize the hashing pool; like init_passwords, it starts on first use"""
+    global _slots
+
+    with _executor_lock:
+        _shutdown()
+        _settings['workers'] = workers
+        _slots = None
+
+def _scrypt(password, salt, n, r, p):
+    # Runs in a pool process
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p,
+        maxmem=256 * n * r + 1024 * 1024, dklen=KEY_BYTES
+    )
+
+def _shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def _get_executor():
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            # Imported here to keep multiprocessing out of app startup
+            from concurrent.futures import ProcessPoolExecutor
+            _executor = ProcessPoolExecutor(max_workers=_settings['workers'])
+            # Requests running on the workers plus requests waiting for them
+            _slots = threading.BoundedSemaphore(_settings['workers'] + _settings['queue_depth'])
+        return _executor, _slots
+
+atexit.register(_shutdown)
+
+def _derive(password, salt, n, r, p):
+    """Run scrypt in the pool, refusing work when the queue is full"""
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        raise PasswordHasherBusy()
+    try:
+        future = executor.submit(_scrypt, password, salt, n, r, p)
+    except Exception:
+        slots.release()
+        raise
+    # The slot is held until the work finishes, even if this request times out
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=_settings['timeout'])
+    except FuturesTimeoutError:
+        raise PasswordHasherBusy()
+
+def hash_password(password):
+    """
+    Hash a password with the configured cost
+
+    Raises:
+        PasswordHasherBusy: If the hashing queue is full or the hash timed out
+    """
+    n, r, p = _settings['n'], _settings['r'], _settings['p']
+    salt = os.urandom(SALT_BYTES)
+    key = _derive(password, salt, n, r, p)
+    return '$'.join((
+        HASH_PREFIX, str(n), str(r), str(p),
+        base64.b64encode(salt).decode(), base64.b64encode(key).decode()
+    ))
+
+def verify_password(password, stored):
+    """
+    Check a password against a stored hash or legacy plaintext password
+
+    Args:
+        password: Password given by the user
+        stored: Stored password field
+
+    Returns:
+        Tuple of (matches, needs_rehash); needs_rehash is True for plaintext
+        passwords and hashes made with another cost
+
+    Raises:
+        PasswordHasherBusy: If the hashing queue is full or the hash timed out
+    """
+    if not stored:
+        return False, False
+
+    parts = stored.split('$')
+    if len(parts) != 6 or parts[0] != HASH_PREFIX:
+        return hmac.compare_digest(password.encode(), stored.encode()), True
+
+    n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+    key = _derive(password, base64.b64decode(parts[4]), n, r, p)
+    matches = hmac.compare_digest(key, base64.b64decode(parts[5]))
+    needs_rehash = (n, r, p) != (_settings['n'], _settings['r'], _settings['p'])
+    return matches, needs_rehash
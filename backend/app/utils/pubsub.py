@@ -0,0 +1,101 @@
+import threading
+
+class LocalPubSub:
+    """
+    In-process publish/subscribe
+
+    This is the default backend: messages only reach subscribers in the
+    same process. Every backend provides publish(message) and
+    subscribe(handler), which returns a callable that unsubscribes.
+    Handlers may be called from any thread.
+    """
+
+    def __init__(self):
+        self._handlers = []
+        self._lock = threading.Lock()
+
+    def publish(self, message):
+        with self._lock:
+            handlers = list(self._handlers)
+        for handler in handlers:
+            handler(message)
+
+    def subscribe(self, handler):
+        with self._lock:
+            self._handlers.append(handler)
+
+        def unsubscribe():
+            with self._lock:
+                if handler in self._handlers:
+                    self._handlers.remove(handler)
+        return unsubscribe
+
+class RedisPubSub:
+    """
+    Backend over a Redis pub/sub channel shared by every node
+
+    Any object with the redis-py publish/pubsub methods works, so a local
+    stand-in can replace the server. Each subscription listens on its own
+    background thread.
+    """
+
+    def __init__(self, client, channel='fantasy11:events'):
+        self.client = client
+        self.channel = channel
+
+    def publish(self, message):
+        self.client.publish(self.channel, message)
+
+    def subscribe(self, handler):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.channel: lambda item: handler(item['data'])})
+        thread = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+        return thread.stop
+
+_backend = LocalPubSub()
+
+def init_pubsub(app):
+    """
+    Configure the pub/sub backend from the app config
+
+    PUBSUB_REDIS_URL selects Redis (the redis package is then required), so
+    that events published by any worker reach subscribers on every node;
+    otherwise an in-process LocalPubSub is used.
+    """
+    global _backend
+
+    redis_url = app.config.get('PUBSUB_REDIS_URL')
+    if redis_url:
+        import redis
+        _backend = RedisPubSub(redis.Redis.from_url(redis_url))
+    else:
+        _backend = LocalPubSub()
+
+def require_shared_pubsub(config, reason):
+    """
+    Fail unless PUBSUB_REDIS_URL is configured
+
+    Call it wherever events must cross processes (several workers, or a
+    CLI publishing to the API workers): LocalPubSub would silently drop
+    them there.
+
+    Args:
+        config: App config mapping
+        reason: Why the backend must be shared, for the error message
+
+    Raises:
+        RuntimeError: If no shared backend is configured
+    """
+    if not config.get('PUBSUB_REDIS_URL'):
+        raise RuntimeError(
+            f'PUBSUB_REDIS_URL must be set {reason}: the in-process pub/sub backend '
+            'cannot deliver leaderboard and match stream updates across processes'
+        )
+
+def set_pubsub_backend(backend):
+    """Replace the pub/sub backend, e.g. with a local stand-in"""
+    global _backend
+    _backend = backend
+
+def get_pubsub_backend():
+    return _backend
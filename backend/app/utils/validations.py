@@ -40,3 +40,59 @@ def validate_password(password):
         return False
     return True
 
+def normalize_email(email):
+    """
+    Normalize an email for identity lookups (trimmed, lowercased)
+    
+    Args:
+        email: Email string
+    
+    Returns:
+        Normalized email string
+    """
+    return str(email).strip().lower()
+
+def normalize_mobile(mobile):
+    """
+    Normalize a mobile number for identity lookups
+    
+    Separators are dropped, as is a +91 country code or a leading 0, so
+    '+91 98765-43210', '098765 43210' and '9876543210' are one identity.
+    
+    Args:
+        mobile: Mobile number string
+    
+    Returns:
+        Normalized mobile string of digits
+    """
+    digits = re.sub(r'\D', '', str(mobile))
+    if len(digits) == 12 and digits.startswith('91'):
+        return digits[2:]
+    if len(digits) == 11 and digits.startswith('0'):
+        return digits[1:]
+    return digits
+
+def normalize_identity(value):
+    """
+    Normalize an email or mobile number given at login
+    
+    Args:
+        value: Email or mobile number string
+    
+    Returns:
+        Normalized identity string
+    """
+    return normalize_email(value) if '@' in str(value) else normalize_mobile(value)
+
+def identity_keys(email, mobile):
+    """
+    Build the `identities` field of a user: every normalized login name
+    
+    Args:
+        email: Email string
+        mobile: Mobile number string
+    
+    Returns:
+        List of normalized identity strings
+    """
+    return [normalize_email(email), normalize_mobile(mobile)]
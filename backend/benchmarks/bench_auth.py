@@ -0,0 +1,50 @@
+"""
+Benchmark: authenticated request throughput with and without the verified-token cache
+"""
+import argparse
+
+from bson import ObjectId
+from flask import Flask, jsonify
+
+from app.utils.auth import init_auth, get_current_user
+from app.utils.jwt_helper import generate_token
+from benchmarks.common import measure, report
+
+def make_app(cache_size):
+    """Build a minimal app with the auth layer and one authenticated route"""
+    app = Flask('bench_auth')
+    app.config['AUTH_TOKEN_CACHE_SIZE'] = cache_size
+    init_auth(app)
+
+    @app.route('/whoami')
+    def whoami():
+        user_id = get_current_user()
+        if not user_id:
+            return jsonify({'error': 'Unauthorized'}), 401
+        return jsonify({'user_id': str(user_id)})
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--tokens', type=int, default=50, help='distinct polling clients')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    tokens = [generate_token(ObjectId()) for _ in range(args.tokens)]
+    headers = [{'Authorization': f'Bearer {token}'} for token in tokens]
+
+    print(f'{args.requests} authenticated requests from {args.tokens} clients')
+    for label, cache_size in (('without token cache', 0), ('with token cache', 1024)):
+        client = make_app(cache_size).test_client()
+
+        def run():
+            for i in range(args.requests):
+                response = client.get('/whoami', headers=headers[i % len(headers)])
+                assert response.status_code == 200
+
+        report(label, measure(run, args.repeat), args.requests)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark: login storm against scrypt password verification
+
+Simulates request threads that all verify a password at once, while a
+probe thread times a cheap request, and compares hashing on the request
+threads with hashing in the bounded process pool. Rejected logins are the
+ones the pool turned away with a 503.
+"""
+import argparse
+import base64
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask
+
+from app.utils import passwords
+from app.utils.json_encoder import encode_json
+from benchmarks.common import percentile
+
+def inline_verify(password, stored):
+    """Verify on the calling thread, as a handler without the pool would"""
+    parts = stored.split('$')
+    n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+    key = passwords._scrypt(password, base64.b64decode(parts[4]), n, r, p)
+    return key == base64.b64decode(parts[5]), False
+
+def storm(verify, stored, logins, threads):
+    """Run the logins on request threads while probing a cheap request"""
+    latencies = []
+    rejected = 0
+    probes = []
+    done = threading.Event()
+    document = {'matches': [{'team1': 'A', 'team2': 'B', 'status': 'live'}] * 50}
+
+    def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            encode_json(document)
+            probes.append(time.perf_counter() - start)
+            time.sleep(0.005)
+
+    def login(_):
+        start = time.perf_counter()
+        try:
+            verify('secret123', stored)
+        except passwords.PasswordHasherBusy:
+            return None
+        return time.perf_counter() - start
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for latency in pool.map(login, range(logins)):
+            if latency is None:
+                rejected += 1
+            else:
+                latencies.append(latency)
+    elapsed = time.perf_counter() - start
+    done.set()
+    prober.join()
+
+    return {
+        'rate': len(latencies) / elapsed,
+        'p50': percentile(latencies, 0.5),
+        'p99': percentile(latencies, 0.99),
+        'rejected': rejected,
+        'probe_p99': percentile(probes, 0.99),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=32, help='concurrent request threads')
+    parser.add_argument('--workers', type=int, default=0, help='hashing processes, 0 for the CPU count')
+    parser.add_argument('--queue-depth', type=int, default=64)
+    parser.add_argument('--n', type=int, default=2 ** 14, help='scrypt cost factor')
+    args = parser.parse_args()
+
+    app = Flask('bench_login')
+    app.config.update(
+        PASSWORD_SCRYPT_N=args.n,
+        PASSWORD_HASH_WORKERS=args.workers,
+        PASSWORD_HASH_QUEUE_DEPTH=args.queue_depth,
+        PASSWORD_HASH_TIMEOUT=60,
+    )
+    passwords.init_passwords(app)
+    stored = passwords.hash_password('secret123')
+
+    print(f'{args.logins} logins on {args.threads} request threads, scrypt n={args.n}')
+    for label, verify in (('hashing on request threads', inline_verify), ('hashing in process pool', passwords.verify_password)):
+        result = storm(verify, stored, args.logins, args.threads)
+        print(
+            f"{label:<28} {result['rate']:8.1f} logins/s   p50 {result['p50'] * 1000:8.1f} ms"
+            f"   p99 {result['p99'] * 1000:8.1f} ms   rejected {result['rejected']:4d}"
+            f"   probe p99 {result['probe_p99'] * 1000:7.3f} ms"
+        )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: match completion pipeline over 1M fantasy teams
+
+By default the producer and committer are in memory, which measures the
+scoring stages: throughput per core (one worker) and wall time with every
+core. With --mongo-uri, the teams are first inserted into a scratch
+database and complete_match runs end to end, reads and bulk writes
+included:
+
+    python -m benchmarks.bench_match_completion --teams 1000000
+    python -m benchmarks.bench_match_completion --mongo-uri mongodb://localhost:27017/
+"""
+import argparse
+import os
+import random
+import time
+
+from bson import ObjectId
+
+from app.services.match_completion import (
+    COMPLETION_CHUNK_SIZE,
+    complete_match,
+    run_pipeline,
+    score_players,
+)
+
+SQUAD_SIZE = 22
+TEAM_SIZE = 11
+
+def make_match_stats(seed=42):
+    """Final statistics for a 22-player squad"""
+    rng = random.Random(seed)
+    return {
+        f'player-{index:02d}': {
+            'runs': rng.randint(0, 90),
+            'fours': rng.randint(0, 8),
+            'sixes': rng.randint(0, 5),
+            'wickets': rng.randint(0, 4),
+            'catches': rng.randint(0, 2),
+        }
+        for index in range(SQUAD_SIZE)
+    }
+
+def make_chunks(teams, chunk_size, player_ids, seed=7):
+    """Synthetic producer: (team IDs, lineups) chunks"""
+    rng = random.Random(seed)
+    for start in range(0, teams, chunk_size):
+        count = min(chunk_size, teams - start)
+        yield list(range(start, start + count)), [rng.sample(player_ids, TEAM_SIZE) for _ in range(count)]
+
+def bench_in_memory(teams, chunk_size, workers):
+    match_stats = make_match_stats()
+    player_points, player_index = score_players(match_stats)
+    # Build the lineups up front so that only scoring is timed
+    chunks = list(make_chunks(teams, chunk_size, list(match_stats)))
+
+    committed = []
+    start = time.perf_counter()
+    scored = run_pipeline(chunks, player_points, player_index, lambda ids, totals: committed.append(len(totals)), workers)
+    elapsed = time.perf_counter() - start
+    assert scored == sum(committed) == teams
+    return elapsed
+
+def bench_mongo(uri, teams, chunk_size, workers):
+    from pymongo import MongoClient
+    from app.models.user_match import UserMatch
+
+    client = MongoClient(uri)
+    db = client['fantasy11_bench']
+    client.drop_database(db.name)
+    db.user_matches.create_indexes(UserMatch.INDEXES)
+
+    match_stats = make_match_stats()
+    match_id = db.matches.insert_one({'status': 'live'}).inserted_id
+    for team_ids, lineups in make_chunks(teams, 10000, list(match_stats)):
+        db.user_matches.insert_many([
+            {'match_id': match_id, 'user_id': ObjectId(), 'players': [{'player_id': player_id} for player_id in lineup]}
+            for lineup in lineups
+        ], ordered=False)
+
+    start = time.perf_counter()
+    outcome, scored = complete_match(db, match_id, match_stats, chunk_size, workers)
+    elapsed = time.perf_counter() - start
+    assert scored == teams, (outcome, scored)
+
+    client.drop_database(db.name)
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--teams', type=int, default=1000000)
+    parser.add_argument('--chunk-size', type=int, default=COMPLETION_CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--mongo-uri', help='run end to end against this MongoDB (uses a scratch database)')
+    args = parser.parse_args()
+
+    print(f'{args.teams:,d} teams in chunks of {args.chunk_size:,d}')
+    if args.mongo_uri:
+        elapsed = bench_mongo(args.mongo_uri, args.teams, args.chunk_size, args.workers)
+        print(f'end to end, {args.workers} workers          {elapsed:8.2f} s   {args.teams / elapsed:12,.0f} teams/s')
+        return
+
+    single = bench_in_memory(args.teams, args.chunk_size, 1)
+    print(f'scoring, 1 worker                 {single:8.2f} s   {args.teams / single:12,.0f} teams/s per core')
+    if args.workers > 1:
+        wall = bench_in_memory(args.teams, args.chunk_size, args.workers)
+        print(f'scoring, {args.workers} workers{"":<{17 - len(str(args.workers))}}{wall:8.2f} s   {args.teams / wall:12,.0f} teams/s')
+
+if __name__ == '__main__':
+    main()
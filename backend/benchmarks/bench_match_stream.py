@@ -0,0 +1,114 @@
+"""
+Benchmark: live match stream fan-out to many idle subscribers
+
+Subscribes --subscribers consumers to one match on an in-process hub fed by
+LocalPubSub (no server or Redis needed), then reports the memory held per
+idle subscriber, the time for one update to reach all of them, and how
+much a slow subscriber's updates are coalesced.
+
+    python -m benchmarks.bench_match_stream --subscribers 100000
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+
+from app.services.match_stream import MatchStreamHub, publish_match_update
+from app.utils.pubsub import LocalPubSub, set_pubsub_backend
+
+MATCH_ID = '000000000000000000000001'
+
+class Counter:
+    """Frames delivered across all subscribers, with a wakeup at a target"""
+
+    def __init__(self):
+        self.frames = 0
+        self.target = None
+        self.reached = asyncio.Event()
+
+    def add(self):
+        self.frames += 1
+        if self.target is not None and self.frames >= self.target:
+            self.reached.set()
+
+    async def wait_for(self, target):
+        self.target = target
+        self.reached.clear()
+        if self.frames < target:
+            await self.reached.wait()
+
+async def consume(hub, counter):
+    async for _ in hub.subscribe(MATCH_ID):
+        counter.add()
+
+async def consume_slowly(hub, delay, frames):
+    async for frame in hub.subscribe(MATCH_ID):
+        frames.append(frame)
+        await asyncio.sleep(delay)
+
+async def run(subscribers, updates, slow_delay):
+    pubsub = LocalPubSub()
+    set_pubsub_backend(pubsub)
+    hub = MatchStreamHub(heartbeat=3600)
+    hub.start(pubsub)
+    counter = Counter()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks = [asyncio.create_task(consume(hub, counter)) for _ in range(subscribers)]
+    await counter.wait_for(subscribers)  # everyone has its snapshot and is waiting
+    await asyncio.sleep(0)
+    per_subscriber = (tracemalloc.get_traced_memory()[0] - before) / subscribers
+    tracemalloc.stop()
+
+    fanout = []
+    for ball in range(updates):
+        start = time.perf_counter()
+        publish_match_update(MATCH_ID, player_points={'p1': 1})
+        await counter.wait_for(subscribers * (ball + 2))
+        fanout.append(time.perf_counter() - start)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Updates arrive ten times faster than the slow subscriber takes them
+    slow_frames = []
+    slow = asyncio.create_task(consume_slowly(hub, slow_delay, slow_frames))
+    await asyncio.sleep(0)
+    for _ in range(updates):
+        publish_match_update(MATCH_ID, player_points={'p2': 1})
+        await asyncio.sleep(slow_delay / 10)
+    await asyncio.sleep(slow_delay * 2)
+
+    slow.cancel()
+    await asyncio.gather(slow, return_exceptions=True)
+    hub.stop()
+
+    slow_points = sum(
+        json.loads(frame.split(b'data: ', 1)[1])['player_points'].get('p2', 0)
+        for frame in slow_frames[1:]
+    )
+    return per_subscriber, fanout, len(slow_frames) - 1, slow_points
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--subscribers', type=int, default=100000)
+    parser.add_argument('--updates', type=int, default=20)
+    parser.add_argument('--slow-delay', type=float, default=0.05, help='seconds a slow subscriber takes per frame')
+    args = parser.parse_args()
+
+    per_subscriber, fanout, slow_count, slow_points = asyncio.run(
+        run(args.subscribers, args.updates, args.slow_delay)
+    )
+    fanout.sort()
+    print(f"{args.subscribers:,d} idle subscribers on one match")
+    print(f"memory per idle subscriber                   {per_subscriber / 1024:9.2f} KiB (hub and task only)")
+    print(f"one update to every subscriber               best {fanout[0] * 1000:9.3f} ms   "
+          f"median {fanout[len(fanout) // 2] * 1000:9.3f} ms")
+    print(f"slow subscriber                              {slow_count} frames for {args.updates} updates, "
+          f"{slow_points:g} points (expected {args.updates})")
+
+if __name__ == '__main__':
+    main()
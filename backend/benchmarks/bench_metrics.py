@@ -0,0 +1,84 @@
+"""
+Benchmark: request instrumentation overhead
+
+Serves a listing of --docs documents through the Flask test client with
+metrics enabled and disabled. The test client skips the network and
+there is no MongoDB, so the request time here is a lower bound and the
+overhead percentage an upper bound. The two apps alternate in short
+rounds; on a noisy machine, the "hooks alone" line is the steadier figure.
+"""
+import argparse
+
+from flask import Flask, jsonify
+
+from app.utils.auth import init_auth
+from app.utils.json_encoder import BSONJSONProvider, serialize_document
+from app.utils.metrics import finish_request, init_metrics, record_phase, registry, start_request
+from benchmarks.bench_serializer import make_transactions
+from benchmarks.common import measure, report
+
+def make_app(enabled, docs):
+    """Build a minimal app with the auth layer, optionally instrumented"""
+    app = Flask('bench_metrics')
+    app.config['METRICS_ENABLED'] = enabled
+    app.json = BSONJSONProvider(app)
+    init_metrics(app)
+    init_auth(app)
+
+    @app.route('/listing')
+    def listing():
+        return jsonify({'transactions': [serialize_document(doc) for doc in docs]})
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--docs', type=int, default=20, help='documents per response')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--rounds', type=int, default=20, help='rounds per repeat, alternating the apps')
+    args = parser.parse_args()
+
+    docs = make_transactions(args.docs)
+    print(f'{args.requests} requests, {args.docs} documents per response')
+
+    # Alternate the two apps in short rounds so that both see the same
+    # machine noise; the best round of each is compared
+    clients = {enabled: make_app(enabled, docs).test_client() for enabled in (False, True)}
+    rounds = {False: [], True: []}
+    for _ in range(args.repeat):
+        for enabled, client in clients.items():
+            def run():
+                for _ in range(args.requests // args.rounds):
+                    assert client.get('/listing').status_code == 200
+
+            rounds[enabled].append(measure(run, args.rounds))
+
+    results = {}
+    for label, enabled in (('without metrics', False), ('with metrics', True)):
+        results[enabled] = {
+            'best': min(stats['best'] for stats in rounds[enabled]) * args.rounds,
+            'mean': sum(stats['mean'] for stats in rounds[enabled]) / args.repeat * args.rounds,
+        }
+        report(label, results[enabled], args.requests)
+
+    overhead = results[True]['best'] - results[False]['best']
+    print(f"overhead: {overhead / args.requests * 1e6:.1f} us per request, "
+          f"{overhead / results[False]['best'] * 100:.2f}% of request time")
+
+    # The hooks alone, which is what the end-to-end difference is made of
+    # once machine noise is taken out
+    def hooks():
+        for _ in range(args.requests):
+            start_request()
+            record_phase('auth', 0.0)
+            record_phase('serialize', 0.0)
+            finish_request('listing', 'GET', 200)
+
+    stats = measure(hooks, args.repeat)
+    print(f"hooks alone: {stats['best'] / args.requests * 1e6:.1f} us per request, "
+          f"{stats['best'] / results[False]['best'] * 100:.2f}% of request time")
+    registry.reset()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Micro-benchmark: recursive clean_document + jsonify vs the single-pass serializer
+"""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from flask import Flask
+
+from app.utils.json_encoder import clean_document, serialize_document, BSONJSONProvider
+from benchmarks.common import measure, report
+
+def make_transactions(count, seed=42):
+    """Build transaction documents shaped like the wallet collection"""
+    rng = random.Random(seed)
+    user_id = ObjectId()
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            '_id': ObjectId(),
+            'user_id': user_id,
+            'type': rng.choice(['credit', 'debit']),
+            'amount': round(rng.uniform(1, 5000), 2),
+            'description': 'Money added to wallet',
+            'league_id': ObjectId(),
+            'created_at': start + timedelta(minutes=i)
+        }
+        for i in range(count)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--documents', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    documents = make_transactions(args.documents)
+
+    default_app = Flask('default')
+    bson_app = Flask('bson')
+    bson_app.json = BSONJSONProvider(bson_app)
+
+    def current_path():
+        # clean_document mutates its input, so give it fresh copies
+        cleaned = [clean_document(dict(doc)) for doc in documents]
+        with default_app.app_context():
+            return default_app.json.response({'transactions': cleaned}).get_data()
+
+    def single_pass():
+        serialized = [serialize_document(doc) for doc in documents]
+        with bson_app.app_context():
+            return bson_app.json.response({'transactions': serialized}).get_data()
+
+    assert json.loads(current_path()) == json.loads(single_pass())
+
+    print(f'{args.documents} transaction documents')
+    report('clean_document + jsonify', measure(current_path, args.repeat), args.documents)
+    report('serialize_document + BSONJSONProvider', measure(single_pass, args.repeat), args.documents)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Micro-benchmark: fantasy team validation against a match's player table
+"""
+import argparse
+import random
+
+from app.services.team_builder import PlayerTable, TEAM_SIZE, lineup_hash
+from benchmarks.common import measure, report
+
+ROLES = ['wk'] * 3 + ['bat'] * 7 + ['ar'] * 5 + ['bowl'] * 7
+
+def make_squad(seed=42):
+    """Build a 22-player squad shaped like a match's `players`"""
+    rng = random.Random(seed)
+    return [
+        {
+            'player_id': f'player-{index:02d}',
+            'role': role,
+            'team': 'home' if index % 2 else 'away',
+            'credits': rng.choice([7.5, 8, 8.5, 9, 9.5, 10]),
+        }
+        for index, role in enumerate(ROLES)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--teams', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    squad = make_squad()
+    table = PlayerTable('bench', squad)
+    rng = random.Random(7)
+    player_ids = [player['player_id'] for player in squad]
+    lineups = [rng.sample(player_ids, TEAM_SIZE) for _ in range(args.teams)]
+
+    print(f'{args.teams} random lineups from a {len(squad)}-player squad')
+    report('build player table', measure(lambda: PlayerTable('bench', squad), args.repeat, 100))
+    report('validate', measure(lambda: [table.validate(lineup) for lineup in lineups], args.repeat), args.teams)
+    report('validate + lineup hash', measure(
+        lambda: [(table.validate(lineup), lineup_hash(lineup)) for lineup in lineups], args.repeat
+    ), args.teams)
+
+if __name__ == '__main__':
+    main()
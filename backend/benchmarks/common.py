@@ -0,0 +1,57 @@
+"""
+Shared helpers for the benchmark scripts
+
+Run benchmarks from the backend directory, e.g.
+    python -m benchmarks.bench_serializer
+"""
+import statistics
+import time
+
+def measure(func, repeat=5, number=1):
+    """
+    Time a function
+
+    Args:
+        func: Callable to time
+        repeat: Number of timed runs
+        number: Calls per run
+
+    Returns:
+        Dictionary with best and mean seconds per call
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+
+    return {'best': min(times), 'mean': statistics.mean(times), 'runs': repeat}
+
+def report(name, stats, items=None):
+    """
+    Print one benchmark result line
+
+    Args:
+        name: Benchmark name
+        stats: Dictionary returned by measure
+        items: Optional number of items processed per call, for a rate
+    """
+    line = f"{name:<44} best {stats['best'] * 1000:9.3f} ms   mean {stats['mean'] * 1000:9.3f} ms"
+    if items:
+        line += f"   {items / stats['best']:,.0f} items/s"
+    print(line)
+
+def percentile(values, fraction):
+    """
+    Get a percentile of a list of samples
+
+    Args:
+        values: Samples
+        fraction: Percentile as a fraction, e.g. 0.99
+
+    Returns:
+        The sample at that percentile, or 0.0 without samples
+    """
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
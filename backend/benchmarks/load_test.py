@@ -0,0 +1,112 @@
+"""
+Load test: p50/p99 latency of GET endpoints at many concurrent connections
+
+Opens --connections keep-alive connections (stdlib asyncio, no client
+dependency) and sends requests on all of them for --duration seconds.
+Start the server in the mode under test first, e.g.
+
+    python app/main.py                               # Flask (threaded dev server)
+    uvicorn app.asgi:app --port 5000 --workers 4     # ASGI + Motor
+
+then run, from the backend directory,
+
+    python -m benchmarks.load_test --connections 5000 --token <jwt>
+
+The process needs a file descriptor limit above the connection count
+(`ulimit -n 20000`).
+"""
+import argparse
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from benchmarks.common import percentile
+
+DEFAULT_PATHS = ('/api/matches/', '/api/wallet/balance')
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response and return its status code"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    if length:
+        await reader.readexactly(length)
+    return status
+
+async def run_connection(host, port, request, deadline, latencies, errors, start_gate):
+    """Send requests on one keep-alive connection until the deadline"""
+    await start_gate.wait()
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        errors['connect'] += 1
+        return
+
+    try:
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors['status'] += 1
+    except (OSError, asyncio.IncompleteReadError):
+        errors['dropped'] += 1
+    finally:
+        writer.close()
+
+async def load(url, path, connections, duration, token):
+    """Load one path and return its latency statistics"""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    headers = [f'GET {path} HTTP/1.1', f'Host: {parts.netloc}', 'Connection: keep-alive']
+    if token:
+        headers.append(f'Authorization: Bearer {token}')
+    request = ('\r\n'.join(headers) + '\r\n\r\n').encode()
+
+    latencies = []
+    errors = {'connect': 0, 'dropped': 0, 'status': 0}
+    start_gate = asyncio.Event()
+    deadline = time.monotonic() + duration
+    tasks = [
+        asyncio.create_task(run_connection(host, port, request, deadline, latencies, errors, start_gate))
+        for _ in range(connections)
+    ]
+    start_gate.set()
+    started = time.monotonic()
+    await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - started
+
+    return {
+        'requests': len(latencies),
+        'rate': len(latencies) / elapsed,
+        'p50': percentile(latencies, 0.5),
+        'p99': percentile(latencies, 0.99),
+        'errors': errors,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--path', action='append', help=f'path to load, default {", ".join(DEFAULT_PATHS)}')
+    parser.add_argument('--connections', type=int, default=5000)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--token', help='JWT for authenticated paths')
+    args = parser.parse_args()
+
+    print(f'{args.url}: {args.connections} connections for {args.duration:g}s per path')
+    for path in args.path or DEFAULT_PATHS:
+        result = asyncio.run(load(args.url, path, args.connections, args.duration, args.token))
+        errors = ', '.join(f'{kind} {count}' for kind, count in result['errors'].items() if count) or 'none'
+        print(
+            f"{path:<24} {result['requests']:9,d} requests   {result['rate']:9,.0f} req/s"
+            f"   p50 {result['p50'] * 1000:8.1f} ms   p99 {result['p99'] * 1000:8.1f} ms   errors: {errors}"
+        )
+
+if __name__ == '__main__':
+    main()
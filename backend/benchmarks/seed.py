@@ -0,0 +1,205 @@
+"""
+Fixed-seed data for the benchmark suite
+
+Every generator is a pure function of its seed and the document's index,
+and ObjectIds are derived from (collection tag, index), so a database
+seeded with the same sizes is the same database on every machine, and a
+smaller size is a prefix of a larger one. Documents are streamed, so
+1M users and 100k leagues are generated in constant memory:
+
+    python -m benchmarks.seed --mongo-uri mongodb://localhost:27017/ --users 1000000 --leagues 100000
+"""
+import argparse
+import base64
+import random
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from app.utils import passwords
+from app.utils.validations import identity_keys
+
+SEED = 42
+BASE_TIME = datetime(2024, 1, 1)
+
+# Every seeded user logs in with this password
+PASSWORD = 'bench-password'
+
+# ObjectId tags, one per collection
+_TAGS = {'users': 1, 'matches': 2, 'leagues': 3, 'transactions': 4}
+
+ENTRY_FEES = (10, 25, 49, 99, 199)
+MAX_TEAMS = (2, 10, 100, 1000, 10000)
+PRIZE_POOLS = (100, 1000, 5000, 10000, 50000, 100000, 1000000)
+LEAGUES_PER_MATCH = 100
+
+def seeded_id(collection, index):
+    """Reproducible ObjectId of a seeded document"""
+    return ObjectId(f'{_TAGS[collection]:08x}{index:016x}')
+
+def user_email(index):
+    return f'user{index}@bench.fantasy11.in'
+
+def user_mobile(index):
+    return f'9{index:09d}'
+
+def password_hash(n=2 ** 14, r=8, p=1, seed=SEED):
+    """
+    The scrypt hash stored on every seeded user, in app.utils.passwords format
+
+    The salt comes from the seed, so it is the same on every run. Hash at the
+    app's PASSWORD_SCRYPT_* cost, otherwise logins rehash.
+    """
+    salt = random.Random(seed).randbytes(passwords.SALT_BYTES)
+    key = passwords._scrypt(PASSWORD, salt, n, r, p)
+    return '$'.join((
+        passwords.HASH_PREFIX, str(n), str(r), str(p),
+        base64.b64encode(salt).decode(), base64.b64encode(key).decode()
+    ))
+
+def iter_users(count, stored_password, seed=SEED):
+    """
+    Yield user documents
+
+    Args:
+        count: Number of users
+        stored_password: Hash from password_hash, shared by every user
+        seed: Random seed
+    """
+    rng = random.Random(f'{seed}:users')
+    for index in range(count):
+        email, mobile = user_email(index), user_mobile(index)
+        wallet_paise = rng.randrange(0, 200001, 50)
+        yield {
+            '_id': seeded_id('users', index),
+            'name': f'Bench User {index}',
+            'email': email,
+            'mobile': mobile,
+            'identities': identity_keys(email, mobile),
+            'password': stored_password,
+            'wallet_paise': wallet_paise,
+            'wallet_balance': wallet_paise / 100,
+            'created_at': BASE_TIME + timedelta(seconds=index),
+        }
+
+def iter_matches(count, seed=SEED):
+    """Yield match documents"""
+    rng = random.Random(f'{seed}:matches')
+    for index in range(count):
+        yield {
+            '_id': seeded_id('matches', index),
+            'team1': f'Team {2 * index}',
+            'team2': f'Team {2 * index + 1}',
+            'status': rng.choice(('upcoming', 'upcoming', 'live', 'completed')),
+            'start_time': BASE_TIME + timedelta(hours=index),
+        }
+
+def iter_leagues(count, seed=SEED):
+    """
+    Yield league documents, LEAGUES_PER_MATCH per match
+
+    About a third of the leagues are free, and seats are partly taken.
+    """
+    rng = random.Random(f'{seed}:leagues')
+    for index in range(count):
+        max_teams = rng.choice(MAX_TEAMS)
+        yield {
+            '_id': seeded_id('leagues', index),
+            'name': f'Bench League {index}',
+            'match_id': seeded_id('matches', index // LEAGUES_PER_MATCH),
+            'prize_pool': rng.choice(PRIZE_POOLS),
+            'entry_fee': 0 if rng.random() < 0.3 else rng.choice(ENTRY_FEES),
+            'max_teams': max_teams,
+            'teams_count': rng.randrange(max_teams),
+            'popularity': rng.randrange(101),
+            'created_at': BASE_TIME + timedelta(seconds=index),
+        }
+
+def iter_transactions(users, per_user, seed=SEED):
+    """
+    Yield wallet transactions for the first `users` users
+
+    Args:
+        users: Number of users with a history
+        per_user: Transactions per user
+        seed: Random seed
+    """
+    rng = random.Random(f'{seed}:transactions')
+    index = 0
+    for user in range(users):
+        user_id = seeded_id('users', user)
+        for position in range(per_user):
+            yield {
+                '_id': seeded_id('transactions', index),
+                'user_id': user_id,
+                'type': rng.choice(('credit', 'debit')),
+                'amount': float(rng.randrange(100, 500001)) / 100,
+                'description': rng.choice(('Money added to wallet', 'League entry fee', 'Prize credited')),
+                'created_at': BASE_TIME + timedelta(minutes=position),
+            }
+            index += 1
+
+def insert_batches(collection, documents, batch_size=10000):
+    """Insert a stream of documents in unordered batches, returning the count"""
+    inserted = 0
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) == batch_size:
+            collection.insert_many(batch, ordered=False)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+    return inserted
+
+def seed_database(db, users, leagues, history_users, transactions_per_user, scrypt_n=2 ** 14, seed=SEED):
+    """
+    Fill an empty database with the seeded collections
+
+    Args:
+        db: Database instance
+        users: Number of users
+        leagues: Number of leagues
+        history_users: Users with a transaction history
+        transactions_per_user: Transactions per history user
+        scrypt_n: scrypt cost of the stored passwords
+        seed: Random seed
+
+    Returns:
+        Dictionary of collection name to documents inserted
+    """
+    matches = -(-leagues // LEAGUES_PER_MATCH)
+    return {
+        'users': insert_batches(db.users, iter_users(users, password_hash(scrypt_n, seed=seed), seed)),
+        'matches': insert_batches(db.matches, iter_matches(matches, seed)),
+        'leagues': insert_batches(db.leagues, iter_leagues(leagues, seed)),
+        'transactions': insert_batches(
+            db.transactions, iter_transactions(min(history_users, users), transactions_per_user, seed)
+        ),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongo-uri', required=True)
+    parser.add_argument('--db-name', default='fantasy11_bench')
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--leagues', type=int, default=100000)
+    parser.add_argument('--history-users', type=int, default=1000)
+    parser.add_argument('--transactions-per-user', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=SEED)
+    args = parser.parse_args()
+
+    from pymongo import MongoClient
+    from app.utils.indexes import ensure_indexes
+
+    client = MongoClient(args.mongo_uri)
+    client.drop_database(args.db_name)
+    db = client[args.db_name]
+    ensure_indexes(db)
+    counts = seed_database(db, args.users, args.leagues, args.history_users, args.transactions_per_user, seed=args.seed)
+    print(', '.join(f'{count:,d} {name}' for name, count in counts.items()))
+
+if __name__ == '__main__':
+    main()
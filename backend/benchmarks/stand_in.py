@@ -0,0 +1,133 @@
+"""
+Local MongoDB stand-ins for the benchmark suite
+
+In order of preference: a MongoDB server given by URI (a scratch database
+on it is used and dropped), a mongod spawned in a temporary directory as a
+single-node replica set, or mongomock. mongomock has no indexes and no
+transactions, and does not apply updates atomically across threads, so its
+numbers only compare with other mongomock runs, at small sizes, and paid
+league joins cannot run on it.
+"""
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+
+from pymongo import MongoClient
+
+from app.utils import db as db_module
+from app.utils.indexes import ensure_indexes
+
+BENCH_DB_NAME = 'fantasy11_bench'
+
+class StandIn:
+    """An open stand-in database, bound as the app's database"""
+
+    def __init__(self, kind, client, db, transactions):
+        self.kind = kind
+        self.client = client
+        self.db = db
+        self.transactions = transactions  # multi-document transactions supported
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _wait_for(check, timeout, what):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if check():
+                return
+        except Exception:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError(f'Timed out waiting for {what}')
+        time.sleep(0.2)
+
+@contextmanager
+def spawn_mongod(binary='mongod', timeout=60):
+    """
+    Run a throwaway single-node replica set
+
+    Yields:
+        Its connection URI
+    """
+    path = tempfile.mkdtemp(prefix='fantasy11-bench-')
+    port = _free_port()
+    try:
+        process = subprocess.Popen(
+            [
+                binary, '--dbpath', path, '--port', str(port), '--bind_ip', '127.0.0.1',
+                '--replSet', 'bench', '--logpath', os.path.join(path, 'mongod.log'),
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+    except OSError:
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+    try:
+        client = MongoClient('127.0.0.1', port, directConnection=True, serverSelectionTimeoutMS=1000)
+        _wait_for(lambda: client.admin.command('ping'), timeout, 'mongod to start')
+        client.admin.command('replSetInitiate', {'_id': 'bench', 'members': [{'_id': 0, 'host': f'127.0.0.1:{port}'}]})
+        _wait_for(lambda: client.admin.command('hello').get('isWritablePrimary'), timeout, 'the replica set primary')
+        client.close()
+        yield f'mongodb://127.0.0.1:{port}/?replicaSet=bench'
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        shutil.rmtree(path, ignore_errors=True)
+
+def _bind_server(uri):
+    db = db_module.connect_db({'MONGO_URI': uri, 'DB_NAME': BENCH_DB_NAME})
+    db_module.db_client.drop_database(BENCH_DB_NAME)
+    ensure_indexes(db)
+    hello = db_module.db_client.admin.command('hello')
+    return db_module.db_client, db, 'setName' in hello or hello.get('msg') == 'isdbgrid'
+
+@contextmanager
+def open_stand_in(mongo_uri=None, mongod=None):
+    """
+    Open an empty stand-in database and make it the app's database (get_db)
+
+    Args:
+        mongo_uri: Use a scratch database on this server
+        mongod: Spawn this mongod binary (e.g. 'mongod'); mongomock if
+            neither is given
+
+    Yields:
+        StandIn
+    """
+    if mongo_uri:
+        client, db, transactions = _bind_server(mongo_uri)
+        try:
+            yield StandIn(f'server {client.server_info()["version"]}', client, db, transactions)
+        finally:
+            client.drop_database(BENCH_DB_NAME)
+            client.close()
+    elif mongod:
+        with spawn_mongod(mongod) as uri:
+            client, db, transactions = _bind_server(uri)
+            try:
+                yield StandIn(f'mongod {client.server_info()["version"]}', client, db, transactions)
+            finally:
+                client.close()
+    else:
+        import mongomock
+
+        client = mongomock.MongoClient()
+        db = client[BENCH_DB_NAME]
+        db_module.db_client, db_module.db = client, db
+        try:
+            yield StandIn(f'mongomock {mongomock.__version__}', client, db, False)
+        finally:
+            db_module.db_client = db_module.db = None
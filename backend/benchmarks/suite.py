@@ -0,0 +1,435 @@
+"""
+Reproducible benchmark suite, offline against a seeded local stand-in
+
+Seeds a stand-in database (benchmarks/stand_in.py) with fixed-seed data
+(benchmarks/seed.py), then runs micro-benchmarks of hot functions and load
+scenarios through the app's routes with the Flask test client on request
+threads. Results are written as JSON so that two commits can be compared:
+
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --output after.json --baseline before.json
+    python -m benchmarks.suite --compare before.json after.json
+
+The quick profile fits mongomock. The full profile (1M users, 100k
+leagues) needs a real mongod, spawned here in a temporary directory:
+
+    python -m benchmarks.suite --profile full --mongod mongod --output full.json
+
+Only compare runs of the same profile on the same stand-in and machine.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app import create_app
+from app.services.points import calculate_player_points
+from app.utils.cache import invalidate_leagues
+from app.utils.json_encoder import clean_document
+from app.utils.jwt_helper import generate_token, verify_token
+from benchmarks.bench_match_completion import make_match_stats
+from benchmarks.common import measure, percentile
+from benchmarks.seed import (
+    PASSWORD,
+    SEED,
+    iter_transactions,
+    seed_database,
+    seeded_id,
+    user_email,
+    user_mobile,
+)
+from benchmarks.stand_in import open_stand_in
+
+FORMAT_VERSION = 2
+
+PROFILES = {
+    'quick': {
+        'users': 5000, 'leagues': 1000, 'history_users': 20, 'transactions_per_user': 120,
+        'logins': 48, 'listing_rounds': 3, 'join_users': 120, 'join_leagues': 4, 'join_seats': 25,
+        'history_requests': 120,
+    },
+    'full': {
+        'users': 1000000, 'leagues': 100000, 'history_users': 1000, 'transactions_per_user': 500,
+        'logins': 500, 'listing_rounds': 20, 'join_users': 2000, 'join_leagues': 10, 'join_seats': 100,
+        'history_requests': 5000,
+    },
+}
+
+# League listing: every filter with every sort, walked this many pages deep
+LISTING_FILTERS = ('all', 'free', 'paid', 'popular')
+LISTING_SORTS = ('prize', 'teams', 'entry')
+LISTING_PAGES = 4
+
+# Metrics compared between runs, and whether higher is better
+COMPARED_METRICS = {'best_per_item': False, 'p50': False, 'p99': False, 'rate': True, 'success_ratio': True}
+
+# Scenario counters that must stay 0 on a real server, whatever the baseline
+CORRECTNESS_COUNTERS = ('oversold', 'seat_drift')
+
+class Recorder:
+    """Latencies and statuses of the requests of one scenario"""
+
+    def __init__(self):
+        self.latencies = []  # of 2xx responses only
+        self.statuses = Counter()
+        self._lock = threading.Lock()
+
+    def request(self, send, *args, **kwargs):
+        start = time.perf_counter()
+        response = send(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            if 200 <= response.status_code < 300:
+                self.latencies.append(elapsed)
+            self.statuses[response.status_code] += 1
+        return response
+
+    def result(self, seconds):
+        """
+        Summarize the scenario
+
+        rate, p50 and p99 count 2xx responses only, so that fast errors
+        cannot pass for a speed-up; success_ratio is their share of all
+        requests.
+        """
+        requests = sum(self.statuses.values())
+        return {
+            'kind': 'macro',
+            'requests': requests,
+            'seconds': seconds,
+            'rate': len(self.latencies) / seconds if seconds else 0.0,
+            'success_ratio': len(self.latencies) / requests if requests else 0.0,
+            'p50': percentile(self.latencies, 0.5),
+            'p99': percentile(self.latencies, 0.99),
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+        }
+
+def run_tasks(tasks, threads):
+    """Run callables on request threads and return the wall time"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(task) for task in tasks]:
+            future.result()
+    return time.perf_counter() - start
+
+def auth(user_index):
+    return {'Authorization': f"Bearer {generate_token(seeded_id('users', user_index))}"}
+
+def micro_benchmarks(repeat, items=1000, seed=SEED):
+    """Time calculate_player_points, clean_document and verify_token over `items` inputs"""
+    players = list(make_match_stats(seed).values())
+    player_stats = [players[index % len(players)] for index in range(items)]
+    documents = list(iter_transactions(1, items, seed))
+    tokens = [generate_token(seeded_id('users', index)) for index in range(items)]
+
+    cases = {
+        'calculate_player_points': lambda: [calculate_player_points(stats) for stats in player_stats],
+        # clean_document mutates its input, so each call gets a copy
+        'clean_document': lambda: [clean_document(dict(document)) for document in documents],
+        'verify_token': lambda: [verify_token(token) for token in tokens],
+    }
+
+    results = {}
+    for name, func in cases.items():
+        stats = measure(func, repeat)
+        results[f'micro.{name}'] = {
+            'kind': 'micro',
+            'items': items,
+            'best': stats['best'],
+            'mean': stats['mean'],
+            'best_per_item': stats['best'] / items,
+        }
+    return results
+
+def login_storm(client, profile, threads, rng):
+    """Every request thread logs in at once, by email or by mobile"""
+    recorder = Recorder()
+    users = [rng.randrange(profile['users']) for _ in range(profile['logins'])]
+
+    def login(index, by_mobile):
+        body = {'mobile': user_mobile(index)} if by_mobile else {'email': user_email(index)}
+        body['password'] = PASSWORD
+        recorder.request(client.post, '/api/auth/login', json=body)
+
+    seconds = run_tasks([
+        lambda index=index, position=position: login(index, position % 2)
+        for position, index in enumerate(users)
+    ], threads)
+    return recorder.result(seconds)
+
+def league_listing(client, profile, threads):
+    """
+    Walk every filter and sort LISTING_PAGES pages deep, listing_rounds times
+
+    The leagues cache is invalidated before each round, so that every page
+    is read from the database.
+    """
+    recorder = Recorder()
+
+    def walk(filter_type, sort_by):
+        cursor = None
+        for _ in range(LISTING_PAGES):
+            query = {'filter': filter_type, 'sort': sort_by, 'limit': 50}
+            if cursor:
+                query['cursor'] = cursor
+            response = recorder.request(client.get, '/api/leagues/', query_string=query)
+            cursor = response.get_json().get('next_cursor')
+            if not cursor:
+                break
+
+    seconds = 0.0
+    for _ in range(profile['listing_rounds']):
+        invalidate_leagues()
+        seconds += run_tasks([
+            lambda filter_type=filter_type, sort_by=sort_by: walk(filter_type, sort_by)
+            for filter_type in LISTING_FILTERS for sort_by in LISTING_SORTS
+        ], threads)
+    return recorder.result(seconds)
+
+def join_contention(client, stand_in, profile, threads, rng):
+    """
+    join_users users race for join_seats seats in each of join_leagues new leagues
+
+    The leagues charge an entry fee when the stand-in has transactions.
+    Afterwards every league must have sold exactly its seats: oversold and
+    seat_drift are 0. mongomock does not apply updates atomically across
+    threads, so the check only holds against a real server, where
+    correctness_failures reports it. Most joins are refused once the
+    seats are gone, so success_ratio is at most the seats over the
+    attempts.
+    """
+    db = stand_in.db
+    entry_fee = 10 if stand_in.transactions else 0
+    leagues = [seeded_id('leagues', profile['leagues'] + index) for index in range(profile['join_leagues'])]
+    db.leagues.insert_many([
+        {
+            '_id': league_id, 'name': f'Contention {index}', 'prize_pool': 1000, 'entry_fee': entry_fee,
+            'max_teams': profile['join_seats'], 'teams_count': 0, 'popularity': 100,
+        }
+        for index, league_id in enumerate(leagues)
+    ])
+
+    # Users who can pay the fee, so that only seats are contended
+    candidates = db.users.find({'wallet_paise': {'$gte': entry_fee * 100 * len(leagues)}}, {'_id': 1}).limit(profile['join_users'])
+    headers = [{'Authorization': f"Bearer {generate_token(user['_id'])}"} for user in candidates]
+    attempts = [(league_id, user_headers) for league_id in leagues for user_headers in headers]
+    rng.shuffle(attempts)
+
+    recorder = Recorder()
+    seconds = run_tasks([
+        lambda league_id=league_id, user_headers=user_headers: recorder.request(
+            client.post, f'/api/leagues/{league_id}/join', headers=user_headers
+        )
+        for league_id, user_headers in attempts
+    ], threads)
+
+    result = recorder.result(seconds)
+    result['paid'] = bool(entry_fee)
+    result['oversold'] = result['seat_drift'] = 0
+    for league_id in leagues:
+        entries = db.league_participants.count_documents({'league_id': league_id})
+        teams_count = db.leagues.find_one({'_id': league_id}, {'teams_count': 1})['teams_count']
+        result['oversold'] += max(0, entries - profile['join_seats'])
+        result['seat_drift'] += abs(teams_count - entries)
+    return result
+
+def transaction_history(client, profile, threads, rng):
+    """History users page through their transactions, 50 at a time"""
+    recorder = Recorder()
+    users = min(profile['history_users'], profile['users'])
+    headers = {index: auth(index) for index in range(users)}
+
+    def browse(index):
+        cursor = None
+        while True:
+            query = {'limit': 50}
+            if cursor:
+                query['cursor'] = cursor
+            response = recorder.request(client.get, '/api/wallet/transactions', query_string=query, headers=headers[index])
+            cursor = response.get_json().get('next_cursor')
+            if not cursor:
+                break
+
+    pages = max(1, -(-profile['transactions_per_user'] // 50))
+    seconds = run_tasks([
+        lambda index=rng.randrange(users): browse(index)
+        for _ in range(max(1, profile['history_requests'] // pages))
+    ], threads)
+    return recorder.result(seconds)
+
+def git_revision():
+    """Current commit and whether the tree has local changes, or (None, None)"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=here, capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=here, capture_output=True, text=True, check=True).stdout
+        return commit, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+def run_suite(profile_name, profile, threads, repeat, seed, mongo_uri=None, mongod=None, log=print):
+    """
+    Seed a stand-in and run every benchmark
+
+    Returns:
+        Results document, as written by --output
+    """
+    rng = random.Random(seed)
+    commit, dirty = git_revision()
+    report = {
+        'format': FORMAT_VERSION,
+        'commit': commit,
+        'dirty': dirty,
+        'created_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'profile': dict(profile, name=profile_name, seed=seed, threads=threads),
+        'results': {},
+    }
+
+    log('micro-benchmarks')
+    report['results'].update(micro_benchmarks(repeat, seed=seed))
+
+    with open_stand_in(mongo_uri, mongod) as stand_in:
+        report['stand_in'] = stand_in.kind
+        app = create_app(init_database=False)
+        client = app.test_client(use_cookies=False)
+
+        log(f"seeding {stand_in.kind}: {profile['users']:,d} users, {profile['leagues']:,d} leagues")
+        start = time.perf_counter()
+        report['seeded'] = seed_database(
+            stand_in.db, profile['users'], profile['leagues'], profile['history_users'],
+            profile['transactions_per_user'], app.config['PASSWORD_SCRYPT_N'], seed
+        )
+        report['seed_seconds'] = time.perf_counter() - start
+
+        scenarios = (
+            ('login_storm', lambda: login_storm(client, profile, threads, rng)),
+            ('league_listing', lambda: league_listing(client, profile, threads)),
+            ('join_contention', lambda: join_contention(client, stand_in, profile, threads, rng)),
+            ('transaction_history', lambda: transaction_history(client, profile, threads, rng)),
+        )
+        for name, scenario in scenarios:
+            log(f'scenario {name}')
+            report['results'][f'macro.{name}'] = scenario()
+
+    return report
+
+def print_results(report):
+    for name, result in report['results'].items():
+        if result['kind'] == 'micro':
+            print(f"{name:<34} {result['best_per_item'] * 1e6:10.2f} us per item   ({result['items']:,d} items, best of runs)")
+        else:
+            statuses = ', '.join(f'{status}: {count}' for status, count in result['statuses'].items())
+            print(
+                f"{name:<34} {result['requests']:7,d} requests   {result['rate']:9,.1f} ok/s"
+                f"   p50 {result['p50'] * 1000:8.2f} ms   p99 {result['p99'] * 1000:8.2f} ms"
+                f"   {result['success_ratio']:6.1%} ok   [{statuses}]"
+            )
+
+def correctness_failures(report):
+    """
+    Get the CORRECTNESS_COUNTERS above 0 in a run against a real server
+
+    mongomock runs are skipped, since it does not apply updates atomically.
+
+    Returns:
+        Names of the failing counters, e.g. ['macro.join_contention.oversold']
+    """
+    if str(report.get('stand_in', '')).startswith('mongomock'):
+        return []
+    return [
+        f'{name}.{counter}'
+        for name, result in report['results'].items()
+        for counter in CORRECTNESS_COUNTERS
+        if result.get(counter, 0) > 0
+    ]
+
+def compare(baseline, current, threshold):
+    """
+    Print the change of every compared metric between two results documents
+
+    Returns:
+        Names of the metrics that got worse by more than threshold (a
+        fraction), and of the current run's correctness failures
+    """
+    for key in ('profile', 'stand_in', 'cpus'):
+        if baseline.get(key) != current.get(key):
+            print(f'warning: {key} differs, the runs may not be comparable')
+
+    regressions = []
+    for failure in correctness_failures(current):
+        print(f'{failure:<46} REGRESSION (must be 0 on a real server)')
+        regressions.append(failure)
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if metric not in result or not before.get(metric):
+                continue
+            change = result[metric] / before[metric] - 1
+            worse = -change if higher_is_better else change
+            flag = ''
+            if worse > threshold:
+                flag = '  REGRESSION'
+                regressions.append(f'{name}.{metric}')
+            print(f'{name + "." + metric:<46} {before[metric]:12.6g} -> {result[metric]:12.6g}   {change:+7.1%}{flag}')
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='quick')
+    parser.add_argument('--users', type=int, help="override the profile's user count")
+    parser.add_argument('--leagues', type=int, help="override the profile's league count")
+    parser.add_argument('--threads', type=int, default=16, help='concurrent request threads')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per micro-benchmark')
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--mongo-uri', help='use a scratch database on this MongoDB server')
+    parser.add_argument('--mongod', help='spawn this mongod binary in a temporary directory')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='compare the results with this earlier JSON file')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help='compare two JSON files and exit')
+    parser.add_argument('--threshold', type=float, default=0.10, help='regression threshold, as a fraction')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as baseline, open(args.compare[1]) as current:
+            regressions = compare(json.load(baseline), json.load(current), args.threshold)
+        return 1 if regressions else 0
+
+    profile = dict(PROFILES[args.profile])
+    if args.users:
+        profile['users'] = args.users
+    if args.leagues:
+        profile['leagues'] = args.leagues
+
+    report = run_suite(
+        args.profile, profile, args.threads, args.repeat, args.seed, args.mongo_uri, args.mongod,
+        log=lambda message: print(message, file=sys.stderr)
+    )
+    print_results(report)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(json.load(baseline), report, args.threshold)
+        return 1 if regressions else 0
+    failures = correctness_failures(report)
+    for failure in failures:
+        print(f'{failure} is above 0', file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""
+ASGI parity test
+Checks that the hot GET endpoints answer the same in both serving modes:
+each request goes through the ASGI dispatcher to its async Quart handler,
+and through a2wsgi to the Flask route, and the status, body and ETag must
+match.
+
+Needs the packages in requirements-asgi.txt and mongomock
+(requirements-bench.txt). The Flask routes read mongomock directly; the
+async handlers read it through a small stand-in for Motor's awaitable
+find_one and find(...).to_list(). Run from the backend directory:
+    python test_asgi_parity.py
+or with pytest.
+"""
+
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta
+
+import mongomock
+from bson import ObjectId
+
+from app.asgi import create_asgi_app
+from app.utils import async_db as async_db_module
+from app.utils import db as db_module
+from app.utils.cache import TTLCache, get_cache_backend, set_cache_backend
+from app.utils.jwt_helper import generate_token
+
+class AsyncCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, limit):
+        self._cursor = self._cursor.limit(limit)
+        return self
+
+    async def to_list(self, length):
+        documents = list(self._cursor)
+        return documents if length is None else documents[:length]
+
+class AsyncCollection:
+    def __init__(self, collection):
+        self._collection = collection
+
+    async def find_one(self, *args, **kwargs):
+        return self._collection.find_one(*args, **kwargs)
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self._collection.find(*args, **kwargs))
+
+class AsyncDatabase:
+    """Motor-shaped view of a mongomock database"""
+
+    def __init__(self, database):
+        self._database = database
+
+    def __getattr__(self, name):
+        return AsyncCollection(self._database[name])
+
+def make_db():
+    db = mongomock.MongoClient().db
+    now = datetime(2024, 1, 1, 12)
+    user_id = db.users.insert_one({
+        'name': 'Ana', 'email': 'ana@example.com', 'mobile': '9876543210', 'password': 'x',
+        'wallet_paise': 12550, 'wallet_balance': 125.5, 'created_at': now
+    }).inserted_id
+    match_ids = db.matches.insert_many([
+        {'team1': 'MI', 'team2': 'CSK', 'status': status, 'venue': 'Wankhede ✓', 'match_date': now + timedelta(days=day)}
+        for day, status in enumerate(('upcoming', 'live', 'completed', 'upcoming'))
+    ]).inserted_ids
+    db.user_matches.insert_many([
+        {'user_id': user_id, 'match_id': match_id, 'status': 'upcoming', 'players': [{'player_id': 'p1'}]}
+        for match_id in match_ids[:3]
+    ])
+    db.leagues.insert_many([
+        {
+            'name': f'League {index}', 'prize_pool': 1000 * (index % 4), 'entry_fee': 10 * (index % 3),
+            'max_teams': 10, 'teams_count': index % 5, 'popularity': index, 'status': 'open',
+            'created_at': now
+        }
+        for index in range(12)
+    ])
+    db.transactions.insert_many([
+        {
+            'user_id': user_id, 'type': ('credit', 'debit')[index % 2], 'amount': 10.5 + index,
+            'description': f'Entry {index}', 'created_at': now + timedelta(minutes=index % 4)
+        }
+        for index in range(9)
+    ])
+    return db, user_id, match_ids
+
+async def asgi_get(app, path, query='', token=None):
+    """Send one GET to an ASGI app; return (status, content type, ETag, body)"""
+    headers = [(b'host', b'localhost')]
+    if token:
+        headers.append((b'authorization', f'Bearer {token}'.encode()))
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+        'root_path': '', 'headers': headers, 'server': ('localhost', 80), 'client': ('127.0.0.1', 5000),
+    }
+    requested = []
+
+    async def receive():
+        if not requested:
+            requested.append(True)
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # The client stays connected until the app is done
+        await asyncio.Event().wait()
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = next(message for message in messages if message['type'] == 'http.response.start')
+    response_headers = {name.decode().lower(): value.decode() for name, value in start['headers']}
+    body = b''.join(message.get('body', b'') for message in messages if message['type'] == 'http.response.body')
+    return start['status'], response_headers.get('content-type'), response_headers.get('etag'), body
+
+def run_both(dispatcher, path, query='', token=None):
+    """The same request through the async handler and through Flask, each with an empty cache"""
+    assert dispatcher._handles({'method': 'GET', 'path': path}), path
+
+    async def both():
+        set_cache_backend(TTLCache())
+        async_response = await asgi_get(dispatcher, path, query, token)
+        set_cache_backend(TTLCache())
+        flask_response = await asgi_get(dispatcher.wsgi_app, path, query, token)
+        return async_response, flask_response
+
+    return asyncio.run(both())
+
+def with_databases(test):
+    def run():
+        db, user_id, match_ids = make_db()
+        original_cache = get_cache_backend()
+        db_module.db = db
+        async_db_module.async_db = AsyncDatabase(db)
+        try:
+            test(db, user_id, match_ids)
+        finally:
+            db_module.db = None
+            async_db_module.async_db = None
+            set_cache_backend(original_cache)
+    run.__name__ = test.__name__
+    return run
+
+def make_dispatcher():
+    from app import create_app
+    return create_asgi_app(create_app(init_database=False))
+
+def assert_same(dispatcher, path, query='', token=None, status=200):
+    async_response, flask_response = run_both(dispatcher, path, query, token)
+    assert async_response == flask_response, (path, query, async_response, flask_response)
+    assert async_response[0] == status, (path, query, async_response)
+    return json.loads(async_response[3])
+
+@with_databases
+def test_match_endpoints(db, user_id, match_ids):
+    dispatcher = make_dispatcher()
+    for status in ('all', 'upcoming', 'live', 'completed'):
+        body = assert_same(dispatcher, '/api/matches/', f'status={status}')
+        assert len(body['matches']) == (4 if status == 'all' else 2 if status == 'upcoming' else 1)
+    assert assert_same(dispatcher, f'/api/matches/{match_ids[1]}')['match']['status'] == 'live'
+    assert_same(dispatcher, f'/api/matches/{ObjectId()}', status=404)
+
+    token = generate_token(user_id)
+    assert len(assert_same(dispatcher, '/api/matches/my-matches', token=token)['matches']) == 3
+    assert_same(dispatcher, '/api/matches/my-matches', status=401)
+
+@with_databases
+def test_league_listing_pages(db, user_id, match_ids):
+    dispatcher = make_dispatcher()
+    for filter_type in ('all', 'free', 'paid', 'popular'):
+        for sort_by in ('prize', 'teams', 'entry'):
+            seen, query = [], f'filter={filter_type}&sort={sort_by}&limit=5'
+            while True:
+                body = assert_same(dispatcher, '/api/leagues/', query)
+                seen += [league['id'] for league in body['leagues']]
+                if not body['next_cursor']:
+                    break
+                query = f"filter={filter_type}&sort={sort_by}&limit=5&cursor={body['next_cursor']}"
+            assert len(seen) == len(set(seen))
+    assert_same(dispatcher, '/api/leagues/', 'cursor=not-a-cursor', status=400)
+
+@with_databases
+def test_user_and_wallet_endpoints(db, user_id, match_ids):
+    dispatcher = make_dispatcher()
+    token = generate_token(user_id)
+    profile = assert_same(dispatcher, '/api/users/profile', token=token)['user']
+    assert 'password' not in profile and profile['wallet_balance'] == 125.5
+    assert assert_same(dispatcher, '/api/wallet/balance', token=token) == {'balance': 125.5}
+
+    seen, query = [], 'limit=4'
+    while True:
+        body = assert_same(dispatcher, '/api/wallet/transactions', query, token)
+        seen += [transaction['id'] for transaction in body['transactions']]
+        if not body['next_cursor']:
+            break
+        query = f"limit=4&cursor={body['next_cursor']}"
+    assert len(seen) == len(set(seen)) == 9
+    assert len(assert_same(dispatcher, '/api/wallet/transactions', 'type=debit', token)['transactions']) == 4
+
+    for path in ('/api/users/profile', '/api/wallet/balance', '/api/wallet/transactions'):
+        assert_same(dispatcher, path, status=401)
+    assert_same(dispatcher, '/api/wallet/balance', token=generate_token(ObjectId()), status=404)
+
+def main():
+    tests = [
+        test_match_endpoints,
+        test_league_listing_pages,
+        test_user_and_wallet_endpoints,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
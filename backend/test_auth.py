@@ -0,0 +1,131 @@
+"""
+Login test
+Checks that login and registration answer 400 for a password that is not
+a string, that a legacy plaintext password is rehashed on login, that a
+full hashing queue answers 503, and that the hashing pools of all web
+workers together stay within the CPU count.
+
+Needs mongomock (requirements-bench.txt); requests go through the Flask
+test client and hashing runs in the real process pool, at a low cost. Run
+from the backend directory:
+    python test_auth.py
+or with pytest.
+"""
+
+import sys
+
+import mongomock
+
+from app import create_app
+from app.models.user import User
+from app.utils import db as db_module
+from app.utils import passwords
+from app.utils.passwords import init_passwords, size_hash_workers, verify_password
+from app.utils.validations import identity_keys
+
+def make_client():
+    """Test client over a fresh mongomock database, with one plaintext password user"""
+    db = mongomock.MongoClient().db
+    db.users.create_indexes(User.INDEXES)
+    db_module.db = db
+    user_id = db.users.insert_one({
+        'name': 'ana', 'email': 'ana@example.com', 'mobile': '9876543210',
+        'identities': identity_keys('ana@example.com', '9876543210'), 'password': 'secret1'
+    }).inserted_id
+    app = create_app(init_database=False)
+    app.config['PASSWORD_SCRYPT_N'] = 2 ** 10
+    init_passwords(app)
+    return app.test_client(), db, user_id
+
+def login(client, body):
+    response = client.post('/api/auth/login', json=body)
+    return response.status_code, response
+
+def with_database(test):
+    def run():
+        try:
+            test()
+        finally:
+            db_module.db = None
+    run.__name__ = test.__name__
+    return run
+
+@with_database
+def test_non_string_password_rejected():
+    client, _, _ = make_client()
+    for password in (123456, ['secret1'], {'p': 'secret1'}, 1.5):
+        assert login(client, {'email': 'ana@example.com', 'password': password})[0] == 400, password
+        response = client.post('/api/auth/register', json={
+            'name': 'raj', 'email': 'raj@example.com', 'mobile': '9123456789', 'password': password
+        })
+        assert response.status_code == 400, password
+    assert login(client, {'email': ['ana@example.com'], 'password': 'secret1'})[0] == 400
+    assert client.post('/api/auth/login', data='not json').status_code == 400
+
+@with_database
+def test_plaintext_password_rehashed_on_login():
+    client, db, user_id = make_client()
+    assert login(client, {'email': 'ana@example.com', 'password': 'wrong'})[0] == 401
+    assert db.users.find_one({'_id': user_id})['password'] == 'secret1'
+
+    status, response = login(client, {'email': 'ana@example.com', 'password': 'secret1'})
+    assert status == 200 and 'password' not in response.get_json()['user']
+    stored = db.users.find_one({'_id': user_id})['password']
+    assert stored.startswith('scrypt$1024$')
+    assert verify_password('secret1', stored) == (True, False)
+
+    # The hash now verifies on its own
+    assert login(client, {'mobile': '+91 98765 43210', 'password': 'secret1'})[0] == 200
+    assert login(client, {'mobile': '9876543210', 'password': 'secret2'})[0] == 401
+    assert db.users.find_one({'_id': user_id})['password'] == stored
+
+@with_database
+def test_full_hashing_queue_answers_503():
+    client, db, user_id = make_client()
+    db.users.update_one({'_id': user_id}, {'$set': {'password': passwords.hash_password('secret1')}})
+
+    # Take every slot, as logins waiting for the pool would
+    _, slots = passwords._get_executor()
+    taken = 0
+    while slots.acquire(blocking=False):
+        taken += 1
+    try:
+        status, response = login(client, {'email': 'ana@example.com', 'password': 'secret1'})
+        assert status == 503 and response.headers['Retry-After'] == '1'
+        response = client.post('/api/auth/register', json={
+            'name': 'raj', 'email': 'raj@example.com', 'mobile': '9123456789', 'password': 'secret1'
+        })
+        assert response.status_code == 503
+        assert db.users.count_documents({}) == 1
+    finally:
+        for _ in range(taken):
+            slots.release()
+    assert login(client, {'email': 'ana@example.com', 'password': 'secret1'})[0] == 200
+
+def test_hash_workers_share_the_cpus():
+    assert size_hash_workers({}, web_workers=1, cpu_count=8) == 8
+    assert size_hash_workers({}, web_workers=4, cpu_count=8) == 2
+    # The launcher's default of 2 * CPUs + 1 workers leaves one each
+    assert size_hash_workers({}, web_workers=17, cpu_count=8) == 1
+    assert size_hash_workers({'WEB_WORKERS': 2}, cpu_count=8) == 4
+    assert size_hash_workers({'PASSWORD_HASH_WORKERS': 3}, web_workers=17, cpu_count=8) == 3
+
+def main():
+    tests = [
+        test_non_string_password_rejected,
+        test_plaintext_password_rehashed_on_login,
+        test_full_hashing_queue_answers_503,
+        test_hash_workers_share_the_cpus,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Response cache test
+Checks that TTLCache drops invalidation counters only once no entry can
+depend on them, and that the Flask and Quart cached_response decorators
+share keys, entries and ETags.
+
+The decorator test needs Quart (requirements-asgi.txt). Run from the
+backend directory:
+    python test_cache.py
+or with pytest.
+"""
+
+import asyncio
+import sys
+
+from flask import Flask, jsonify
+
+from app.utils import cache
+from app.utils.cache import (
+    COUNTER_GRACE_SECONDS,
+    TTLCache,
+    cached_response,
+    get_cache_backend,
+    invalidate,
+    set_cache_backend,
+)
+
+class Clock:
+    """Stand-in for the time module, moved by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+def with_clock(test):
+    def run():
+        clock, original = Clock(), cache.time
+        cache.time = clock
+        try:
+            test(clock)
+        finally:
+            cache.time = original
+    run.__name__ = test.__name__
+    return run
+
+@with_clock
+def test_counters_outlive_entries(clock):
+    backend = TTLCache()
+    backend.set('entry', b'x', ttl=10)
+    backend.incr('gen:a')
+    backend.incr('gen:a')
+
+    clock.now += 10 + COUNTER_GRACE_SECONDS
+    backend.incr('gen:b')
+    assert backend.get('gen:a') == b'2'
+    assert backend.get('entry') is None
+
+    # Unused for longer than any entry lives: dropped on the next access
+    clock.now += 11 + COUNTER_GRACE_SECONDS
+    backend.incr('gen:b')
+    assert backend.get('gen:a') is None
+    assert list(backend._counters) == ['gen:b']
+
+@with_clock
+def test_counters_kept_while_read(clock):
+    backend = TTLCache()
+    backend.set('entry', b'x', ttl=10)
+    backend.incr('gen:a')
+    for _ in range(5):
+        clock.now += COUNTER_GRACE_SECONDS
+        assert backend.get('gen:a') == b'1'
+
+@with_clock
+def test_counters_without_ttl_are_kept(clock):
+    backend = TTLCache()
+    backend.set('entry', b'x')
+    backend.incr('gen:a')
+    clock.now += 10 ** 9
+    backend.incr('gen:b')
+    assert backend.get('gen:a') == b'1'
+
+def build_apps(calls):
+    from quart import Quart, jsonify as quart_jsonify
+    from app.async_routes.helpers import cached_response as async_cached_response
+
+    flask_app = Flask(__name__)
+    quart_app = Quart(__name__)
+
+    @flask_app.route('/items/<item_id>')
+    @cached_response(tags=('item:{item_id}',), ttl=60)
+    def flask_item(item_id):
+        calls.append('flask')
+        return jsonify({'id': item_id})
+
+    @quart_app.route('/items/<item_id>')
+    @async_cached_response(tags=('item:{item_id}',), ttl=60)
+    async def quart_item(item_id):
+        calls.append('quart')
+        return quart_jsonify({'id': item_id})
+
+    return flask_app, quart_app
+
+def test_sync_and_async_share_entries():
+    original = get_cache_backend()
+    set_cache_backend(TTLCache())
+    try:
+        calls = []
+        flask_app, quart_app = build_apps(calls)
+        flask_client, quart_client = flask_app.test_client(), quart_app.test_client()
+
+        async def quart_get(path, headers=None):
+            response = await quart_client.get(path, headers=headers)
+            return response.status_code, response.headers.get('ETag'), await response.get_data()
+
+        first = flask_client.get('/items/1?b=2&a=1')
+        status, etag, body = asyncio.run(quart_get('/items/1?a=1&b=2'))
+        assert calls == ['flask']
+        assert (status, etag, body) == (200, first.headers['ETag'], first.get_data())
+        assert asyncio.run(quart_get('/items/1?a=1&b=2', {'If-None-Match': etag}))[0] == 304
+
+        invalidate('item:1')
+        asyncio.run(quart_get('/items/1?a=1&b=2'))
+        flask_client.get('/items/1?a=1&b=2')
+        assert calls == ['flask', 'quart']
+    finally:
+        set_cache_backend(original)
+
+def main():
+    tests = [
+        test_counters_outlive_entries,
+        test_counters_kept_while_read,
+        test_counters_without_ttl_are_kept,
+        test_sync_and_async_share_entries,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
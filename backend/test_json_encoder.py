@@ -0,0 +1,92 @@
+"""
+JSON encoder test
+Checks that encode_json gives the same bytes through orjson and through
+the standard library encoder, so ETags match whichever one a worker has:
+sorted keys, raw UTF-8, ObjectIds and datetimes as strings.
+
+Needs orjson (requirements.txt). Run from the backend directory:
+    python test_json_encoder.py
+or with pytest.
+"""
+
+import json
+import sys
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from app.utils import json_encoder
+from app.utils.json_encoder import encode_json
+
+DOCUMENTS = [
+    {'zeta': 1, 'alpha': {'mid': [1, 2.5, None, True, False], 'beta': 'x'}, 'Ab': 0, 'ab': 0},
+    {'name': 'Mumbai Indians ✓', 'city': 'मुंबई', 'é': 'ü', 'quote': '"\\\n\t\x00\x1f', 'ls': ' '},
+    {
+        'naive': datetime(2024, 1, 2, 3, 4, 5),
+        'micro': datetime(2024, 1, 2, 3, 4, 5, 678901),
+        'aware': datetime(2024, 1, 2, tzinfo=timezone.utc),
+    },
+    {'id': ObjectId('65a1b2c3d4e5f60718293a4b'), 'ids': [ObjectId('65a1b2c3d4e5f60718293a4c')]},
+    {10: 'ten', 2: 'two'},
+    [{'b': 1, 'a': 2}, 'plain', -7, 2 ** 53],
+]
+
+def encode_without_orjson(obj):
+    original = json_encoder.orjson
+    json_encoder.orjson = None
+    try:
+        return encode_json(obj)
+    finally:
+        json_encoder.orjson = original
+
+def test_orjson_is_used():
+    assert json_encoder.orjson is not None
+
+def test_same_bytes_with_and_without_orjson():
+    for document in DOCUMENTS:
+        assert encode_json(document) == encode_without_orjson(document), document
+
+def test_encoding():
+    assert encode_json(DOCUMENTS[0]) == b'{"Ab":0,"ab":0,"alpha":{"beta":"x","mid":[1,2.5,null,true,false]},"zeta":1}'
+    assert encode_json({'city': 'मुंबई'}) == '{"city":"मुंबई"}'.encode()
+    assert json.loads(encode_json(DOCUMENTS[2])) == {
+        'naive': '2024-01-02T03:04:05',
+        'micro': '2024-01-02T03:04:05.678901',
+        'aware': '2024-01-02T00:00:00+00:00',
+    }
+    assert json.loads(encode_json(DOCUMENTS[3]))['ids'] == ['65a1b2c3d4e5f60718293a4c']
+    assert encode_json(DOCUMENTS[4]) == b'{"2":"two","10":"ten"}'
+
+def test_floats_decode_alike():
+    # Exponents are spelled 1e20 by orjson and 1e+20 by json: same number
+    document = {'small': 0.1, 'large': 1e20, 'negative_zero': -0.0, 'tiny': 5e-324}
+    assert json.loads(encode_json(document)) == json.loads(encode_without_orjson(document))
+
+def test_unsupported_types_raise():
+    for encode in (encode_json, encode_without_orjson):
+        try:
+            encode({'value': object()})
+        except TypeError:
+            continue
+        raise AssertionError(f'expected TypeError from {encode.__name__}')
+
+def main():
+    tests = [
+        test_orjson_is_used,
+        test_same_bytes_with_and_without_orjson,
+        test_encoding,
+        test_floats_decode_alike,
+        test_unsupported_types_raise,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
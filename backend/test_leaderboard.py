@@ -0,0 +1,179 @@
+"""
+League leaderboard test
+Checks that concurrent requests share a single load of a league, that
+published points updates reach a worker's loaded leaderboard and stale ones
+are dropped, and that unknown leagues are not kept, with LocalPubSub
+standing in for the Redis pub/sub backend.
+
+Run from the backend directory:
+    python test_leaderboard.py
+or with pytest.
+"""
+
+import sys
+import threading
+
+from bson import ObjectId
+
+from app.services import leaderboard
+from app.services.leaderboard import get_leaderboard, publish_entries, points_version
+from app.utils.pubsub import LocalPubSub, set_pubsub_backend
+
+class SlowParticipants:
+    """league_participants stand-in that counts reads and blocks until released"""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.reads = 0
+        self.release = threading.Event()
+
+    def find(self, query, projection):
+        self.reads += 1
+        self.release.wait(5)
+        return list(self.entries)
+
+class FakeLeagues:
+    """leagues stand-in that knows which league IDs exist"""
+
+    def __init__(self, league_ids):
+        self.league_ids = {ObjectId(league_id) for league_id in league_ids}
+
+    def with_options(self, **kwargs):
+        return self
+
+    def find_one(self, query, projection=None):
+        return {'_id': query['_id']} if query['_id'] in self.league_ids else None
+
+class FakeDB:
+    def __init__(self, entries, league_ids=()):
+        self.league_participants = SlowParticipants(entries)
+        self.leagues = FakeLeagues(league_ids)
+
+def fresh_backend():
+    leaderboard._leaderboards.clear()
+    set_pubsub_backend(LocalPubSub())
+
+def test_one_load_per_league():
+    fresh_backend()
+    league_id = str(ObjectId())
+    entry = {'_id': ObjectId(), 'user_id': ObjectId(), 'points': 7}
+    db = FakeDB([entry], [league_id])
+
+    boards = []
+    threads = [threading.Thread(target=lambda: boards.append(get_leaderboard(db, league_id))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    db.league_participants.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert db.league_participants.reads == 1
+    assert len({id(board) for board in boards}) == 1
+    assert get_leaderboard(db, league_id).top(1)[0]['points'] == 7
+    assert db.league_participants.reads == 1
+
+def test_update_during_load_is_applied():
+    fresh_backend()
+    league_id = str(ObjectId())
+    entry_id, user_id = ObjectId(), ObjectId()
+    db = FakeDB([{'_id': entry_id, 'user_id': user_id, 'points': 0}], [league_id])
+
+    boards = []
+    loader = threading.Thread(target=lambda: boards.append(get_leaderboard(db, league_id)))
+    loader.start()
+    while not leaderboard._loading:
+        pass
+    # Published by another process while this one reads the entries
+    publish_entries(league_id, [(entry_id, user_id, 42), (ObjectId(), ObjectId(), 5)], points_version())
+    db.league_participants.release.set()
+    loader.join()
+
+    board = boards[0]
+    assert len(board) == 2
+    assert board.top(1)[0]['points'] == 42
+    assert board.rank(entry_id) == 1
+
+def test_published_updates_reach_loaded_board():
+    fresh_backend()
+    league_id = str(ObjectId())
+    first, second = ObjectId(), ObjectId()
+    db = FakeDB([
+        {'_id': first, 'user_id': ObjectId(), 'points': 10},
+        {'_id': second, 'user_id': ObjectId(), 'points': 5},
+    ], [league_id])
+    db.league_participants.release.set()
+    board = get_leaderboard(db, league_id)
+
+    publish_entries(league_id, [(second, ObjectId(), 20)], points_version())
+    assert board.rank(second) == 1
+    assert board.rank(first) == 2
+
+    # Other leagues' updates are ignored
+    publish_entries(str(ObjectId()), [(first, ObjectId(), 99)], points_version())
+    assert board.top(1)[0]['points'] == 20
+
+def test_stale_update_is_dropped():
+    fresh_backend()
+    league_id = str(ObjectId())
+    entry_id, user_id = ObjectId(), ObjectId()
+    db = FakeDB([{'_id': entry_id, 'user_id': user_id, 'points': 10, 'points_version': 100}], [league_id])
+    db.league_participants.release.set()
+    board = get_leaderboard(db, league_id)
+
+    # Written before the loaded total, delivered after it
+    publish_entries(league_id, [(entry_id, user_id, 3)], 50)
+    assert board.top(1)[0]['points'] == 10
+
+    newer, older = points_version(), points_version()
+    publish_entries(league_id, [(entry_id, user_id, 30)], older)
+    publish_entries(league_id, [(entry_id, user_id, 20)], newer)
+    assert board.top(1)[0]['points'] == 30
+
+def test_unknown_league_is_not_kept():
+    fresh_backend()
+    db = FakeDB([])
+    db.league_participants.release.set()
+    assert get_leaderboard(db, str(ObjectId())) is None
+    assert not leaderboard._leaderboards
+    assert not leaderboard._loading
+
+def test_least_recently_used_boards_are_evicted():
+    fresh_backend()
+    league_ids = [str(ObjectId()) for _ in range(4)]
+    db = FakeDB([], league_ids)
+    db.league_participants.release.set()
+
+    max_leagues = leaderboard.LEADERBOARD_MAX_LEAGUES
+    leaderboard.LEADERBOARD_MAX_LEAGUES = 3
+    try:
+        for league_id in league_ids[:3]:
+            get_leaderboard(db, league_id)
+        # Touch the oldest so the second one is evicted instead
+        get_leaderboard(db, league_ids[0])
+        get_leaderboard(db, league_ids[3])
+    finally:
+        leaderboard.LEADERBOARD_MAX_LEAGUES = max_leagues
+
+    assert list(leaderboard._leaderboards) == [league_ids[2], league_ids[0], league_ids[3]]
+
+def main():
+    tests = [
+        test_one_load_per_league,
+        test_update_during_load_is_applied,
+        test_published_updates_reach_loaded_board,
+        test_stale_update_is_dropped,
+        test_unknown_league_is_not_kept,
+        test_least_recently_used_boards_are_evicted,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
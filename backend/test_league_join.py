@@ -0,0 +1,221 @@
+"""
+League join test
+Checks that joining a league reserves a seat, debits the entry fee through
+the ledger and releases the seat whenever the entry is not written, and
+that concurrent joins never oversell a league.
+
+Needs mongomock (requirements-bench.txt). mongomock applies an update in
+several steps and has no transactions, so every call runs under one lock,
+as Mongo applies each single-document operation atomically, and postings
+run with no session. Run from the backend directory:
+    python test_league_join.py
+or with pytest.
+"""
+
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import mongomock
+from bson import ObjectId
+
+from app.models.league_participant import LeagueParticipant
+from app.models.ledger_entry import LedgerEntry
+from app.services import ledger
+from app.services.leagues import (
+    ALREADY_JOINED,
+    INSUFFICIENT_BALANCE,
+    JOINED,
+    LEAGUE_FULL,
+    LEAGUE_NOT_FOUND,
+    join_league,
+)
+from app.services.ledger import get_balance, league_account
+from app.utils import indexes
+from app.utils.indexes import require_unique_indexes
+from app.utils.migrations import dedupe_league_participants
+
+class Serialized:
+    """Proxy running every call on a mongomock database or collection under one lock"""
+
+    def __init__(self, target, lock, fail=None):
+        self._target = target
+        self._lock = lock
+        self._fail = fail or {}
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if isinstance(attribute, mongomock.Collection):
+            return Serialized(attribute, self._lock, self._fail)
+        if not callable(attribute):
+            return attribute
+        error = self._fail.get((getattr(self._target, 'name', None), name))
+
+        def call(*args, **kwargs):
+            if error is not None:
+                raise error
+            with self._lock:
+                result = attribute(*args, **kwargs)
+            return Serialized(result, self._lock, self._fail) if isinstance(result, mongomock.Collection) else result
+        return call
+
+def make_db(fail=None):
+    """
+    Database with the unique indexes joins rely on
+
+    Args:
+        fail: Optional {(collection, method): exception} to raise instead
+    """
+    client_db = mongomock.MongoClient().db
+    client_db.league_participants.create_indexes(LeagueParticipant.INDEXES)
+    client_db.ledger_entries.create_indexes(LedgerEntry.INDEXES)
+    return Serialized(client_db, threading.RLock(), fail)
+
+def add_league(db, entry_fee=10, max_teams=5):
+    return db.leagues.insert_one({
+        'name': 'League', 'entry_fee': entry_fee, 'max_teams': max_teams, 'teams_count': 0
+    }).inserted_id
+
+def add_user(db, wallet_paise=1500):
+    return db.users.insert_one({'wallet_paise': wallet_paise, 'wallet_balance': wallet_paise / 100}).inserted_id
+
+def wallet(db, user_id):
+    return db.users.find_one({'_id': user_id})['wallet_paise']
+
+def seats(db, league_id):
+    return db.leagues.find_one({'_id': league_id})['teams_count']
+
+def join(db, league_id, user_id):
+    original = ledger.run_in_transaction
+    ledger.run_in_transaction = lambda callback: callback(None)
+    try:
+        return join_league(db, str(league_id), user_id)
+    finally:
+        ledger.run_in_transaction = original
+
+def test_join_reserves_seat_and_debits_fee():
+    db = make_db()
+    league_id = add_league(db)
+    user_id = add_user(db)
+
+    outcome, entry_id = join(db, league_id, user_id)
+    assert outcome == JOINED
+    assert seats(db, league_id) == 1
+    assert wallet(db, user_id) == 500
+    assert db.users.find_one({'_id': user_id})['wallet_balance'] == 5.0
+    assert get_balance(db, league_account(league_id)) == 1000
+    assert db.league_participants.find_one({'_id': entry_id})['user_id'] == user_id
+
+def test_second_join_releases_its_seat():
+    for entry_fee in (10, 0):
+        db = make_db()
+        league_id = add_league(db, entry_fee)
+        user_id = add_user(db)
+
+        assert join(db, league_id, user_id)[0] == JOINED
+        assert join(db, league_id, user_id) == (ALREADY_JOINED, None)
+        assert seats(db, league_id) == 1
+        assert wallet(db, user_id) == 1500 - entry_fee * 100
+        assert db.league_participants.count_documents({'league_id': league_id}) == 1
+
+def test_insufficient_balance_releases_seat():
+    db = make_db()
+    league_id = add_league(db)
+    user_id = add_user(db, wallet_paise=999)
+
+    assert join(db, league_id, user_id) == (INSUFFICIENT_BALANCE, None)
+    assert seats(db, league_id) == 0
+    assert wallet(db, user_id) == 999
+    assert db.league_participants.count_documents({}) == 0
+
+def test_failed_entry_write_releases_seat():
+    db = make_db(fail={('league_participants', 'insert_one'): RuntimeError('write failed')})
+    league_id = add_league(db, entry_fee=0)
+    try:
+        join(db, league_id, add_user(db))
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError('expected the write error to propagate')
+    assert seats(db, league_id) == 0
+
+def test_full_and_unknown_leagues():
+    db = make_db()
+    league_id = add_league(db, max_teams=1)
+    assert join(db, league_id, add_user(db))[0] == JOINED
+    assert join(db, league_id, add_user(db)) == (LEAGUE_FULL, None)
+    assert join(db, ObjectId(), add_user(db)) == (LEAGUE_NOT_FOUND, None)
+    assert seats(db, league_id) == 1
+
+def test_concurrent_joins_fill_exactly_the_seats():
+    db = make_db()
+    seat_count, user_count = 5, 40
+    league_id = add_league(db, max_teams=seat_count)
+    users = [add_user(db) for _ in range(user_count)]
+
+    start = threading.Barrier(user_count)
+
+    def attempt(user_id):
+        start.wait()
+        return user_id, join_league(db, str(league_id), user_id)[0]
+
+    original = ledger.run_in_transaction
+    ledger.run_in_transaction = lambda callback: callback(None)
+    try:
+        with ThreadPoolExecutor(user_count) as pool:
+            outcomes = dict(pool.map(attempt, users))
+    finally:
+        ledger.run_in_transaction = original
+
+    joined = [user_id for user_id, outcome in outcomes.items() if outcome == JOINED]
+    assert len(joined) == seat_count
+    assert all(outcome in (JOINED, LEAGUE_FULL) for outcome in outcomes.values())
+    assert seats(db, league_id) == seat_count
+    assert db.league_participants.count_documents({'league_id': league_id}) == seat_count
+    assert get_balance(db, league_account(league_id)) == seat_count * 1000
+    # Only the users who got a seat paid
+    for user_id in users:
+        assert wallet(db, user_id) == (500 if user_id in joined else 1500)
+
+def test_entry_index_is_required_and_built_by_migration():
+    db = mongomock.MongoClient().db
+    league_id, user_id = ObjectId(), ObjectId()
+    db.leagues.insert_one({'_id': league_id, 'teams_count': 2, 'entry_fee': 0})
+    db.league_participants.insert_many([{'league_id': league_id, 'user_id': user_id} for _ in range(2)])
+
+    indexes._unique_indexes_present = False
+    try:
+        require_unique_indexes(db, (LeagueParticipant,))
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError('expected the missing index to be reported')
+
+    result = dedupe_league_participants(db)
+    assert result['removed'] == 1
+    assert db.leagues.find_one({'_id': league_id})['teams_count'] == 1
+    require_unique_indexes(db, (LeagueParticipant,))
+    indexes._unique_indexes_present = False
+
+def main():
+    tests = [
+        test_join_reserves_seat_and_debits_fee,
+        test_second_join_releases_its_seat,
+        test_insufficient_balance_releases_seat,
+        test_failed_entry_write_releases_seat,
+        test_full_and_unknown_leagues,
+        test_concurrent_joins_fill_exactly_the_seats,
+        test_entry_index_is_required_and_built_by_migration,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
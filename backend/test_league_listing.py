@@ -0,0 +1,90 @@
+"""
+League listing test
+Walks every listing sort page by page, over leagues that lack the sort
+field or hold null in it, and checks that no league is skipped or repeated
+and that the pages follow Mongo's sort order.
+
+Needs mongomock (requirements-bench.txt). Run from the backend directory:
+    python test_league_listing.py
+or with pytest.
+"""
+
+import random
+import sys
+
+import mongomock
+from bson import ObjectId
+
+from app.services.leagues import LEAGUE_FILTERS, LEAGUE_SORTS, list_leagues
+from app.utils.migrations import backfill_league_sort_fields
+from app.utils.pagination import decode_cursor, encode_cursor
+
+def seed_leagues(db, count=60, seed=7):
+    """Leagues with few distinct values, some missing or null"""
+    rng = random.Random(seed)
+    for index in range(count):
+        league = {'_id': ObjectId(), 'name': f'League {index}', 'popularity': rng.randrange(101)}
+        for field, _ in LEAGUE_SORTS.values():
+            roll = rng.random()
+            if roll < 0.2:
+                continue
+            league[field] = None if roll < 0.3 else rng.choice((0, 10, 25, 100))
+        db.leagues.insert_one(league)
+
+def walk(db, filter_type, sort_by, limit):
+    """Read a listing page by page, through encoded cursors"""
+    seen = []
+    cursor = None
+    while True:
+        leagues, next_cursor = list_leagues(db, filter_type, sort_by, limit, cursor)
+        seen.extend(league['_id'] for league in leagues)
+        if next_cursor is None:
+            return seen
+        cursor = decode_cursor(encode_cursor(next_cursor))
+
+def expected(db, filter_type, sort_by):
+    field, direction = LEAGUE_SORTS[sort_by]
+    query = LEAGUE_FILTERS.get(filter_type, {})
+    return [league['_id'] for league in db.leagues.find(query).sort([(field, direction), ('_id', direction)])]
+
+def test_every_sort_pages_over_missing_fields():
+    db = mongomock.MongoClient().db
+    seed_leagues(db)
+    for sort_by in LEAGUE_SORTS:
+        for filter_type in ('all', 'paid', 'popular'):
+            for limit in (1, 4, 7, 100):
+                pages = walk(db, filter_type, sort_by, limit)
+                assert len(pages) == len(set(pages)), (sort_by, filter_type, limit, 'repeated')
+                assert pages == expected(db, filter_type, sort_by), (sort_by, filter_type, limit)
+
+def test_backfill_orders_missing_as_zero():
+    db = mongomock.MongoClient().db
+    seed_leagues(db)
+    leagues = list(db.leagues.find())
+    backfill_league_sort_fields(db)
+
+    for sort_by, (field, direction) in LEAGUE_SORTS.items():
+        # The old in-memory sort, with a missing field counted as 0
+        descending = direction < 0
+        old = sorted(leagues, key=lambda league: (league.get(field) or 0, league['_id']), reverse=descending)
+        assert walk(db, 'all', sort_by, 7) == [league['_id'] for league in old], sort_by
+
+    assert backfill_league_sort_fields(db) == {field: 0 for field, _ in LEAGUE_SORTS.values()}
+
+def main():
+    tests = [
+        test_every_sort_pages_over_missing_fields,
+        test_backfill_orders_missing_as_zero,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""
+Ledger test
+Checks that postings are applied once per idempotency key, that debits
+never overdraw a wallet, that compaction leaves every balance unchanged,
+and that amounts stay integer paise from the ledger to the wallet.
+
+Needs mongomock (requirements-bench.txt). mongomock has no transactions,
+so postings run with the callback given no session. Run from the backend
+directory:
+    python test_ledger.py
+or with pytest.
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import mongomock
+from bson import ObjectId
+
+from app.models.ledger_entry import LedgerEntry
+from app.services import ledger
+from app.services.ledger import (
+    DEPOSITS_ACCOUNT,
+    InsufficientBalance,
+    build_entries,
+    compact_snapshots,
+    get_balance,
+    post,
+    reconcile_users,
+    to_paise,
+    user_account,
+)
+from app.utils.migrations import backfill_wallet_paise
+
+def make_db():
+    db = mongomock.MongoClient().db
+    db.ledger_entries.create_indexes(LedgerEntry.INDEXES)
+    return db
+
+def add_user(db, wallet_paise=0):
+    return db.users.insert_one({'wallet_paise': wallet_paise, 'wallet_balance': wallet_paise / 100}).inserted_id
+
+def deposit(db, user_id, key, paise):
+    return post(db, key, [(user_account(user_id), paise), (DEPOSITS_ACCOUNT, -paise)], 'Deposit')
+
+def debit(db, user_id, key, paise):
+    return post(db, key, [(user_account(user_id), -paise), ('league:x', paise)], 'Entry fee')
+
+@contextmanager
+def without_transactions():
+    """Run postings with no session, in place of run_in_transaction"""
+    original = ledger.run_in_transaction
+    ledger.run_in_transaction = lambda callback: callback(None)
+    try:
+        yield
+    finally:
+        ledger.run_in_transaction = original
+
+def assert_raises(exception, function, *args):
+    try:
+        function(*args)
+    except exception:
+        return
+    raise AssertionError(f'expected {exception.__name__}')
+
+def test_posting_applied_once_per_key():
+    db = make_db()
+    user_id = add_user(db)
+
+    with without_transactions():
+        assert deposit(db, user_id, 'deposit:1', 1050) is True
+        assert deposit(db, user_id, 'deposit:1', 1050) is False
+        assert deposit(db, user_id, 'deposit:2', 5) is True
+
+    user = db.users.find_one({'_id': user_id})
+    assert user['wallet_paise'] == 1055
+    assert user['wallet_balance'] == 10.55
+    assert db.transactions.count_documents({'user_id': user_id}) == 2
+    assert get_balance(db, user_account(user_id)) == 1055
+    assert reconcile_users(db, [user_id]) == []
+
+def test_debit_never_overdraws():
+    db = make_db()
+    user_id = add_user(db)
+
+    with without_transactions():
+        deposit(db, user_id, 'deposit:1', 1000)
+        assert_raises(InsufficientBalance, debit, db, user_id, 'entry:1', 1001)
+        assert db.users.find_one({'_id': user_id})['wallet_paise'] == 1000
+
+        # The whole balance can be spent, and nothing more
+        assert debit(db, user_id, 'entry:2', 1000) is True
+        assert_raises(InsufficientBalance, debit, db, user_id, 'entry:3', 1)
+
+    user = db.users.find_one({'_id': user_id})
+    assert user['wallet_paise'] == 0
+    assert user['wallet_balance'] == 0
+
+def test_amounts_are_integer_paise():
+    assert_raises(ValueError, build_entries, 'x', [('user:a', 0.1), ('house:deposits', -0.1)], 'Float')
+    assert_raises(ValueError, build_entries, 'x', [('user:a', 10), ('house:deposits', -9)], 'Unbalanced')
+
+    # Summing the float rupees 0.1 + 0.2 drifts, summing paise does not
+    db = make_db()
+    user_id = add_user(db)
+    with without_transactions():
+        deposit(db, user_id, 'deposit:1', to_paise(0.1))
+        deposit(db, user_id, 'deposit:2', to_paise(0.2))
+    assert db.users.find_one({'_id': user_id})['wallet_balance'] == 0.3
+    assert get_balance(db, user_account(user_id)) == 30
+
+def compact_all(db):
+    """Compact every entry posted so far"""
+    # Window boundaries have one-second resolution: let the clock move past
+    # the entries just posted, so later ones fall after the boundary
+    time.sleep(1)
+    return compact_snapshots(db, lag_seconds=0)
+
+def test_compaction_keeps_balances():
+    db = make_db()
+    users = [add_user(db) for _ in range(3)]
+    with without_transactions():
+        for index, user_id in enumerate(users):
+            deposit(db, user_id, f'deposit:{index}', 100 * (index + 1))
+
+    def balances():
+        return [get_balance(db, user_account(user_id)) for user_id in users] + [get_balance(db, DEPOSITS_ACCOUNT)]
+
+    before = balances()
+    assert compact_all(db)['accounts'] == 4
+    assert balances() == before
+    assert db.balance_snapshots.find_one({'_id': DEPOSITS_ACCOUNT})['balance_paise'] == -600
+
+    with without_transactions():
+        debit(db, users[0], 'entry:0', 50)
+    compact_all(db)
+    assert balances() == [50, 200, 300, -600]
+
+    # A run interrupted after folding one account resumes its recorded
+    # window without folding that account twice
+    with without_transactions():
+        debit(db, users[1], 'entry:1', 25)
+    pending = ObjectId.from_datetime(datetime.utcnow() + timedelta(seconds=1))
+    db.ledger_meta.update_one({'_id': ledger.SNAPSHOT_META_ID}, {'$set': {'pending': pending}})
+    db.balance_snapshots.update_one(
+        {'_id': user_account(users[1])},
+        {'$inc': {'balance_paise': -25}, '$set': {'as_of': pending}}
+    )
+    compact_snapshots(db)
+    assert balances() == [50, 175, 300, -600]
+    assert db.balance_snapshots.find_one({'_id': 'league:x'})['as_of'] == pending
+    assert reconcile_users(db, users) == []
+
+def test_backfill_wallet_paise():
+    db = make_db()
+    user_id = db.users.insert_one({'wallet_balance': 0.1 + 0.2}).inserted_id
+    db.ledger_entries.insert_one({'posting_id': 'old', 'account': user_account(user_id), 'amount': 0.3})
+    db.balance_snapshots.insert_one({'_id': user_account(user_id), 'balance': 12.34})
+
+    assert backfill_wallet_paise(db) == {'users': 1, 'entries': 1, 'snapshots': 1}
+    assert db.users.find_one({'_id': user_id})['wallet_paise'] == 30
+    assert db.ledger_entries.find_one({'posting_id': 'old'})['amount_paise'] == 30
+    assert 'amount' not in db.ledger_entries.find_one({'posting_id': 'old'})
+    assert db.balance_snapshots.find_one()['balance_paise'] == 1234
+    assert backfill_wallet_paise(db) == {'users': 0, 'entries': 0, 'snapshots': 0}
+
+def main():
+    tests = [
+        test_posting_applied_once_per_key,
+        test_debit_never_overdraws,
+        test_amounts_are_integer_paise,
+        test_compaction_keeps_balances,
+        test_backfill_wallet_paise,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
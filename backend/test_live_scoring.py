@@ -0,0 +1,93 @@
+"""
+Live scoring test
+Checks that ball-by-ball deltas applied to a live scorer, including
+corrections that take a player back under a milestone, leave every player
+and team total equal to scoring the match from scratch.
+
+Run from the backend directory:
+    python test_live_scoring.py
+or with pytest.
+"""
+
+import random
+import sys
+
+from app.services.live_scoring import LiveMatchScorer
+
+TEAMS = {
+    'team-a': ['bat', 'bowl', 'keep'],
+    'team-b': ['bat', 'other'],
+    'team-c': ['bowl', 'other'],
+    'team-d': ['keep'],
+}
+
+def recomputed(scorer):
+    """A scorer built from the live scorer's current stats"""
+    return LiveMatchScorer(scorer.match_id, TEAMS, scorer.player_stats)
+
+def assert_matches_recompute(scorer):
+    fresh = recomputed(scorer)
+    assert scorer.get_player_points() == fresh.get_player_points()
+    for team_id in TEAMS:
+        assert scorer.get_team_points(team_id) == fresh.get_team_points(team_id), team_id
+
+def test_milestones_crossed_both_ways():
+    scorer = LiveMatchScorer('match', TEAMS, {'bat': {'runs': 49}})
+    for delta, expected in (
+        ({'runs': 1}, 1 + 8),          # 49 -> 50: half century
+        ({'runs': -1}, -1 - 8),        # 50 -> 49: corrected away
+        ({'runs': 1}, 9),
+        ({'runs': 50}, 50 + 16),       # 50 -> 100: century
+        ({'runs': -1}, -1 - 16),       # 100 -> 99
+        ({'runs': -50}, -50 - 8),      # 99 -> 49: under both
+        ({'runs': 60, 'fours': 6}, 60 + 6 + 8 + 16),  # 49 -> 109 at once
+        ({'runs': -60, 'fours': -6}, -60 - 6 - 8 - 16),
+    ):
+        before = scorer.get_team_points('team-a')
+        points_delta, team_ids = scorer.apply_delta('bat', delta)
+        assert points_delta == expected, (delta, points_delta)
+        assert sorted(team_ids.tolist()) == ['team-a', 'team-b']
+        assert scorer.get_team_points('team-a') == before + expected
+        assert scorer.take_changed_teams() == {
+            team_id: scorer.get_team_points(team_id) for team_id in ('team-a', 'team-b')
+        }
+        assert_matches_recompute(scorer)
+    assert scorer.player_stats['bat'] == {'runs': 49, 'fours': 0}
+
+def test_random_deltas_match_recompute():
+    rng = random.Random(4)
+    scorer = LiveMatchScorer('match', TEAMS)
+    for _ in range(400):
+        player_id = rng.choice(['bat', 'bowl', 'keep', 'other'])
+        runs = scorer.player_stats[player_id].get('runs', 0)
+        delta = {'runs': rng.randint(-min(runs, 12), 12)}
+        if rng.random() < 0.2:
+            delta['wickets'] = 1
+        scorer.apply_delta(player_id, delta)
+        assert_matches_recompute(scorer)
+
+def test_delta_without_points_changes_no_team():
+    scorer = LiveMatchScorer('match', TEAMS, {'bat': {'runs': 10}})
+    points_delta, team_ids = scorer.apply_delta('bat', {'runs': 0})
+    assert points_delta == 0 and len(team_ids) == 0
+    assert scorer.take_changed_teams() == {}
+    assert_matches_recompute(scorer)
+
+def main():
+    tests = [
+        test_milestones_crossed_both_ways,
+        test_random_deltas_match_recompute,
+        test_delta_without_points_changes_no_team,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Match completion test
+Checks that a run that crashes after some chunks resumes after its
+checkpoint, scoring every team once and with the statistics the first run
+stored, and that a run finding the job leased by another is turned away
+until the lease expires.
+
+Needs mongomock (requirements-bench.txt); chunks are scored in a single
+worker process. Run from the backend directory:
+    python test_match_completion.py
+or with pytest.
+"""
+
+import sys
+from datetime import datetime, timedelta
+
+import mongomock
+from bson import ObjectId
+
+from app.services.match_completion import (
+    COMPLETED,
+    JOB_BUSY,
+    JOB_LEASE_SECONDS,
+    complete_match,
+)
+
+TEAMS = 7
+CHUNK_SIZE = 2
+
+def make_stats(runs=10):
+    return {f'player-{index}': {'runs': runs * index, 'wickets': index % 3} for index in range(6)}
+
+def make_db():
+    """Database with a live match and its teams, with fixed IDs"""
+    db = mongomock.MongoClient().db
+    match_id = ObjectId('65a1b2c3d4e5f60718290000')
+    db.matches.insert_one({'_id': match_id, 'status': 'live'})
+    db.user_matches.insert_many([
+        {
+            '_id': ObjectId(f'65a1b2c3d4e5f6071829{index + 1:04d}'),
+            'match_id': match_id,
+            'players': [{'player_id': f'player-{player}'} for player in range(index % 6 + 1)],
+        }
+        for index in range(TEAMS)
+    ])
+    return db, match_id
+
+def points(db):
+    return {team['_id']: team.get('points') for team in db.user_matches.find({}, {'points': 1})}
+
+def expected_points(match_stats):
+    db, match_id = make_db()
+    assert complete_match(db, match_id, match_stats, CHUNK_SIZE, workers=1) == (COMPLETED, TEAMS)
+    return points(db)
+
+class Crash(Exception):
+    pass
+
+def crash_after_writes(db, writes):
+    """Make user_matches.bulk_write raise once it has written `writes` chunks"""
+    collection = db.user_matches
+    bulk_write = collection.bulk_write
+    calls = []
+
+    def failing(*args, **kwargs):
+        if len(calls) == writes:
+            raise Crash()
+        calls.append(1)
+        return bulk_write(*args, **kwargs)
+
+    collection.bulk_write = failing
+    return lambda: setattr(collection, 'bulk_write', bulk_write)
+
+def expire_lease(db, match_id):
+    db.scoring_jobs.update_one({'_id': match_id}, {'$set': {'lease_until': datetime.utcnow() - timedelta(seconds=1)}})
+
+def test_crashed_run_resumes_after_checkpoint():
+    db, match_id = make_db()
+    restore = crash_after_writes(db, 2)
+    try:
+        complete_match(db, match_id, make_stats(), CHUNK_SIZE, workers=1)
+    except Crash:
+        pass
+    else:
+        raise AssertionError('expected the run to crash')
+    restore()
+
+    job = db.scoring_jobs.find_one({'_id': match_id})
+    assert job['status'] == 'running'
+    assert job['teams_scored'] == 2 * CHUNK_SIZE
+    team_ids = sorted(points(db))
+    assert job['checkpoint'] == team_ids[2 * CHUNK_SIZE - 1]
+    assert db.matches.find_one({'_id': match_id})['status'] == 'live'
+
+    # Mark a checkpointed team: a resumed run must not rescore it
+    db.user_matches.update_one({'_id': team_ids[0]}, {'$set': {'points': -1}})
+
+    # The lease still holds the job for the crashed run
+    assert complete_match(db, match_id, make_stats(), CHUNK_SIZE, workers=1) == (JOB_BUSY, 0)
+
+    # Once it expires, the job resumes after the checkpoint, with the
+    # statistics the first run stored rather than the ones given now
+    expire_lease(db, match_id)
+    assert complete_match(db, match_id, make_stats(runs=99), CHUNK_SIZE, workers=1) == (COMPLETED, TEAMS - 2 * CHUNK_SIZE)
+
+    expected = expected_points(make_stats())
+    expected[team_ids[0]] = -1
+    assert points(db) == expected
+    job = db.scoring_jobs.find_one({'_id': match_id})
+    assert (job['status'], job['teams_scored'], job['checkpoint']) == (COMPLETED, TEAMS, team_ids[-1])
+    assert db.matches.find_one({'_id': match_id})['status'] == 'completed'
+
+def test_leased_job_is_not_taken():
+    db, match_id = make_db()
+    lease_until = datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)
+    db.scoring_jobs.insert_one({
+        '_id': match_id, 'status': 'running', 'lease_until': lease_until, 'checkpoint': None, 'teams_scored': 0
+    })
+
+    assert complete_match(db, match_id, make_stats(), CHUNK_SIZE, workers=1) == (JOB_BUSY, 0)
+    assert set(points(db).values()) == {None}
+    job = db.scoring_jobs.find_one({'_id': match_id})
+    assert job['status'] == 'running' and abs(job['lease_until'] - lease_until) < timedelta(seconds=1)
+    assert db.matches.find_one({'_id': match_id})['status'] == 'live'
+
+    expire_lease(db, match_id)
+    assert complete_match(db, match_id, make_stats(), CHUNK_SIZE, workers=1) == (COMPLETED, TEAMS)
+    assert points(db) == expected_points(make_stats())
+
+    # A finished job is reported as completed, not busy, and not rerun
+    db.matches.update_one({'_id': match_id}, {'$set': {'status': 'live'}})
+    assert complete_match(db, match_id, make_stats(), CHUNK_SIZE, workers=1) == (COMPLETED, 0)
+
+def main():
+    tests = [
+        test_crashed_run_resumes_after_checkpoint,
+        test_leased_job_is_not_taken,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
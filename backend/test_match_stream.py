@@ -0,0 +1,181 @@
+"""
+Live match stream test
+Checks fan-out, coalescing and resumption of the match event stream, with
+LocalPubSub standing in for the Redis pub/sub backend.
+
+Run from the backend directory:
+    python test_match_stream.py
+or with pytest.
+"""
+
+import asyncio
+import json
+import sys
+
+from app.services.match_stream import MatchStreamHub, publish_match_update
+from app.utils.pubsub import LocalPubSub, set_pubsub_backend
+
+MATCH_ID = '000000000000000000000001'
+
+def parse(frame):
+    """Split an event frame into (sequence number, event, data)"""
+    fields = dict(line.split(': ', 1) for line in frame.decode().strip().split('\n'))
+    return int(fields['id'].split('-')[1]), fields['event'], json.loads(fields['data'])
+
+async def collect(subscription, count):
+    return [parse(await subscription.__anext__()) for _ in range(count)]
+
+async def settle():
+    # Let call_soon_threadsafe handovers and woken subscribers run
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+def run_with_hub(scenario, capacity=256):
+    async def run():
+        pubsub = LocalPubSub()
+        set_pubsub_backend(pubsub)
+        hub = MatchStreamHub(capacity=capacity, heartbeat=3600)
+        hub.start(pubsub)
+        try:
+            return await scenario(hub)
+        finally:
+            hub.stop()
+            set_pubsub_backend(LocalPubSub())
+    return asyncio.run(run())
+
+def test_fan_out_to_every_subscriber():
+    async def scenario(hub):
+        subscriptions = [hub.subscribe(MATCH_ID) for _ in range(50)]
+        for subscription in subscriptions:
+            assert (await collect(subscription, 1))[0][1] == 'snapshot'
+        assert hub.channel(MATCH_ID).subscribers == 50
+
+        publish_match_update(MATCH_ID, score={'A': '14/0'}, player_points={'p1': 4})
+        await settle()
+        for subscription in subscriptions:
+            assert await collect(subscription, 1) == [
+                (1, 'update', {'score': {'A': '14/0'}, 'player_points': {'p1': 4.0}})
+            ]
+            await subscription.aclose()
+        assert hub.channel(MATCH_ID).subscribers == 0
+    run_with_hub(scenario)
+
+def test_lagging_subscriber_gets_merged_update():
+    async def scenario(hub):
+        subscription = hub.subscribe(MATCH_ID)
+        await collect(subscription, 1)
+
+        publish_match_update(MATCH_ID, player_points={'p1': 4, 'p2': 1})
+        publish_match_update(MATCH_ID, score={'A': '20/1'}, status='live')
+        publish_match_update(MATCH_ID, player_points={'p1': 6})
+        await settle()
+        assert await collect(subscription, 1) == [
+            (3, 'update', {'score': {'A': '20/1'}, 'status': 'live', 'player_points': {'p1': 10.0, 'p2': 1.0}})
+        ]
+        await subscription.aclose()
+    run_with_hub(scenario)
+
+def test_overrun_subscriber_gets_snapshot():
+    async def scenario(hub):
+        subscription = hub.subscribe(MATCH_ID)
+        await collect(subscription, 1)
+
+        for _ in range(10):
+            publish_match_update(MATCH_ID, player_points={'p1': 1})
+        await settle()
+        seq, event, data = (await collect(subscription, 1))[0]
+        assert (seq, event) == (10, 'snapshot')
+        assert data['player_points'] == {'p1': 10.0}
+        await subscription.aclose()
+    run_with_hub(scenario, capacity=4)
+
+def test_resume_from_last_event_id():
+    async def scenario(hub):
+        for points in (1, 2, 3):
+            publish_match_update(MATCH_ID, player_points={'p1': points})
+        await settle()
+
+        epoch = hub.channel(MATCH_ID).epoch.decode()
+        resumed = hub.subscribe(MATCH_ID, f'{epoch}-1')
+        assert await collect(resumed, 1) == [(3, 'update', {'player_points': {'p1': 5.0}})]
+        await resumed.aclose()
+
+        # A cursor from before a restart is not trusted
+        stale = hub.subscribe(MATCH_ID, f'{epoch}-99')
+        assert (await collect(stale, 1))[0][:2] == (3, 'snapshot')
+        await stale.aclose()
+    run_with_hub(scenario)
+
+def test_event_id_from_another_node_gets_snapshot():
+    async def scenario(hub):
+        for points in (1, 2, 3):
+            publish_match_update(MATCH_ID, player_points={'p1': points})
+        await settle()
+
+        # Same sequence number, issued by another node's channel
+        other = hub.subscribe(MATCH_ID, 'abcdef012345-1')
+        seq, event, data = (await collect(other, 1))[0]
+        assert (seq, event) == (3, 'snapshot')
+        assert data['player_points'] == {'p1': 6.0}
+        await other.aclose()
+    run_with_hub(scenario)
+
+def test_snapshot_seeded_from_stored_points():
+    async def scenario(hub):
+        hub.channel(MATCH_ID).seed(status='live', player_points={'p1': 30, 'p2': 12.5})
+        publish_match_update(MATCH_ID, player_points={'p1': 4})
+        await settle()
+
+        subscription = hub.subscribe(MATCH_ID)
+        seq, event, data = (await collect(subscription, 1))[0]
+        assert event == 'snapshot'
+        assert data['status'] == 'live'
+        assert data['player_points'] == {'p1': 34.0, 'p2': 12.5}
+        await subscription.aclose()
+    run_with_hub(scenario)
+
+def test_update_during_seed_is_kept_once():
+    async def scenario(hub):
+        channel = hub.channel(MATCH_ID)
+        # Published while a request reads the database, before the seed
+        publish_match_update(MATCH_ID, player_points={'p1': 4, 'p2': 6}, player_totals={'p1': 34, 'p2': 18.5})
+        await settle()
+        # The read missed p1's delta but already saw p2's
+        channel.seed(status='live', player_points={'p1': 30, 'p2': 18.5, 'p3': 7})
+
+        subscription = hub.subscribe(MATCH_ID)
+        seq, event, data = (await collect(subscription, 1))[0]
+        assert event == 'snapshot'
+        assert data['player_points'] == {'p1': 34.0, 'p2': 18.5, 'p3': 7.0}
+
+        # Totals keep moving with later updates
+        publish_match_update(MATCH_ID, player_points={'p1': 2}, player_totals={'p1': 36})
+        await settle()
+        assert await collect(subscription, 1) == [(seq + 1, 'update', {'player_points': {'p1': 2.0}})]
+        assert channel.state['player_points']['p1'] == 36.0
+        await subscription.aclose()
+    run_with_hub(scenario)
+
+def main():
+    print("\n📡 TESTING MATCH STREAM")
+    tests = [
+        test_fan_out_to_every_subscriber,
+        test_lagging_subscriber_gets_merged_update,
+        test_overrun_subscriber_gets_snapshot,
+        test_resume_from_last_event_id,
+        test_event_id_from_another_node_gets_snapshot,
+        test_snapshot_seeded_from_stored_points,
+        test_update_during_seed_is_kept_once,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
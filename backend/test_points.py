@@ -0,0 +1,95 @@
+"""
+Points calculation test
+Checks that the single-player and per-team helpers score exactly like the
+batch path, on randomized stats.
+
+Run from the backend directory:
+    python test_points.py
+or with pytest.
+"""
+
+import random
+import sys
+
+from app.services.points import (
+    build_stats_matrix,
+    build_team_matrix,
+    calculate_batch_player_points,
+    calculate_batch_team_points,
+    calculate_player_points,
+    calculate_points_delta,
+    calculate_team_points,
+)
+from app.services.scoring_rules import get_default_rule_set
+
+def random_stats(rng, fractional=False):
+    """Stats for one player; some fields left out, optionally fractional"""
+    stats = {}
+    for field in get_default_rule_set().fields:
+        if rng.random() < 0.3:
+            continue
+        stats[field] = rng.randrange(0, 130) if field == 'runs' else rng.randrange(0, 6)
+        if fractional and rng.random() < 0.3:
+            stats[field] += rng.choice((0.1, 0.25, 0.3))
+    return stats
+
+def batch_points(players_stats):
+    return calculate_batch_player_points(build_stats_matrix(players_stats)).tolist()
+
+def test_player_points_match_batch():
+    rng = random.Random(1)
+    for fractional in (False, True):
+        for _ in range(500):
+            stats = random_stats(rng, fractional)
+            scalar = calculate_player_points(stats)
+            batch = batch_points([stats])[0]
+            assert scalar == batch, (stats, scalar, batch)
+            assert type(scalar) is type(batch), (stats, scalar, batch)
+
+def test_milestone_boundaries_match_batch():
+    for runs in (0, 49, 50, 51, 99, 100, 101):
+        stats = {'runs': runs}
+        assert calculate_player_points(stats) == batch_points([stats])[0]
+    assert calculate_player_points({}) == 0
+
+def test_team_points_match_batch():
+    rng = random.Random(2)
+    for fractional in (False, True):
+        for _ in range(100):
+            players = [random_stats(rng, fractional) for _ in range(11)]
+            team = {'players': [{'stats': stats} for stats in players]}
+            batch = calculate_batch_team_points(
+                calculate_batch_player_points(build_stats_matrix(players)),
+                build_team_matrix([list(range(11))], {index: index for index in range(11)})
+            )[0].item()
+            assert calculate_team_points(team) == batch
+    assert calculate_team_points({'players': []}) == 0
+
+def test_points_delta_matches_batch():
+    rng = random.Random(3)
+    for _ in range(300):
+        stats = random_stats(rng)
+        delta = {'runs': rng.randrange(-10, 11), 'wickets': rng.choice((0, 1, -1))}
+        updated, points_delta = calculate_points_delta(stats, delta)
+        before, after = batch_points([stats, updated])
+        assert points_delta == after - before
+
+def main():
+    tests = [
+        test_player_points_match_batch,
+        test_milestone_boundaries_match_batch,
+        test_team_points_match_batch,
+        test_points_delta_matches_batch,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
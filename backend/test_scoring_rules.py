@@ -0,0 +1,143 @@
+"""
+Scoring rules test
+Checks that the bundled T20 rule set scores exactly like the fixed formula
+it replaced, that per-category points add up to the totals, and that a
+pinned rule set version is the one used while unpinned references follow
+the latest version.
+
+Needs mongomock (requirements-bench.txt). Run from the backend directory:
+    python test_scoring_rules.py
+or with pytest.
+"""
+
+import random
+import sys
+
+import mongomock
+import numpy as np
+
+from app.services import scoring_rules
+from app.services.points import build_stats_matrix, calculate_player_points
+from app.services.scoring_rules import get_default_rule_set, get_rule_set, resolve_rule_set
+
+def baseline_points(stats):
+    """The fixed formula scoring used before rule sets, in its order of additions"""
+    points = 0
+    points = points + stats.get('runs', 0) * 1
+    points = points + stats.get('fours', 0) * 1
+    points = points + stats.get('sixes', 0) * 2
+    points = points + (stats.get('runs', 0) >= 50) * 8
+    points = points + (stats.get('runs', 0) >= 100) * 16
+    points = points + stats.get('wickets', 0) * 25
+    points = points + stats.get('maidens', 0) * 12
+    points = points + stats.get('catches', 0) * 8
+    points = points + stats.get('stumpings', 0) * 12
+    points = points + stats.get('run_outs', 0) * 6
+    return points
+
+def random_stats(rng, fractional=False):
+    stats = {}
+    for field in ('runs', 'fours', 'sixes', 'wickets', 'maidens', 'catches', 'stumpings', 'run_outs'):
+        if rng.random() < 0.3:
+            continue
+        stats[field] = rng.randrange(0, 130) if field == 'runs' else rng.randrange(0, 6)
+        if fractional and rng.random() < 0.3:
+            stats[field] += rng.choice((0.1, 0.25, 0.3))
+    return stats
+
+def test_default_rule_set_matches_baseline():
+    rules = get_default_rule_set()
+    assert rules.key == ('t20', 1)
+
+    rng = random.Random(1)
+    for fractional in (False, True):
+        players = [random_stats(rng, fractional) for _ in range(500)]
+        players += [{'runs': runs} for runs in (0, 49, 50, 51, 99, 100, 101)] + [{}]
+        batch = rules.evaluate(build_stats_matrix(players, rules)).tolist()
+        for stats, total in zip(players, batch):
+            expected = baseline_points(stats)
+            assert total == expected, (stats, total, expected)
+            assert rules.evaluate_row(stats) == expected, stats
+            assert calculate_player_points(stats) == expected, stats
+
+    assert baseline_points({'runs': 100, 'fours': 10, 'sixes': 4}) == 142
+    assert rules.evaluate_row({'runs': 100, 'fours': 10, 'sixes': 4}) == 142
+
+def test_categories_add_up_to_totals():
+    rules = get_default_rule_set()
+    rng = random.Random(2)
+    matrix = build_stats_matrix([random_stats(rng) for _ in range(200)], rules)
+    categories = rules.evaluate_categories(matrix)
+    assert categories.shape == (200, len(rules.categories))
+    assert rules.categories == ('batting', 'bowling', 'fielding')
+    assert np.array_equal(categories.sum(axis=1), rules.evaluate(matrix))
+
+    batting = rules.categories.index('batting')
+    assert rules.evaluate_categories(build_stats_matrix([{'runs': 50, 'wickets': 1}], rules))[0, batting] == 58
+
+def schema(name, version, run_points):
+    return {
+        'name': name,
+        'version': version,
+        'stats': [{'field': 'runs', 'category': 'batting', 'points': run_points}],
+        'milestones': [],
+    }
+
+def test_pinned_version_is_used():
+    name = 'test-pinned'
+    db = mongomock.MongoClient().db
+    db.scoring_rules.insert_many([schema(name, 1, 1), schema(name, 2, 2)])
+    try:
+        assert get_rule_set(name, 1, db=db).evaluate_row({'runs': 10}) == 10
+        assert get_rule_set(name, 2, db=db).evaluate_row({'runs': 10}) == 20
+        assert get_rule_set(name, db=db).version == 2
+
+        assert resolve_rule_set({'scoring_rules': {'name': name, 'version': 1}}, db).key == (name, 1)
+        assert resolve_rule_set({'scoring_rules': {'name': name}}, db).key == (name, 2)
+        assert resolve_rule_set({'scoring_rules': name}, db).key == (name, 2)
+        assert resolve_rule_set({}, db) is get_default_rule_set()
+
+        # A new version reaches unpinned references once the cached lookup
+        # expires; pinned ones keep theirs
+        db.scoring_rules.insert_one(schema(name, 3, 3))
+        assert resolve_rule_set({'scoring_rules': name}, db).version == 2
+        scoring_rules._latest_versions.pop(name)
+        assert resolve_rule_set({'scoring_rules': name}, db).version == 3
+        assert resolve_rule_set({'scoring_rules': {'name': name, 'version': 1}}, db).version == 1
+
+        for version in (4, None):
+            try:
+                get_rule_set('test-unknown', version, db=db)
+            except ValueError:
+                continue
+            raise AssertionError(f'expected ValueError for version {version}')
+    finally:
+        scoring_rules._latest_versions.pop(name, None)
+
+def test_bundled_file_is_pinned_too():
+    assert get_rule_set('t20', 1) is get_default_rule_set()
+    try:
+        get_rule_set('t20', 2)
+    except ValueError:
+        return
+    raise AssertionError('expected ValueError for a version the bundled file lacks')
+
+def main():
+    tests = [
+        test_default_rule_set_matches_baseline,
+        test_categories_add_up_to_totals,
+        test_pinned_version_is_used,
+        test_bundled_file_is_pinned_too,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+Prize settlement test
+Checks the prize ladder and tie splitting, which work in integer paise, and
+that a league is only settled once its match is completed, exactly once,
+even when a chunk's transaction aborts.
+
+The settle_league tests need mongomock (requirements-bench.txt), which has
+no transactions, so chunks run with no session. Run from the backend
+directory:
+    python test_settlement.py
+or with pytest.
+"""
+
+import sys
+from contextlib import contextmanager
+
+import mongomock
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+from app.models.transaction import Transaction
+from app.services import settlement
+from app.services.settlement import (
+    ALREADY_SETTLED,
+    MATCH_NOT_COMPLETED,
+    SETTLED,
+    build_prize_ladder,
+    settle_league,
+    split_tied_prize,
+    to_paise,
+    to_rupees,
+)
+from app.utils.cache import get_cache_backend
+
+def test_ladder_in_paise():
+    ladder = build_prize_ladder([
+        {'rank_from': 1, 'rank_to': 1, 'amount': 1.15},
+        {'rank_from': 2, 'rank_to': 3, 'amount': 0.29},
+        {'rank_from': 4, 'rank_to': 4, 'amount': '4.35'},
+    ])
+    assert ladder == [115, 29, 29, 435]
+    assert build_prize_ladder([]) == []
+
+def test_untied_rank_gets_its_full_prize():
+    ladder = build_prize_ladder([
+        {'rank_from': 1, 'rank_to': 1, 'amount': 1.15},
+        {'rank_from': 2, 'rank_to': 2, 'amount': 0.29},
+        {'rank_from': 3, 'rank_to': 3, 'amount': 4.35},
+    ])
+    assert split_tied_prize(ladder, 1, 1) == [115]
+    assert split_tied_prize(ladder, 2, 1) == [29]
+    assert split_tied_prize(ladder, 3, 1) == [435]
+    assert to_rupees(split_tied_prize(ladder, 1, 1)[0]) == 1.15
+
+def test_tie_pays_the_whole_pool_deterministically():
+    ladder = build_prize_ladder([{'rank_from': 1, 'rank_to': 1, 'amount': 100}])
+    # Rank 1 pooled with ranks 2 and 3, which pay nothing
+    shares = split_tied_prize(ladder, 1, 3)
+    assert shares == [3334, 3333, 3333]
+    assert sum(shares) == 10000
+    assert split_tied_prize(ladder, 1, 3) == shares
+
+def test_tie_past_the_ladder():
+    ladder = build_prize_ladder([{'rank_from': 1, 'rank_to': 2, 'amount': 10}])
+    assert split_tied_prize(ladder, 2, 4) == [250, 250, 250, 250]
+    assert split_tied_prize(ladder, 3, 2) == [0, 0]
+
+def test_to_paise_rounds_half_up():
+    assert to_paise(0.1 + 0.2) == 30
+    assert to_paise(2.675) == 268
+    assert to_paise(10) == 1000
+
+def seed_league(db, match_status='completed', winners=5):
+    """A league paying ranks 1-3, its match and `winners` entries with distinct points"""
+    match_id = db.matches.insert_one({'status': match_status}).inserted_id
+    league_id = db.leagues.insert_one({
+        'name': 'League', 'match_id': match_id,
+        'prize_table': [{'rank_from': 1, 'rank_to': 1, 'amount': 50}, {'rank_from': 2, 'rank_to': 3, 'amount': 10.5}],
+    }).inserted_id
+    users = [db.users.insert_one({'wallet_paise': 0, 'wallet_balance': 0.0}).inserted_id for _ in range(winners)]
+    for index, user_id in enumerate(users):
+        db.league_participants.insert_one({'league_id': league_id, 'user_id': user_id, 'points': 100 - index})
+    return match_id, league_id, users
+
+def make_db():
+    db = mongomock.MongoClient().db
+    db.transactions.create_indexes(Transaction.INDEXES)
+    return db
+
+def wallets(db, users):
+    return [db.users.find_one({'_id': user_id})['wallet_paise'] for user_id in users]
+
+@contextmanager
+def without_transactions(failures=()):
+    """Run chunks with no session, raising the given errors on the first attempts"""
+    failures = list(failures)
+
+    def run(callback):
+        if failures:
+            raise failures.pop(0)
+        return callback(None)
+
+    original = settlement.run_in_transaction
+    settlement.run_in_transaction = run
+    try:
+        yield
+    finally:
+        settlement.run_in_transaction = original
+
+def test_settles_only_completed_matches():
+    db = make_db()
+    match_id, league_id, users = seed_league(db, match_status='live')
+    with without_transactions():
+        assert settle_league(db, league_id) == (MATCH_NOT_COMPLETED, None)
+        assert wallets(db, users) == [0] * 5
+        assert 'status' not in db.leagues.find_one({'_id': league_id})
+
+        db.leagues.update_one({'_id': league_id}, {'$unset': {'match_id': ''}})
+        assert settle_league(db, league_id) == (MATCH_NOT_COMPLETED, None)
+
+def test_rerun_pays_each_winner_once():
+    db = make_db()
+    match_id, league_id, users = seed_league(db)
+    generation = int(get_cache_backend().get('gen:leagues') or 0)
+
+    with without_transactions():
+        # An interrupted run that paid only the winner
+        db.leagues.update_one({'_id': league_id}, {'$set': {'status': 'settling'}})
+        league = db.leagues.find_one({'_id': league_id})
+        first = next(settlement.iter_winners(db, league_id, build_prize_ladder(league['prize_table'])))
+        settlement._apply_chunk(db, league, [first])
+
+        outcome, result = settle_league(db, league_id, chunk_size=2)
+        assert outcome == SETTLED
+        assert result == {'paid_entries': 2, 'paid_amount': 21.0}
+        assert wallets(db, users) == [5000, 1050, 1050, 0, 0]
+        assert db.leagues.find_one({'_id': league_id})['status'] == 'settled'
+        assert int(get_cache_backend().get('gen:leagues') or 0) > generation
+
+        assert settle_league(db, league_id) == (ALREADY_SETTLED, None)
+        assert wallets(db, users) == [5000, 1050, 1050, 0, 0]
+        assert db.transactions.count_documents({'league_id': league_id}) == 3
+
+def test_conflicting_chunk_is_retried():
+    db = make_db()
+    match_id, league_id, users = seed_league(db)
+    conflict = OperationFailure('Write conflict', 112, {'errorLabels': ['TransientTransactionError']})
+
+    with without_transactions([conflict, conflict]):
+        outcome, result = settle_league(db, league_id)
+    assert outcome == SETTLED
+    assert result['paid_entries'] == 3
+    assert wallets(db, users) == [5000, 1050, 1050, 0, 0]
+
+    # Errors that a retry cannot resolve are raised
+    db = make_db()
+    match_id, league_id, users = seed_league(db)
+    with without_transactions([OperationFailure('Unauthorized', 13)]):
+        try:
+            settle_league(db, league_id)
+        except OperationFailure:
+            pass
+        else:
+            raise AssertionError('expected the error to be raised')
+    assert wallets(db, users) == [0] * 5
+
+def main():
+    tests = [
+        test_ladder_in_paise,
+        test_untied_rank_gets_its_full_prize,
+        test_tie_pays_the_whole_pool_deterministically,
+        test_tie_past_the_ladder,
+        test_to_paise_rounds_half_up,
+        test_settles_only_completed_matches,
+        test_rerun_pays_each_winner_once,
+        test_conflicting_chunk_is_retried,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
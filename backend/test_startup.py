@@ -0,0 +1,111 @@
+"""
+Startup budget test
+Checks how long `create_app()` takes to import and start, with the database
+connected lazily and unreachable, so that cold starts do not regress.
+
+Run from the backend directory:
+    python test_startup.py
+or with pytest. Budgets (milliseconds) can be tuned per machine with
+STARTUP_IMPORT_BUDGET_MS and STARTUP_CREATE_APP_BUDGET_MS.
+"""
+
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_BUDGET_MS = float(os.environ.get('STARTUP_IMPORT_BUDGET_MS', 1500))
+CREATE_APP_BUDGET_MS = float(os.environ.get('STARTUP_CREATE_APP_BUDGET_MS', 250))
+RUNS = 3
+
+# Imports the app, starts it and probes it with MongoDB unreachable.
+# The marker separates the interpreter's own imports from the app's.
+STARTUP_SCRIPT = """
+import sys, time
+sys.stderr.write('--startup--\\n')
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+client = app.test_client()
+print(round((created - imported) * 1000, 3))
+print(client.get('/api/health/live').status_code)
+print(client.get('/api/health/ready').status_code)
+"""
+
+def run_startup():
+    """
+    Start the app once in a fresh interpreter
+
+    Returns:
+        Tuple of (import ms, create_app ms, live status, ready status,
+        list of (cumulative ms, module) for top-level imports)
+    """
+    env = dict(
+        os.environ,
+        DB_LAZY_CONNECT='1',
+        MONGO_URI='mongodb://127.0.0.1:1/',
+        READINESS_TIMEOUT='0.5',
+        ENV_FILE=os.devnull,
+    )
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    modules = []
+    lines = result.stderr.split('--startup--\n', 1)[1].splitlines()
+    for line in lines:
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Top-level imports only; nested ones are included in their cumulative time
+        if not name[1:].startswith(' '):
+            modules.append((int(cumulative) / 1000, name.strip()))
+
+    create_ms, live, ready = result.stdout.split()
+    return sum(ms for ms, _ in modules), float(create_ms), int(live), int(ready), modules
+
+def measure():
+    """Best of RUNS startups, to keep scheduling noise out of the budget"""
+    runs = [run_startup() for _ in range(RUNS)]
+    return min(runs, key=lambda run: run[0] + run[1])
+
+def test_startup_budget():
+    import_ms, create_ms, _, _, modules = measure()
+    slowest = ', '.join(f'{name} {ms:.0f} ms' for ms, name in sorted(modules, reverse=True)[:5])
+    assert import_ms <= IMPORT_BUDGET_MS, \
+        f'Import took {import_ms:.0f} ms, budget {IMPORT_BUDGET_MS:.0f} ms (slowest: {slowest})'
+    assert create_ms <= CREATE_APP_BUDGET_MS, \
+        f'create_app took {create_ms:.0f} ms, budget {CREATE_APP_BUDGET_MS:.0f} ms'
+
+def test_starts_without_database():
+    _, _, live, ready, _ = run_startup()
+    assert live == 200
+    assert ready == 503
+
+def main():
+    print("\n🚀 TESTING STARTUP")
+    import_ms, create_ms, live, ready, modules = measure()
+
+    print(f"Imports:    {import_ms:8.1f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)")
+    print(f"create_app: {create_ms:8.1f} ms (budget {CREATE_APP_BUDGET_MS:.0f} ms)")
+    for ms, name in sorted(modules, reverse=True)[:10]:
+        print(f"  {ms:8.1f} ms  {name}")
+    print(f"Liveness with MongoDB down:  {live} (expected 200)")
+    print(f"Readiness with MongoDB down: {ready} (expected 503)")
+
+    failed = (
+        import_ms > IMPORT_BUDGET_MS
+        or create_ms > CREATE_APP_BUDGET_MS
+        or live != 200
+        or ready != 503
+    )
+    print("\n❌ Startup budget exceeded" if failed else "\n✅ Startup within budget")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
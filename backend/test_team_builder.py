@@ -0,0 +1,118 @@
+"""
+Team builder test
+Checks lineup validation against a match squad and the canonical lineup hash.
+
+Run from the backend directory:
+    python test_team_builder.py
+or with pytest.
+"""
+
+import sys
+
+from app.services.team_builder import (
+    PlayerTable,
+    lineup_hash,
+    VALID,
+    WRONG_TEAM_SIZE,
+    UNKNOWN_PLAYER,
+    DUPLICATE_PLAYER,
+    OVER_CREDIT_CAP,
+    ROLE_LIMIT,
+    SIDE_LIMIT,
+)
+
+# Per side: 2 wicket-keepers, 5 batters, 3 all-rounders, 5 bowlers
+SIDE_ROLES = ['wk'] * 2 + ['bat'] * 5 + ['ar'] * 3 + ['bowl'] * 5
+
+def build_squad(credits=9):
+    return [
+        {'player_id': f'{side}-{role}-{index}', 'role': role, 'team': side, 'credits': credits}
+        for side in ('A', 'B')
+        for index, role in enumerate(SIDE_ROLES)
+    ]
+
+def pick(side, role, count, skip=0):
+    """The first `count` players of a side with a role, after `skip` of them"""
+    return [
+        f'{side}-{role}-{index}' for index, player_role in enumerate(SIDE_ROLES) if player_role == role
+    ][skip:skip + count]
+
+def valid_lineup():
+    # 1 wk, 4 bat, 2 ar, 4 bowl; 6 from A and 5 from B
+    return pick('A', 'wk', 1) + pick('A', 'bat', 2) + pick('B', 'bat', 2) + pick('A', 'ar', 1) \
+        + pick('B', 'ar', 1) + pick('A', 'bowl', 2) + pick('B', 'bowl', 2)
+
+def test_valid_lineup():
+    table = PlayerTable('m1', build_squad())
+    assert table.validate(valid_lineup()) == VALID
+
+def test_size_unknown_and_duplicate_players():
+    table = PlayerTable('m1', build_squad())
+    lineup = valid_lineup()
+    assert table.validate(lineup[:10]) == WRONG_TEAM_SIZE
+    assert table.validate(lineup + pick('B', 'bat', 1, skip=2)) == WRONG_TEAM_SIZE
+    assert table.validate(lineup[:10] + ['nobody']) == UNKNOWN_PLAYER
+    assert table.validate(lineup[:10] + lineup[:1]) == DUPLICATE_PLAYER
+
+def test_credit_cap():
+    # 11 players at 9.1 credits is 100.1, exactly 9.0 stays at 99
+    assert PlayerTable('m1', build_squad(credits=9.1)).validate(valid_lineup()) == OVER_CREDIT_CAP
+    squad = build_squad(credits=9)
+    squad[0]['credits'] = 10  # A-wk-0, in the lineup: exactly 100
+    assert PlayerTable('m1', squad).validate(valid_lineup()) == VALID
+
+def test_role_limits():
+    table = PlayerTable('m1', build_squad())
+    # No wicket-keeper: swap A-wk-0 for a batter
+    no_keeper = valid_lineup()[1:] + pick('B', 'bat', 1, skip=2)
+    assert table.validate(no_keeper) == ROLE_LIMIT
+    # 7 batters
+    too_many_batters = pick('A', 'wk', 1) + pick('A', 'bat', 3) + pick('B', 'bat', 4) \
+        + pick('B', 'ar', 1) + pick('A', 'bowl', 2)
+    assert table.validate(too_many_batters) == ROLE_LIMIT
+
+def test_side_limit():
+    table = PlayerTable('m1', build_squad())
+    # 8 from side A
+    lineup = pick('A', 'wk', 1) + pick('A', 'bat', 3) + pick('A', 'ar', 1) + pick('A', 'bowl', 3) \
+        + pick('B', 'bat', 1) + pick('B', 'ar', 1) + pick('B', 'bowl', 1)
+    assert table.validate(lineup) == SIDE_LIMIT
+
+def test_unknown_role_rejected():
+    squad = build_squad()
+    squad[0]['role'] = 'captain'
+    try:
+        PlayerTable('m1', squad)
+    except ValueError:
+        return
+    raise AssertionError('expected ValueError for an unknown role')
+
+def test_lineup_hash_is_order_independent():
+    lineup = valid_lineup()
+    assert lineup_hash(lineup) == lineup_hash(list(reversed(lineup)))
+    assert lineup_hash(lineup) != lineup_hash(lineup[:10] + pick('B', 'bat', 1, skip=2))
+    # Non-string IDs hash like their string form
+    assert lineup_hash([3, 1, 2]) == lineup_hash(['1', '2', '3'])
+
+def main():
+    tests = [
+        test_valid_lineup,
+        test_size_unknown_and_duplicate_players,
+        test_credit_cap,
+        test_role_limits,
+        test_side_limit,
+        test_unknown_role_rejected,
+        test_lineup_hash_is_order_independent,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Profile update test
+Checks that profile updates validate the email and mobile, store the
+mobile in its 10-digit form, keep the login identities in step, and reject
+an email or mobile another account holds in any case or format.
+
+Needs mongomock (requirements-bench.txt); requests go through the Flask
+test client. Run from the backend directory:
+    python test_users.py
+or with pytest.
+"""
+
+import sys
+
+import mongomock
+
+from app import create_app
+from app.models.user import User
+from app.utils import db as db_module
+from app.utils.jwt_helper import generate_token
+from app.utils.migrations import drop_legacy_identity_indexes
+from app.utils.validations import identity_keys
+
+def make_client():
+    """Test client over a fresh mongomock database, with two users"""
+    db = mongomock.MongoClient().db
+    db.users.create_indexes(User.INDEXES)
+    db_module.db = db
+    users = {}
+    for name, email, mobile in (('ana', 'Ana@Example.com', '9876543210'), ('raj', 'raj@example.com', '9123456789')):
+        users[name] = db.users.insert_one({
+            'name': name, 'email': email, 'mobile': mobile, 'identities': identity_keys(email, mobile)
+        }).inserted_id
+    return create_app(init_database=False).test_client(), db, users
+
+def update(client, user_id, body):
+    response = client.put('/api/users/profile', json=body, headers={'Authorization': f'Bearer {generate_token(user_id)}'})
+    return response.status_code, response.get_json()
+
+def with_database(test):
+    def run():
+        try:
+            test()
+        finally:
+            db_module.db = None
+    run.__name__ = test.__name__
+    return run
+
+@with_database
+def test_invalid_email_or_mobile_rejected():
+    client, db, users = make_client()
+    for body in ({'email': 'not-an-email'}, {'email': 123}, {'mobile': '12345'}, {'mobile': ['9876543210']},
+                 {'name': '  '}):
+        status, _ = update(client, users['raj'], body)
+        assert status == 400, body
+    assert db.users.find_one({'_id': users['raj']})['email'] == 'raj@example.com'
+
+@with_database
+def test_case_folded_email_rejected():
+    client, db, users = make_client()
+    status, body = update(client, users['raj'], {'email': ' ANA@example.COM '})
+    assert status == 400 and 'already in use' in body['error']
+    assert db.users.find_one({'_id': users['raj']})['identities'] == ['raj@example.com', '9123456789']
+
+@with_database
+def test_reformatted_mobile_rejected():
+    client, db, users = make_client()
+    for mobile in ('+91 98765-43210', '098765 43210', '98765 43210'):
+        status, body = update(client, users['raj'], {'mobile': mobile})
+        assert status == 400 and 'already in use' in body['error'], mobile
+    assert db.users.find_one({'_id': users['raj']})['mobile'] == '9123456789'
+
+@with_database
+def test_update_normalizes_and_recomputes_identities():
+    client, db, users = make_client()
+    status, _ = update(client, users['raj'], {'email': ' Raj.K@Example.com', 'mobile': '+91 90000-11111'})
+    assert status == 200
+    user = db.users.find_one({'_id': users['raj']})
+    assert user['email'] == 'Raj.K@Example.com'
+    assert user['mobile'] == '9000011111'
+    assert user['identities'] == ['raj.k@example.com', '9000011111']
+
+    # A user may keep their own identities
+    assert update(client, users['ana'], {'email': 'ana@example.com', 'name': 'Ana'})[0] == 200
+    assert db.users.find_one({'_id': users['ana']})['identities'] == ['ana@example.com', '9876543210']
+
+def test_legacy_indexes_dropped():
+    db = mongomock.MongoClient().db
+    db.users.create_index('email', unique=True)
+    db.users.create_index('mobile', unique=True)
+    db.users.create_indexes(User.INDEXES)
+    assert sorted(drop_legacy_identity_indexes(db)) == ['email_1', 'mobile_1']
+    assert sorted(db.users.index_information()) == ['_id_', 'identities_1']
+    assert drop_legacy_identity_indexes(db) == []
+
+def main():
+    tests = [
+        test_invalid_email_or_mobile_rejected,
+        test_case_folded_email_rejected,
+        test_reformatted_mobile_rejected,
+        test_update_normalizes_and_recomputes_identities,
+        test_legacy_indexes_dropped,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Wallet history test
+Checks that tampered transaction cursors are rejected as invalid (a 400)
+rather than raising while the query is built, and that the CSV statement
+formats any created_at value.
+
+Run from the backend directory:
+    python test_wallet.py
+or with pytest.
+"""
+
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.services.wallet import build_transactions_query, format_timestamp
+from app.utils.pagination import decode_cursor, encode_cursor
+
+def assert_invalid(cursor):
+    try:
+        build_transactions_query(ObjectId(), cursor=decode_cursor(encode_cursor(cursor)))
+    except ValueError:
+        return
+    raise AssertionError(f'expected ValueError for cursor {cursor!r}')
+
+def test_tampered_cursors_are_invalid():
+    last_id = str(ObjectId())
+    for cursor in (
+        [123, last_id],
+        ['2024-01-01T00:00:00', 456],
+        ['2024-01-01T00:00:00', None],
+        [None, None],
+        [['2024-01-01'], last_id],
+        ['2024-01-01T00:00:00', 'not-an-id'],
+        ['2024-01-01T00:00:00'],
+        ['2024-01-01T00:00:00', last_id, 'extra'],
+        ['yesterday', last_id],
+    ):
+        assert_invalid(cursor)
+
+def test_valid_cursor_builds_keyset():
+    last_id = ObjectId()
+    query = build_transactions_query(ObjectId(), cursor=['2024-01-01T10:00:00', str(last_id)])
+    branches = query['$and'][1]['$or']
+    assert branches[0] == {'created_at': {'$lt': datetime(2024, 1, 1, 10)}}
+    assert branches[1]['_id'] == {'$lt': last_id}
+
+def test_csv_timestamps():
+    assert format_timestamp(datetime(2024, 1, 1, 10, 30)) == '2024-01-01T10:30:00'
+    assert format_timestamp(None) == ''
+    assert format_timestamp('2024-01-01') == '2024-01-01'
+    assert format_timestamp(1704067200) == '1704067200'
+
+def main():
+    tests = [
+        test_tampered_cursors_are_invalid,
+        test_valid_cursor_builds_keyset,
+        test_csv_timestamps,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())